@@ -0,0 +1,130 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Benchmarks/check_backends.py
+#
+# Run from the root directory of HEAPP, with Numba installed:
+#   python -m Benchmarks.check_backends
+#   python -m Benchmarks.check_backends --systems 200 --alloys 500 --seed 7
+#
+# Calculates random compositions with the numba and the numpy backend of Engine, calculate_batch() and calculate(),
+# and reports every value that is not bit for bit the same.
+
+import argparse
+import sys
+
+import numpy as np
+
+from engine import Engine
+from Utils import kernels
+from Utils.rules import SHIPPED_RULES, Rule, RuleRegistry
+
+# conditions using every function and descriptor the kernels generate code for
+CUSTOM_RULE = Rule("Custom", "custom", [("A", "sqrt(abs(enthalpy_of_mixing)) < max(delta, 2) and lambda_ > 0.5"),
+                                        ("B", "exp(-gamma) > 0.3 if vec > 7 else log(omega) > min(im_ratio, 1)"),
+                                        ("C", "not 0 < omega_an < 10 ** 3 or density * 2 ** -1 > 4")], "D",
+                   detail="{verdict} ({im_enthalpy:.3f}, {annealing_temperature:.1f} K)")
+
+
+def rule_sets(rng):
+    """the shipped rules, the shipped rules with shifted thresholds as a calibration makes them, and all of them
+    with CUSTOM_RULE."""
+    shifted = [rule.with_thresholds([value * rng.uniform(0.8, 1.2) for _, value, _ in rule.thresholds()])
+               for rule in SHIPPED_RULES]
+    return {"shipped": SHIPPED_RULES, "shifted": shifted, "custom": SHIPPED_RULES + [CUSTOM_RULE]}
+
+
+def usable_elements(engine):
+    elements = []
+    for element in engine.periodic_table:
+        try:
+            engine.batch_data([element])
+        except ValueError:
+            continue
+        elements.append(element)
+    return elements
+
+
+def random_fractions(rng, count, alloys):
+    """random compositions of count elements: some with elements left out, pure elements and fractions on a grid,
+    where thresholds such as a VEC of exactly 8 are met exactly."""
+    fractions = rng.dirichlet(np.ones(count), alloys)
+    fractions[rng.random((alloys, count)) < 0.1] = 0
+    fractions[: alloys // 10] = np.eye(count)[rng.integers(0, count, alloys // 10)]
+    grid = slice(alloys // 10, alloys // 4)
+    fractions[grid] = np.round(fractions[grid] * 20) / 20
+    empty = fractions.sum(axis=1) == 0
+    fractions[empty] = 1 / count
+    return fractions / fractions.sum(axis=1, keepdims=True)
+
+
+def first_difference(values, reference):
+    """the first (key, index) where two calculate_batch() values differ."""
+    if list(values) != list(reference):
+        return "keys", None
+    for key, array in reference.items():
+        other = values[key]
+        different = other != array if array.dtype == object else \
+            np.frombuffer(other.tobytes(), np.uint8) != np.frombuffer(array.tobytes(), np.uint8)
+        if np.any(different):
+            return key, int(np.flatnonzero(different)[0]) // (1 if array.dtype == object else array.itemsize)
+    return None
+
+
+def check(rules, elements, systems, alloys, scalar_alloys, rng):
+    """calculates systems random element systems on both backends, returns the differences as text."""
+    numpy_engine, numba_engine = Engine(), Engine()
+    numpy_engine.backend, numba_engine.backend = "numpy", "numba"
+    numpy_engine.rules = numba_engine.rules = RuleRegistry(rules)
+    restriction_values = {"model1": "SS", "delta": {"min": 0, "max": 6}}
+    differences = []
+    for _ in range(systems):
+        system = [str(element) for element in rng.choice(elements, rng.integers(1, 7), replace=False)]
+        fractions = random_fractions(rng, len(system), alloys)
+        values, meets_criteria = numba_engine.calculate_batch(system, fractions, restriction_values)
+        reference, reference_meets = numpy_engine.calculate_batch(system, fractions, restriction_values)
+        difference = first_difference(values, reference)
+        if difference is not None or not np.array_equal(meets_criteria, reference_meets):
+            key, index = difference or ("meets_criteria", None)
+            differences.append(f"calculate_batch() of {''.join(system)}: {key} of composition {index}")
+        for row in fractions[:scalar_alloys]:
+            composition = dict(zip(system, row.tolist()))
+            if not kernels.same_row(numba_engine.calculate(composition, restriction_values),
+                                    numpy_engine.calculate(composition, restriction_values)):
+                differences.append(f"calculate() of {composition}")
+                break
+        if numba_engine.backend != "numba":
+            differences.append(numba_engine.take_backend_message())
+            break
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checks the numba backend of HEAPP against the numpy path.")
+    parser.add_argument("--systems", type=int, default=100, help="random element systems per rule set")
+    parser.add_argument("--alloys", type=int, default=1000, help="compositions per element system")
+    parser.add_argument("--scalar-alloys", type=int, default=50,
+                        help="compositions per element system also compared through calculate()")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if kernels.backend() != "numba":
+        print("Numba is not installed or HEAPP_BACKEND=numpy is set, there is no backend to check.")
+        return 1
+    rng = np.random.default_rng(args.seed)
+    elements = usable_elements(Engine())
+    failed = False
+    for name, rules in rule_sets(rng).items():
+        differences = check(rules, elements, args.systems, args.alloys, args.scalar_alloys, rng)
+        for difference in differences:
+            print(f"DIFFERENCE {name} rules: {difference}")
+        if not differences:
+            print(f"{name} rules: {args.systems} element systems of {args.alloys} compositions identical")
+        failed = failed or bool(differences)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
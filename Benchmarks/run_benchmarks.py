@@ -0,0 +1,156 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Benchmarks/run_benchmarks.py
+#
+# Run from the root directory of HEAPP:
+#   python -m Benchmarks.run_benchmarks                    compare against the stored baseline
+#   python -m Benchmarks.run_benchmarks --save-baseline    store the results as the new baseline
+#   python -m Benchmarks.run_benchmarks --scale 0.01 -k sweep_5el cantor
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from Benchmarks.workloads import reference_workloads
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+# metric -> True if a higher value is better
+METRICS = {"throughput": True, "p50_ms": False, "p95_ms": False, "p99_ms": False, "peak_memory_mb": False}
+
+
+def machine_id():
+    """baselines are only comparable on the same machine and interpreter."""
+    return f"{platform.node()}|{platform.system()}|{platform.machine()}|Python {platform.python_version()}"
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = (len(values) - 1) * q / 100
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+def measure(workload, repeats, track_memory):
+    """runs a workload repeats times and summarizes throughput, latency percentiles and peak memory."""
+    workload.setup()
+    try:
+        wall_times = []
+        latencies = []
+        items = 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            items, run_latencies = workload.run()
+            wall_times.append(time.perf_counter() - start)
+            latencies.extend(run_latencies)
+
+        peak_memory = None
+        if track_memory:
+            # separate run, tracemalloc slows down allocation heavy code too much to time it at the same time
+            tracemalloc.start()
+            workload.run()
+            peak_memory = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+    finally:
+        workload.teardown()
+
+    wall_time = statistics.median(wall_times)
+    to_ms = lambda value: None if value is None else value * 1000
+    return {
+        "unit": workload.unit,
+        "items": items,
+        "wall_time_s": wall_time,
+        "throughput": items / wall_time if wall_time else None,
+        "p50_ms": to_ms(percentile(latencies, 50)),
+        "p95_ms": to_ms(percentile(latencies, 95)),
+        "p99_ms": to_ms(percentile(latencies, 99)),
+        "peak_memory_mb": peak_memory,
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """returns (workload, metric, baseline value, new value, relative change) for every metric worse than threshold."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = baseline[name].get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def print_result(name, result):
+    fmt = lambda value, spec: "-" if value is None else format(value, spec)
+    print(f"{name:<32} {fmt(result['throughput'], '12.1f')} {result['unit']}/s | "
+          f"p50 {fmt(result['p50_ms'], '9.4f')} ms | p95 {fmt(result['p95_ms'], '9.4f')} ms | "
+          f"p99 {fmt(result['p99_ms'], '9.4f')} ms | peak {fmt(result['peak_memory_mb'], '8.1f')} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the HEAPP reference benchmarks.")
+    parser.add_argument("-k", "--workloads", nargs="*", default=None,
+                        help="only run the workloads whose name starts with one of these prefixes")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the import/export row counts")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory run")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", help="writes the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    workloads = reference_workloads(args.scale)
+    if args.workloads:
+        workloads = [w for w in workloads if any(w.name.startswith(prefix) for prefix in args.workloads)]
+
+    results = {}
+    for workload in workloads:
+        results[workload.name] = measure(workload, args.repeats, not args.no_memory)
+        print_result(workload.name, results[workload.name])
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as f:
+            baselines = json.load(f)
+    baseline = baselines.get(machine_id(), {})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": machine_id(), "results": results}, f, indent=2)
+
+    if args.save_baseline:
+        baseline.update(results)
+        baselines[machine_id()] = baseline
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"Baseline saved for {machine_id()}")
+        return 0
+
+    if not baseline:
+        print(f"No baseline stored for {machine_id()}, run with --save-baseline first.")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, metric, old, new, change in regressions:
+        print(f"REGRESSION {name}: {metric} {old:.4g} -> {new:.4g} ({change:+.1%})")
+    if not regressions:
+        print(f"No regressions above {args.threshold:.0%}.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,67 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Benchmarks/ui_startup.py
+
+import argparse
+import statistics
+import sys
+import time
+
+from PySide6.QtWidgets import QApplication
+
+
+def measure_startup(app, repeats):
+    """measures the time from constructing the main window to its first paint."""
+    from main import MDLHEAPP
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        window = MDLHEAPP()
+        window.show()
+        app.processEvents()
+        timings.append(time.perf_counter() - start)
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+    return timings
+
+
+def measure_theme_switch(app, repeats):
+    """measures a full dark/light theme toggle including the repaint."""
+    from main import MDLHEAPP
+
+    window = MDLHEAPP()
+    window.show()
+    app.processEvents()
+    original_theme = window.settings.get_theme()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        window.switch_theme()
+        app.processEvents()
+        timings.append(time.perf_counter() - start)
+
+    if window.settings.get_theme() != original_theme:
+        window.switch_theme()
+    window.close()
+    return timings
+
+
+def summarize(name, timings):
+    print(f"{name:<14} median {statistics.median(timings) * 1000:8.2f} ms | "
+          f"min {min(timings) * 1000:8.2f} ms | max {max(timings) * 1000:8.2f} ms | n={len(timings)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures HEAPP window startup and theme switch times.")
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    summarize("startup", measure_startup(app, args.repeats))
+    summarize("theme switch", measure_theme_switch(app, args.repeats * 2))
\ No newline at end of file
@@ -0,0 +1,216 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Benchmarks/workloads.py
+
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import xlsxwriter
+
+from engine import Engine
+from Utils.io_helpers import read_compositions_from_excel
+from Workers.alloy_calculation import AlloyCalculationWorker
+from Workers.composition_generation import CompositionGenerationWorker
+from Workers.excel_writer import ExcelWriterWorker
+
+CANTOR = {"Co": 20, "Cr": 20, "Fe": 20, "Mn": 20, "Ni": 20}
+SWEEP_ELEMENTS = {5: ["Co", "Cr", "Fe", "Mn", "Ni"],
+                  6: ["Co", "Cr", "Fe", "Mn", "Ni", "Cu"],
+                  7: ["Co", "Cr", "Fe", "Mn", "Ni", "Cu", "Al"]}
+# (number of elements, first at%, last at%, step size)
+SWEEPS = [(5, 10, 40, 10), (5, 5, 35, 5), (5, 10, 30, 2),
+          (6, 10, 40, 10), (6, 5, 35, 5),
+          (7, 10, 40, 10), (7, 5, 35, 5)]
+HEADERS = ["Alloy", "Density (g/cm³)", "δ", "γ", "ΔHₘᵢₓ (kJ/mol)", "VEC", "ΔSₘᵢₓ (kJ/mol)", "Tₘ (K)",
+           "Ω", "Crystal Str.", "R1", "R2", "R3", "R4", "R5", "R6"]
+
+
+def _run_sweep(compositions, engine):
+    """runs AlloyCalculationWorker synchronously, returns the result set and the per-alloy latencies."""
+    worker = AlloyCalculationWorker(compositions, engine, {})
+    latencies = []
+    last = [time.perf_counter(), 0]
+    results = []
+
+    def on_progress(current, total, estimated_time, alloys_per_second):
+        now = time.perf_counter()
+        done = current - last[1]
+        if done:
+            latencies.append((now - last[0]) / done)
+        last[0], last[1] = now, current
+
+    worker.update_progress.connect(on_progress)
+    worker.all_results_ready.connect(lambda result_set, count: results.append(result_set))
+    worker.run()
+    return results[0], latencies
+
+
+def _generate_compositions(elements, start, end, step):
+    worker = CompositionGenerationWorker({el: (start, end) for el in elements}, step)
+    compositions = []
+    worker.compositions_ready.connect(compositions.extend)
+    worker.run()
+    return compositions
+
+
+class Workload:
+    """a fixed, headless reference workload. run() returns (items processed, per-item latencies in seconds)."""
+    name = ""
+    unit = "items"
+
+    def setup(self):
+        pass
+
+    def run(self):
+        raise NotImplementedError
+
+    def teardown(self):
+        pass
+
+
+class CantorWorkload(Workload):
+    unit = "alloys"
+
+    def __init__(self, calls=5000):
+        self.name = "cantor_single"
+        self.calls = calls
+
+    def setup(self):
+        self.engine = Engine()
+        self.composition = {el: at_p / 100 for el, at_p in CANTOR.items()}
+
+    def run(self):
+        latencies = []
+        for _ in range(self.calls):
+            start = time.perf_counter()
+            self.engine.calculate(self.composition, None)
+            latencies.append(time.perf_counter() - start)
+        return self.calls, latencies
+
+
+class SweepWorkload(Workload):
+    unit = "alloys"
+
+    def __init__(self, n_elements, start, end, step):
+        self.name = f"sweep_{n_elements}el_{start}-{end}_step{step}"
+        self.elements = SWEEP_ELEMENTS[n_elements]
+        self.start, self.end, self.step = start, end, step
+
+    def setup(self):
+        self.engine = Engine()
+
+    def run(self):
+        compositions = _generate_compositions(self.elements, self.start, self.end, self.step)
+        _, latencies = _run_sweep(compositions, self.engine)
+        return len(compositions), latencies
+
+
+class BatchSweepWorkload(Workload):
+    """the 5-element 5-35 at% step 5 sweep through Engine.calculate_batch, one batch per run."""
+    unit = "alloys"
+
+    def __init__(self):
+        self.name = "batch_sweep_5el_5-35_step5"
+
+    def setup(self):
+        self.engine = Engine()
+        compositions = _generate_compositions(SWEEP_ELEMENTS[5], 5, 35, 5)
+        self.fractions = [[composition[el] / 100 for el in SWEEP_ELEMENTS[5]] for composition in compositions]
+
+    def run(self):
+        start = time.perf_counter()
+        self.engine.calculate_batch(SWEEP_ELEMENTS[5], self.fractions)
+        return len(self.fractions), [(time.perf_counter() - start) / len(self.fractions)]
+
+
+class ImportWorkload(Workload):
+    unit = "rows"
+
+    def __init__(self, rows=100_000):
+        self.name = f"import_{rows}_rows"
+        self.rows = rows
+
+    def setup(self):
+        compositions = _generate_compositions(SWEEP_ELEMENTS[5], 5, 35, 5)
+        self.file_path = os.path.join(tempfile.mkdtemp(), "import.xlsx")
+        workbook = xlsxwriter.Workbook(self.file_path, {"constant_memory": True})
+        worksheet = workbook.add_worksheet()
+        worksheet.write(0, 0, "Alloy")
+        for row, composition in zip(range(1, self.rows + 1), itertools.cycle(compositions)):
+            worksheet.write(row, 0, "".join(f"{el}{at_p}" for el, at_p in composition.items()))
+        workbook.close()
+
+    def run(self):
+        start = time.perf_counter()
+        compositions = read_compositions_from_excel(self.file_path)
+        return len(compositions), [(time.perf_counter() - start) / max(len(compositions), 1)]
+
+    def teardown(self):
+        os.remove(self.file_path)
+
+
+class ExportWorkload(Workload):
+    unit = "rows"
+
+    def __init__(self, rows=1_000_000):
+        self.name = f"export_{rows}_rows"
+        self.rows = rows
+
+    def setup(self):
+        compositions = _generate_compositions(SWEEP_ELEMENTS[5], 5, 35, 5)
+        result_set, _ = _run_sweep(compositions, Engine())
+        self.result_set = result_set.take(np.arange(self.rows) % len(result_set))
+        self.file_path = os.path.join(tempfile.mkdtemp(), "export.xlsx")
+
+    def run(self):
+        worker = ExcelWriterWorker(self.result_set, self.file_path, HEADERS)
+        latencies = []
+        last = [time.perf_counter(), 0]
+
+        def on_progress(processed, total, rows_per_second):
+            now = time.perf_counter()
+            if processed > last[1]:
+                latencies.append((now - last[0]) / (processed - last[1]))
+            last[0], last[1] = now, processed
+
+        worker.progress.connect(on_progress)
+        worker.run()
+        return self.rows, latencies
+
+    def teardown(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class ImportTimeWorkload(Workload):
+    """measures the cold import time of a module in a fresh interpreter."""
+    unit = "imports"
+
+    def __init__(self, module):
+        self.name = f"import_time_{module}"
+        self.module = module
+
+    def run(self):
+        code = f"import time; start = time.perf_counter(); import {self.module}; print(time.perf_counter() - start)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        seconds = float(output.strip().splitlines()[-1])
+        return 1, [seconds]
+
+
+def reference_workloads(scale=1.0):
+    """returns the reference workloads, the import/export row counts multiplied by scale."""
+    workloads = [CantorWorkload()]
+    workloads += [SweepWorkload(*sweep) for sweep in SWEEPS]
+    workloads.append(BatchSweepWorkload())
+    workloads.append(ImportWorkload(int(100_000 * scale)))
+    workloads.append(ExportWorkload(int(1_000_000 * scale)))
+    workloads += [ImportTimeWorkload("engine"), ImportTimeWorkload("main")]
+    return workloads
\ No newline at end of file
@@ -0,0 +1,128 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Components/job_queue.py
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton,
+                               QAbstractItemView, QHeaderView, QLabel)
+from PySide6.QtCore import Qt, Signal
+from Utils.jobs import QUEUED, RUNNING, PAUSED, DONE, CANCELLED
+
+HEADERS = ["Job", "Status", "Priority", "Processes", "Memory (MB)", "Progress", "Meeting criteria"]
+
+class JobQueueDialog(QDialog):
+    """the jobs of the JobManager and their progress. It is not modal, the main window stays usable while the
+    jobs run; adding a job and showing results are left to the main window through the signals."""
+    add_requested = Signal()
+    results_requested = Signal(str)
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Job Queue")
+        self.resize(760, 360)
+        self.manager = manager
+        self.job_ids = []
+        self.initUI()
+        self.manager.job_changed.connect(self.refresh)
+        self.refresh()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        self.pool_label = QLabel(f"{self.manager.processes} worker processes shared by the jobs, highest priority first",
+                                 self)
+        layout.addWidget(self.pool_label)
+        self.table = QTableWidget(0, len(HEADERS), self)
+        self.table.setHorizontalHeaderLabels(HEADERS)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.itemSelectionChanged.connect(self.update_buttons)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        self.buttons = {}
+        for name, label, handler in (("add", "Add Sweep", self.add_requested.emit),
+                                     ("up", "Priority +", lambda: self.change_priority(1)),
+                                     ("down", "Priority -", lambda: self.change_priority(-1)),
+                                     ("pause", "Pause", self.toggle_pause),
+                                     ("results", "Results", self.show_results),
+                                     ("cancel", "Cancel", self.cancel),
+                                     ("remove", "Remove", self.remove)):
+            button = QPushButton(label, self)
+            button.setProperty("class", "danger_button" if name in ("cancel", "remove") else "secondary_button")
+            button.setFixedSize(100, 38)
+            button.clicked.connect(handler)
+            button_layout.addWidget(button)
+            self.buttons[name] = button
+        button_layout.addStretch(1)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def selected_job(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows or rows[0].row() >= len(self.job_ids):
+            return None
+        return self.manager.jobs.get(self.job_ids[rows[0].row()])
+
+    def refresh(self, job_id=None):
+        selected = self.selected_job()
+        jobs = list(self.manager.jobs.values())
+        self.job_ids = [job.checkpoint_id for job in jobs]
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            position, count = self.manager.progress(job)
+            total = job.state["total"]
+            progress = f"{position} of {total}" + (f" ({position / total:.0%})" if total else "")
+            status = job.status + (f": {job.state['message']}" if job.state["message"] else "")
+            for column, text in enumerate([job.state["label"], status, str(job.priority), str(job.processes),
+                                           str(job.memory_mb), progress, str(count)]):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.table.setItem(row, column, item)
+        if selected is not None and selected.checkpoint_id in self.job_ids:
+            self.table.selectRow(self.job_ids.index(selected.checkpoint_id))
+        self.update_buttons()
+
+    def update_buttons(self):
+        job = self.selected_job()
+        status = job.status if job is not None else None
+        self.buttons["up"].setEnabled(job is not None)
+        self.buttons["down"].setEnabled(job is not None)
+        self.buttons["pause"].setEnabled(status in (QUEUED, RUNNING, PAUSED))
+        self.buttons["pause"].setText("Resume" if status == PAUSED else "Pause")
+        self.buttons["results"].setEnabled(status in (DONE, PAUSED, CANCELLED))
+        self.buttons["cancel"].setEnabled(status in (QUEUED, RUNNING, PAUSED))
+        self.buttons["remove"].setEnabled(job is not None and status != RUNNING)
+
+    def change_priority(self, step):
+        job = self.selected_job()
+        if job is not None:
+            self.manager.set_priority(job.checkpoint_id, job.priority + step)
+
+    def toggle_pause(self):
+        job = self.selected_job()
+        if job is None:
+            return
+        if job.status == PAUSED:
+            self.manager.resume(job.checkpoint_id)
+        else:
+            self.manager.pause(job.checkpoint_id)
+
+    def show_results(self):
+        job = self.selected_job()
+        if job is not None:
+            self.results_requested.emit(job.checkpoint_id)
+
+    def cancel(self):
+        job = self.selected_job()
+        if job is not None:
+            self.manager.cancel(job.checkpoint_id)
+
+    def remove(self):
+        job = self.selected_job()
+        if job is not None:
+            self.manager.remove(job.checkpoint_id)
\ No newline at end of file
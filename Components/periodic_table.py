@@ -8,6 +8,52 @@
 from PySide6.QtCore import QObject
 from PySide6.QtWidgets import QPushButton, QSpacerItem, QSizePolicy
 
+DEFAULT_ELEMENT_COLOR = {"normal": "#333333", "normal_font": "#f4f4f4", "hover": "#444444", "hover_font": "#f4f4f4"}
+
+def element_stylesheet(element_colors, theme):
+    """builds the element button rules for a theme, keyed on the element_group property."""
+    rules = []
+    for group, color in [(None, DEFAULT_ELEMENT_COLOR)] + list(element_colors.items()):
+        color = {**DEFAULT_ELEMENT_COLOR, **color}
+        selector = 'QPushButton[element_group]' if group is None else f'QPushButton[element_group="{group}"]'
+        if theme == "dark":
+            rules.append(
+                f"""
+                {selector} {{
+                    background-color: {color["normal"]}; 
+                    color: #f4f4f4; 
+                    font-size: 11pt;
+                    text-align: center;
+                    padding: 2px;
+                }}
+                {selector}:hover {{
+                    background-color: {color["hover"]};
+                }}
+                {selector}:checked {{
+                    background-color: {color["hover"]};
+                }}""")
+        elif theme == "light":
+            rules.append(
+                f"""
+                {selector} {{
+                    background-color: {color["normal"]}; 
+                    color: {color["normal_font"]}; 
+                    border-radius: 0px;
+                    font-size: 11pt;
+                    text-align: center;
+                    padding: 2px;
+                }}
+                {selector}:hover {{
+                    background-color: {color["hover"]};
+                    color: {color["hover_font"]};
+                }}
+                {selector}:checked {{
+                    background-color: #ffffff;
+                    border: 3px solid {color["hover"]};
+                    color: {color["hover"]};
+                }}""")
+    return "".join(rules)
+
 class PeriodicTable(QObject):
     def __init__(self, layout, engine, element_colors, callback, status_label, settings):
 
@@ -21,56 +67,24 @@ class PeriodicTable(QObject):
         self.settings = settings
 
         self.buttons = {}
+        self.stylesheets = {}
         self.add_elements_to_table()
 
+    def stylesheet(self, theme):
+        """returns the shared element button stylesheet for a theme, built once per theme."""
+        if theme not in self.stylesheets:
+            self.stylesheets[theme] = element_stylesheet(self.element_colors, theme)
+        return self.stylesheets[theme]
+
     def add_elements_to_table(self):
         self.layout.setHorizontalSpacing(3)
         self.layout.setVerticalSpacing(3)
-        current_theme = self.settings.get_theme()
         for element, data in self.engine.periodic_table.items():
             row, col, group = data["position"]
-            color = self.element_colors.get(group, {"normal": "#333333", "hover": "#444444"})
             button = QPushButton(element)
             button.setCheckable(True)
             button.setFixedSize(29, 29)
-
-            if current_theme == "dark":
-                button.setStyleSheet(
-                    f"""
-                    QPushButton {{
-                        background-color: {color["normal"]}; 
-                        color: #f4f4f4; 
-                        font-size: 11pt;
-                        text-align: center;
-                        padding: 2px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: {color["hover"]};
-                    }}
-                    QPushButton:checked {{
-                        background-color: {color["hover"]};
-                    }}""")
-            elif current_theme == "light":
-                button.setStyleSheet(
-                    f"""
-                    QPushButton {{
-                        background-color: {color["normal"]}; 
-                        color: {color["normal_font"]}; 
-                        border-radius: 0px;
-                        font-size: 11pt;
-                        text-align: center;
-                        padding: 2px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: {color["hover"]};
-                        color: {color["hover_font"]};
-                    }}
-                    QPushButton:checked {{
-                        background-color: #ffffff;
-                        border: 3px solid {color["hover"]};
-                        color: {color["hover"]};
-                    }}""")
-
+            button.setProperty("element_group", group)
             button.installEventFilter(self)
             button.clicked.connect(lambda _, el=element, btn=button: self.callback(el, btn))
             self.layout.addWidget(button, row, col)
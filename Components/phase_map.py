@@ -0,0 +1,174 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Components/phase_map.py
+
+import os
+import numpy as np
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QComboBox, QPushButton,
+                               QFileDialog, QMessageBox)
+from PySide6.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QPolygonF
+from PySide6.QtSvg import QSvgGenerator
+from PySide6.QtCore import Qt, QPointF, QRectF, QSize
+from Utils.phase_map import (PROPERTIES, CATEGORICAL, HEIGHT_RATIO, rasterize, colorize, category_color,
+                             colormap_color)
+
+MAP_SIZES = [200, 400, 800]  # pixels across the triangle
+VIEW_WIDTH = 520
+MARGIN = 40
+
+class PhaseMapDialog(QDialog):
+    """ternary map of the last results, for three elements or a slice of a larger system with the other
+    elements fixed. The results are binned into pixels, so redrawing costs the same for any number of alloys."""
+
+    def __init__(self, data, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Phase Map")
+        self.data = data
+        self.image = None
+        self.legend = []
+        self.slice_boxes = {}
+        self.initUI()
+        self.update_slices()
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+        controls = QGridLayout()
+        self.corner_boxes = []
+        for i, label in enumerate(["Bottom left", "Bottom right", "Top"]):
+            controls.addWidget(QLabel(label, self), 0, i)
+            box = QComboBox(self)
+            box.addItems(self.data.elements)
+            box.setCurrentIndex(min(i, len(self.data.elements) - 1))
+            box.currentIndexChanged.connect(self.update_slices)
+            controls.addWidget(box, 1, i)
+            self.corner_boxes.append(box)
+        controls.addWidget(QLabel("Property", self), 0, 3)
+        self.property_box = QComboBox(self)
+        self.property_box.addItems(list(PROPERTIES))
+        self.property_box.currentIndexChanged.connect(self.redraw)
+        controls.addWidget(self.property_box, 1, 3)
+        controls.addWidget(QLabel("Pixels", self), 0, 4)
+        self.size_box = QComboBox(self)
+        self.size_box.addItems([str(size) for size in MAP_SIZES])
+        self.size_box.setCurrentIndex(1)
+        self.size_box.currentIndexChanged.connect(self.redraw)
+        controls.addWidget(self.size_box, 1, 4)
+        layout.addLayout(controls)
+
+        self.slice_layout = QHBoxLayout()
+        layout.addLayout(self.slice_layout)
+
+        self.map_label = QLabel(self)
+        self.map_label.setFixedSize(VIEW_WIDTH, int(VIEW_WIDTH * HEIGHT_RATIO) + MARGIN)
+        layout.addWidget(self.map_label, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.legend_label = QLabel(self)
+        self.legend_label.setWordWrap(True)
+        layout.addWidget(self.legend_label)
+
+        export_button = QPushButton("Export", self)
+        export_button.setProperty("class", "secondary_button")
+        export_button.setFixedSize(100, 38)
+        export_button.clicked.connect(self.export)
+        layout.addWidget(export_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.setLayout(layout)
+
+    def corners(self):
+        return [box.currentText() for box in self.corner_boxes]
+
+    def update_slices(self):
+        # one combobox per element that is not a corner, with the at% it takes in the results
+        while self.slice_layout.count():
+            widget = self.slice_layout.takeAt(0).widget()
+            if widget:
+                widget.deleteLater()
+        self.slice_boxes = {}
+        for el, values in self.data.slice_values(self.corners()).items():
+            self.slice_layout.addWidget(QLabel(f"{el} at%", self))
+            box = QComboBox(self)
+            box.addItem("any")
+            box.addItems([f"{value:g}" for value in values])
+            box.setCurrentIndex(1 if values else 0)
+            box.currentIndexChanged.connect(self.redraw)
+            self.slice_layout.addWidget(box)
+            self.slice_boxes[el] = box
+        self.slice_layout.addStretch(1)
+        self.redraw()
+
+    def redraw(self):
+        corners = self.corners()
+        if len(set(corners)) < 3:
+            self.image = None
+            self.map_label.setText("Choose three different elements for the corners.")
+            self.legend_label.setText("")
+            return
+        fixed = {el: float(box.currentText()) for el, box in self.slice_boxes.items() if box.currentText() != "any"}
+        fractions, rows = self.data.select(corners, fixed)
+        key = PROPERTIES[self.property_box.currentText()]
+        categorical = key in CATEGORICAL
+        grid, categories = rasterize(fractions, self.data.columns[key][rows], int(self.size_box.currentText()),
+                                     categorical)
+        rgba = np.ascontiguousarray(colorize(grid, categories if categorical else None))
+        height, width = rgba.shape[:2]
+        self.image = QImage(rgba.tobytes(), width, height, 4 * width, QImage.Format.Format_RGBA8888).copy()
+
+        if categorical:
+            self.legend = [(category_color(category, i), category) for i, category in enumerate(categories)]
+        else:
+            finite = grid[np.isfinite(grid)]
+            low, high = (finite.min(), finite.max()) if len(finite) else (0, 0)
+            self.legend = [(colormap_color(0), f"{low:.4g}"), (colormap_color(0.5), f"{(low + high) / 2:.4g}"),
+                           (colormap_color(1), f"{high:.4g}")]
+        self.legend_label.setText(f"{len(rows)} alloys | " + " ".join(
+            f'<span style="color: rgb{color}">■</span> {text}' for color, text in self.legend))
+
+        pixmap = QPixmap(self.map_label.size())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        self.render_map(painter, pixmap.width(), pixmap.height())
+        painter.end()
+        self.map_label.setPixmap(pixmap)
+
+    def render_map(self, painter, width, height):
+        """draws the map, the triangle and the corner labels into width x height, for the view and the export."""
+        side = min(width - 2 * MARGIN, (height - MARGIN) / HEIGHT_RATIO)
+        left = (width - side) / 2
+        top = (height - side * HEIGHT_RATIO) / 2
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+        painter.drawImage(QRectF(left, top, side, side * HEIGHT_RATIO), self.image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.setPen(QPen(QColor(120, 120, 120), 1))
+        bottom_left, bottom_right = QPointF(left, top + side * HEIGHT_RATIO), QPointF(left + side, top + side * HEIGHT_RATIO)
+        apex = QPointF(left + side / 2, top)
+        painter.drawPolygon(QPolygonF([bottom_left, bottom_right, apex]))
+        a, b, c = self.corners()
+        painter.drawText(QRectF(bottom_left.x() - MARGIN, bottom_left.y() + 2, 2 * MARGIN, 18), Qt.AlignmentFlag.AlignCenter, a)
+        painter.drawText(QRectF(bottom_right.x() - MARGIN, bottom_right.y() + 2, 2 * MARGIN, 18), Qt.AlignmentFlag.AlignCenter, b)
+        painter.drawText(QRectF(apex.x() - MARGIN, apex.y() - 20, 2 * MARGIN, 18), Qt.AlignmentFlag.AlignCenter, c)
+
+    def export(self):
+        if self.image is None:
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Phase Map", "", "PNG Image (*.png);;SVG Image (*.svg)")
+        if not file_path:
+            return
+        width, height = 2 * VIEW_WIDTH, 2 * (int(VIEW_WIDTH * HEIGHT_RATIO) + MARGIN)
+        if os.path.splitext(file_path)[1].lower() == ".svg":
+            generator = QSvgGenerator()
+            generator.setFileName(file_path)
+            generator.setSize(QSize(width, height))
+            generator.setViewBox(QRectF(0, 0, width, height))
+            generator.setTitle(f"{''.join(self.corners())} {self.property_box.currentText()}")
+            painter = QPainter(generator)
+            self.render_map(painter, width, height)
+            painter.end()
+        else:
+            image = QImage(width, height, QImage.Format.Format_ARGB32)
+            image.fill(Qt.GlobalColor.white)
+            painter = QPainter(image)
+            self.render_map(painter, width, height)
+            painter.end()
+            if not image.save(file_path):
+                QMessageBox.critical(self, "Export Phase Map", f"Could not save {file_path}")
\ No newline at end of file
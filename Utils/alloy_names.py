@@ -0,0 +1,24 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/alloy_names.py
+
+import re
+
+SUBSCRIPTS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+DIGITS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+_ALLOY_NAME = re.compile(r"([A-Z][a-z]?)([₀₁₂₃₄₅₆₇₈₉.]+)")
+
+def to_subscript(num_str):
+    """Convert numbers to subscript format."""
+    return num_str.translate(SUBSCRIPTS)
+
+def alloy_name(composition):
+    """the name of an {element: at%} composition such as Al₁₂.₅Co₂₅Cr₂₅Fe₂₅Ni₁₂.₅, the percents written with :g."""
+    return "".join(f"{el}{to_subscript(f'{at_p:g}')}" for el, at_p in composition.items())
+
+def parse_alloy_name(alloy_name):
+    """returns the {element: at%} of an alloy name such as Co₂₀Cr₂₀Fe₁₂.₅..."""
+    return {el: float(at_p.translate(DIGITS)) for el, at_p in _ALLOY_NAME.findall(alloy_name)}
\ No newline at end of file
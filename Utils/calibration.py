@@ -0,0 +1,161 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/calibration.py
+
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from engine import Descriptors
+from Utils.rules import RuleRegistry
+from Utils.validation import UNKNOWN, element_systems, phase_class, scoring_classes
+
+THRESHOLD_SETS_DIR = "Data/threshold_sets"
+STEPS = 11  # values tried per threshold, the published one in the middle
+SPAN = 0.5  # the values tried are within ±SPAN of the published one
+MAX_GRID = 100000  # threshold sets of a full grid search, coordinate descent above
+MAX_ROUNDS = 20  # rounds of coordinate descent
+BLOCK_ELEMENTS = 4000000  # threshold sets × alloys evaluated at a time
+
+class Calibration:
+    """the descriptors of a labeled dataset, calculated once, for re-fitting the thresholds of rules.
+
+    Only the alloys that could be calculated and have an observed phase phase_class() knows are kept. A rule's
+    thresholds, see Rule.thresholds(), are fitted by evaluating many threshold sets in one pass over the cached
+    descriptor arrays with Rule.evaluate_thresholds(). Thresholds comparing the same descriptor with the same
+    published value, such as the Λ = 0.96 border of the R4 regions, move together; zero thresholds, the physical
+    bounds such as 0 < δ, stay.
+    """
+
+    def __init__(self, engine, compositions, phases):
+        observed = np.array([phase_class(phase) for phase in phases], dtype=np.int64)
+        names = sorted({name for rule in engine.rules for name in rule.descriptors})
+        elements, at_percents, _, systems, system_index = element_systems(compositions)
+        descriptors = {name: np.full(len(compositions), np.nan) for name in names}
+        calculated = np.zeros(len(compositions), dtype=bool)
+        for s, system in enumerate(systems):
+            rows = np.flatnonzero(system_index == s)
+            system_elements = [el for el, present in zip(elements, system) if present]
+            fractions = at_percents[np.ix_(rows, system)] / 100
+            try:
+                data = engine.batch_data(system_elements)
+                values, _ = engine.calculate_batch(system_elements, fractions, data=data)
+            except ValueError:
+                continue
+            columns = [fractions[:, i] for i in range(len(system_elements))]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                system_descriptors = Descriptors(engine, system_elements, columns, values, data)
+                for name in names:
+                    descriptors[name][rows] = np.broadcast_to(system_descriptors[name], (len(rows),))
+            calculated[rows] = True
+        kept = calculated & (observed != UNKNOWN)
+        self.alloys = len(compositions)
+        self.observed = observed[kept]
+        self.descriptors = {name: array[kept] for name, array in descriptors.items()}
+
+    def __len__(self):
+        return len(self.observed)
+
+    def accuracy(self, rule, values):
+        """the share of the scored alloys a rule classifies right, for each row of a (sets, thresholds) array."""
+        predicted_classes, observed = scoring_classes(rule, self.observed)
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        accuracy = np.zeros(len(values))
+        block = max(1, BLOCK_ELEMENTS // max(len(self), 1))
+        with np.errstate(invalid="ignore"):
+            for start in range(0, len(values), block):
+                predicted = predicted_classes[rule.evaluate_thresholds(self.descriptors, len(self),
+                                                                       values[start:start + block])]
+                scored = predicted != UNKNOWN
+                correct = (scored & (predicted == observed)).sum(axis=1)
+                accuracy[start:start + block] = correct / np.maximum(scored.sum(axis=1), 1)
+        return accuracy
+
+    def calibrate(self, rule, steps=STEPS, span=SPAN, max_grid=MAX_GRID):
+        """fits the thresholds of rule, a grid search of steps values per free threshold or, for grids larger
+        than max_grid, coordinate descent over the same values. Returns the report of the fit and the rule with
+        the calibrated thresholds."""
+        start_time = time.time()
+        thresholds = rule.thresholds()
+        published = np.array([value for _, value, _ in thresholds])
+        keys = list(dict.fromkeys((compared, value) for _, value, compared in thresholds if value != 0))
+        # column k of a threshold set is free parameter ties[k], or the published value for zero thresholds
+        ties = np.array([keys.index((compared, value)) if value != 0 else -1 for _, value, compared in thresholds],
+                        dtype=np.int64)
+        grids = [value * np.linspace(1 - span, 1 + span, steps) for _, value in keys]
+
+        def threshold_sets(parameters):
+            parameters = np.atleast_2d(parameters)
+            if not keys:
+                return np.repeat(published[None, :], len(parameters), axis=0)
+            return np.where(ties >= 0, parameters[:, np.maximum(ties, 0)], published)
+
+        current = np.array([value for _, value in keys])
+        published_accuracy = float(self.accuracy(rule, threshold_sets(current))[0]) if len(self) else 0.0
+        best_accuracy = published_accuracy
+        evaluated, method = 1, "none"
+        if keys and len(self) and np.prod([float(len(grid)) for grid in grids]) <= max_grid:
+            method = "grid"
+            parameters = np.stack(np.meshgrid(*grids, indexing="ij"), axis=-1).reshape(-1, len(keys))
+            accuracy = self.accuracy(rule, threshold_sets(parameters))
+            evaluated += len(parameters)
+            if accuracy.max() > best_accuracy:
+                best_accuracy, current = float(accuracy.max()), parameters[np.argmax(accuracy)]
+        elif keys and len(self):
+            method = "coordinate descent"
+            for _ in range(MAX_ROUNDS):
+                improved = False
+                for k, grid in enumerate(grids):
+                    parameters = np.repeat(current[None, :], len(grid), axis=0)
+                    parameters[:, k] = grid
+                    accuracy = self.accuracy(rule, threshold_sets(parameters))
+                    evaluated += len(parameters)
+                    if accuracy.max() > best_accuracy:
+                        best_accuracy, current, improved = float(accuracy.max()), parameters[np.argmax(accuracy)], True
+                if not improved:
+                    break
+        calibrated = threshold_sets(current)[0]
+        elapsed_time = time.time() - start_time
+        report = {
+            "method": method,
+            "thresholds": [{"threshold": label, "published": float(value), "calibrated": float(f"{new:.6g}")}
+                           for (label, value, _), new in zip(thresholds, calibrated)],
+            "published_accuracy": published_accuracy,
+            "accuracy": best_accuracy,
+            "threshold_sets": evaluated,
+            "threshold_sets_per_second": evaluated / elapsed_time if elapsed_time > 0 else 0.0,
+        }
+        return report, rule.with_thresholds(calibrated) if len(thresholds) else rule
+
+def save_threshold_set(name, rules, report=None):
+    """saves rules, e.g. with calibrated thresholds, as the threshold set name."""
+    os.makedirs(THRESHOLD_SETS_DIR, exist_ok=True)
+    with open(threshold_set_file(name), "w") as f:
+        json.dump({"name": name, "created": datetime.now().isoformat(timespec="seconds"), "rules": rules.specs(),
+                   "report": report}, f, indent=2)
+
+def threshold_set_file(name):
+    return os.path.join(THRESHOLD_SETS_DIR, "".join(c if c.isalnum() or c in "-_ " else "_" for c in name) + ".json")
+
+def list_threshold_sets():
+    """the names of the saved threshold sets, sorted."""
+    names = []
+    for file_name in glob.glob(os.path.join(THRESHOLD_SETS_DIR, "*.json")):
+        try:
+            with open(file_name, "r") as f:
+                names.append(json.load(f)["name"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading threshold set {file_name}: {e}")
+    return sorted(names)
+
+def load_threshold_set(name):
+    """the RuleRegistry of a saved threshold set."""
+    with open(threshold_set_file(name), "r") as f:
+        return RuleRegistry.from_specs(json.load(f)["rules"])
\ No newline at end of file
@@ -0,0 +1,183 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/checkpoint.py
+
+import json
+import os
+from datetime import datetime
+from Utils.lattice import CompositionLattice
+from Utils.ranking import from_spec
+from Utils.rules import RuleRegistry
+from Utils.sampling import SampledCompositions
+
+CHECKPOINT_DIR = "Data/checkpoints"
+CHECKPOINT_INTERVAL = 5.0  # seconds between two checkpoints of a running sweep
+
+class Checkpoint:
+    """progress position and flushed partial results of a sweep, so that it can be resumed after a restart.
+
+    A checkpoint is three files in CHECKPOINT_DIR sharing one id:
+    <id>.json                the state (position, number of results, valid size of the results file)
+    <id>.compositions.json   the listed compositions of the sweep, e.g. of an Excel file, written once
+    <id>.results.jsonl       one [values, alloy_name] JSON line per alloy meeting the criteria
+
+    Grid sweeps and sampled compositions are not written, the state keeps the spec() of their CompositionLattice
+    or SampledCompositions instead, the position and, for samples, the cursor of the last block calculated are
+    where they continue.
+
+    When a sink collects the results (top-K, Pareto front, summary statistics) the results file stays empty and
+    the dump() of the sink is stored in the state instead. The state keeps the specs of the rules the sweep is
+    calculated with too, so that switching threshold sets does not mix verdicts of two sets in one result table.
+    """
+
+    directory = CHECKPOINT_DIR
+
+    def __init__(self, checkpoint_id, state):
+        self.checkpoint_id = checkpoint_id
+        self.state = state
+
+    @classmethod
+    def create(cls, compositions, restriction_values, label="", sink=None, rules=None):
+        os.makedirs(cls.directory, exist_ok=True)
+        checkpoint_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        checkpoint = cls(checkpoint_id, {
+            "label": label,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "restriction_values": restriction_values or {},
+            "total": len(compositions),
+            "position": 0,
+            "count_meeting_criteria": 0,
+            "results_bytes": 0,
+            "sink": sink.spec() if sink is not None else None,
+            "sink_state": {},
+            "rules": rules.specs() if rules is not None else None,
+        })
+        if isinstance(compositions, CompositionLattice):
+            checkpoint.state["lattice"] = compositions.spec()
+        elif isinstance(compositions, SampledCompositions):
+            checkpoint.state["sampled"] = compositions.spec()
+            checkpoint.state["cursor"] = None
+        else:
+            with open(checkpoint.compositions_file, "w") as f:
+                json.dump(compositions, f)
+        open(checkpoint.results_file, "wb").close()
+        checkpoint.write_state()
+        return checkpoint
+
+    @classmethod
+    def load(cls, state_file):
+        with open(state_file, "r") as f:
+            state = json.load(f)
+        return cls(os.path.basename(state_file)[:-len(".json")], state)
+
+    @classmethod
+    def list_checkpoints(cls):
+        """returns the checkpoints of interrupted sweeps, newest first."""
+        if not os.path.isdir(cls.directory):
+            return []
+        checkpoints = []
+        for file_name in sorted(os.listdir(cls.directory), reverse=True):
+            if file_name.endswith(".json") and not file_name.endswith(".compositions.json"):
+                try:
+                    checkpoints.append(cls.load(os.path.join(cls.directory, file_name)))
+                except (OSError, json.JSONDecodeError) as e:
+                    print(f"Error reading checkpoint {file_name}: {e}")
+        return checkpoints
+
+    @property
+    def state_file(self):
+        return os.path.join(self.directory, f"{self.checkpoint_id}.json")
+
+    @property
+    def compositions_file(self):
+        return os.path.join(self.directory, f"{self.checkpoint_id}.compositions.json")
+
+    @property
+    def results_file(self):
+        return os.path.join(self.directory, f"{self.checkpoint_id}.results.jsonl")
+
+    @property
+    def position(self):
+        return self.state["position"]
+
+    @property
+    def count_meeting_criteria(self):
+        return self.state["count_meeting_criteria"]
+
+    @property
+    def restriction_values(self):
+        return self.state["restriction_values"]
+
+    @property
+    def cursor(self):
+        """where the sampled compositions after position come from, None for listed compositions."""
+        cursor = self.state.get("cursor")
+        return tuple(cursor) if cursor is not None else None
+
+    def rules(self):
+        """returns the RuleRegistry the sweep was started with, None for the shipped rules or a checkpoint older
+        than the record of them."""
+        specs = self.state.get("rules")
+        return RuleRegistry.from_specs(specs) if specs is not None else None
+
+    def sink(self):
+        """returns the sink of the sweep restored from its saved state, or None."""
+        spec = self.state.get("sink")
+        if not spec:
+            return None
+        sink = from_spec(spec)
+        sink.load(self.state.get("sink_state", {}))
+        return sink
+
+    def description(self):
+        return f"{self.state['label']} | {self.state['position']} of {self.state['total']} alloys | {self.state['created']}"
+
+    def compositions(self):
+        if self.state.get("lattice"):
+            return CompositionLattice.from_spec(self.state["lattice"])
+        if self.state.get("sampled"):
+            return SampledCompositions.from_spec(self.state["sampled"])
+        with open(self.compositions_file, "r") as f:
+            return json.load(f)
+
+    def open_results(self):
+        """opens the results file for appending, dropping anything written after the last checkpoint."""
+        results = open(self.results_file, "r+b" if os.path.exists(self.results_file) else "w+b")
+        results.truncate(self.state["results_bytes"])
+        results.seek(self.state["results_bytes"])
+        return results
+
+    def save(self, position, count_meeting_criteria, results, sink=None, cursor=None):
+        """flushes the results file to disk and records the position it is valid up to, with the cursor of the
+        sampled compositions after it."""
+        results.flush()
+        os.fsync(results.fileno())
+        self.state["position"] = position
+        if cursor is not None:
+            self.state["cursor"] = list(cursor)
+        self.state["count_meeting_criteria"] = count_meeting_criteria
+        self.state["results_bytes"] = results.tell()
+        if sink is not None:
+            self.state["sink_state"] = sink.dump()
+        self.write_state()
+
+    def write_state(self):
+        # write-then-rename, so a crash never leaves a half written state file behind
+        temp_file = self.state_file + ".tmp"
+        with open(temp_file, "w") as f:
+            json.dump(self.state, f)
+        os.replace(temp_file, self.state_file)
+
+    def finish(self):
+        """removes the checkpoint of a completed sweep, the results file is kept for the caller."""
+        for file_path in (self.state_file, self.compositions_file):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def discard(self):
+        self.finish()
+        if os.path.exists(self.results_file):
+            os.remove(self.results_file)
\ No newline at end of file
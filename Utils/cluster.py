@@ -0,0 +1,223 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/cluster.py
+#
+# Run from the root directory of HEAPP on every machine that should calculate a shard of a distributed sweep:
+#   python -m Utils.cluster --host 192.168.1.10 --port 50617 --authkey <key shown by the coordinator> --processes 8
+
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import Listener, Client
+
+from Utils.jobs import calculate_chunk
+from Utils.lattice import CompositionLattice
+from Utils.result_set import ResultSet
+
+DEFAULT_PORT = 50617
+SHARD_SIZE = 20000  # compositions per shard, a few seconds of one process
+LEASE_TIMEOUT = 300.0  # seconds before the shard of a worker that went silent is handed to another one
+MAX_ATTEMPTS = 3  # leases of one shard before the sweep fails
+CONNECT_TIMEOUT = 30.0  # seconds a worker keeps trying to reach the coordinator
+WAIT = 0.5  # seconds a worker waits when every remaining shard is leased
+
+class Coordinator:
+    """hands the shards of a grid sweep, rank ranges of its CompositionLattice, to workers connecting over TCP and
+    merges the blocks they send back into one ResultSet, in rank order.
+
+    Every shard a worker takes is a lease: when the worker disconnects, reports an error or its lease runs out,
+    the shard goes back to the queue for another worker, up to MAX_ATTEMPTS times. A shard done twice, by a slow
+    worker whose lease had expired, counts once. Connections are authenticated with authkey, the same key the
+    workers are started with, so that no one else can send the pickled messages multiprocessing.connection uses.
+    """
+
+    def __init__(self, selected_elements, step_size, restriction_values, rules=(), address=("0.0.0.0", DEFAULT_PORT),
+                 authkey=b"", shard_size=SHARD_SIZE, lease_timeout=LEASE_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+        self.lattice = CompositionLattice(selected_elements, step_size)
+        self.sweep = (dict(selected_elements), step_size, restriction_values or {},
+                      [rule.spec() for rule in rules] or None, False)  # workers evaluate the coordinator's rules
+        self.sweep_id = f"sweep-{os.getpid()}-{time.time():.6f}"
+        self.address = address
+        self.authkey = authkey
+        self.shard_size = shard_size
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.shards = [(start, min(start + shard_size, len(self.lattice)))
+                       for start in range(0, len(self.lattice), shard_size)]
+        self.queue = collections.deque(range(len(self.shards)))
+        self.leases = {}  # shard -> (worker, deadline)
+        self.attempts = [0] * len(self.shards)
+        self.blocks = {}  # shard -> (at%, values) of shards done ahead of the next one to merge
+        self.merged = 0  # shards merged into the result set
+        self.result_set = ResultSet(rules)
+        self.calculated = 0
+        self.workers = 0
+        self.error = None
+        self.backend_message = None  # why a worker gave its numba backend up
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.listener = None
+        self.worker_ids = itertools.count(1)
+        if not self.shards:
+            self.finished.set()
+
+    def start(self):
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def stop(self):
+        self.finished.set()
+        if self.listener is not None:
+            self.listener.close()
+
+    def accept(self):
+        while not self.finished.is_set():
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                continue  # a closed listener ends the loop, a client with a wrong key is dropped
+            threading.Thread(target=self.serve, args=(connection,), daemon=True).start()
+
+    def serve(self, connection):
+        worker = next(self.worker_ids)
+        with self.lock:
+            self.workers += 1
+        try:
+            while True:
+                while not connection.poll(0.2):
+                    if self.finished.is_set():
+                        connection.send(("done",))
+                        return
+                message = connection.recv()
+                if message[0] == "result":
+                    self.complete(worker, *message[1:])
+                elif message[0] == "error":
+                    self.release(worker, message[1])
+                connection.send(self.lease(worker))
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.release(worker)
+            with self.lock:
+                self.workers -= 1
+            connection.close()
+
+    def lease(self, worker):
+        """the next message for a worker asking for work: a shard, wait or done."""
+        with self.lock:
+            if self.finished.is_set():
+                return ("done",)
+            now = time.time()
+            for shard, (holder, deadline) in list(self.leases.items()):
+                if deadline < now:
+                    del self.leases[shard]
+                    self.retry(shard)
+            if not self.queue:
+                return ("wait", WAIT)
+            shard = self.queue.popleft()
+            self.attempts[shard] += 1
+            self.leases[shard] = (worker, now + self.lease_timeout)
+            start, stop = self.shards[shard]
+            return ("shard", (self.sweep_id, start, stop) + self.sweep)
+
+    def release(self, worker, start=None):
+        """puts the shards a worker holds back in the queue, only the one starting at start if given."""
+        with self.lock:
+            for shard, (holder, _) in list(self.leases.items()):
+                if holder == worker and (start is None or self.shards[shard][0] == start):
+                    del self.leases[shard]
+                    self.retry(shard)
+
+    def retry(self, shard):
+        if self.attempts[shard] >= self.max_attempts:
+            self.error = f"The shard of ranks {self.shards[shard][0]}..{self.shards[shard][1]} failed " \
+                         f"{self.attempts[shard]} times"
+            self.finished.set()
+        else:
+            self.queue.appendleft(shard)
+
+    def complete(self, worker, sweep_id, start, size, at_percents, values, backend_message=None, peak_bytes=None):
+        # peak_bytes sizes the chunks of the job queue, shards have a fixed size
+        with self.lock:
+            if backend_message:
+                self.backend_message = backend_message
+            shard = start // self.shard_size if sweep_id == self.sweep_id else None
+            if shard is None or shard < self.merged or shard in self.blocks:
+                return  # a late duplicate of a shard another worker did
+            self.leases.pop(shard, None)
+            if shard in self.queue:
+                self.queue.remove(shard)
+            self.blocks[shard] = (at_percents, values)
+            self.calculated += size
+            while self.merged in self.blocks:
+                at_percents, values = self.blocks.pop(self.merged)
+                if len(at_percents):
+                    self.result_set.append_batch(self.lattice.elements, at_percents, values)
+                self.merged += 1
+            if self.merged == len(self.shards):
+                self.finished.set()
+
+    def progress(self):
+        """(alloys calculated, alloys of the sweep, connected workers)."""
+        return self.calculated, len(self.lattice), self.workers
+
+def run_worker(address, authkey, connect_timeout=CONNECT_TIMEOUT):
+    """calculates shards for the coordinator at address until it has none left."""
+    deadline = time.time() + connect_timeout
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+    with connection:
+        connection.send(("ready",))
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                return
+            if message[0] == "done":
+                return
+            if message[0] == "wait":
+                time.sleep(message[1])
+                connection.send(("ready",))
+                continue
+            task = message[1]
+            try:
+                connection.send(("result",) + calculate_chunk(task))
+            except Exception as e:
+                print(f"Error calculating ranks {task[1]}..{task[2]}: {e}")
+                connection.send(("error", task[1]))
+
+def start_workers(address, authkey, processes):
+    """starts processes worker processes, e.g. the local stand-ins for machines."""
+    workers = [multiprocessing.Process(target=run_worker, args=(address, authkey), daemon=True)
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculates shards of a distributed HEAPP sweep.")
+    parser.add_argument("--host", required=True, help="address of the machine running the coordinator")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--authkey", required=True, help="the key the coordinator shows")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="worker processes on this machine")
+    args = parser.parse_args(argv)
+    workers = start_workers((args.host, args.port), args.authkey.encode(), args.processes)
+    for worker in workers:
+        worker.join()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,109 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/composition_model.py
+
+import numpy as np
+
+FIELDS = ("atomic_ratio", "atomic_percent", "weight_percent", "weight")
+FORMATS = {"atomic_ratio": "{:.4f}", "atomic_percent": "{:.4f}", "weight_percent": "{:.4f}", "weight": "{:.5f}"}
+
+def _normalize(values, scale):
+    """scales values, or each row of a 2-D array, so that they sum up to scale, zeros where they sum up to zero."""
+    total = values.sum(axis=-1, keepdims=True)
+    return np.divide(values * scale, total, out=np.zeros_like(values, dtype=float), where=total != 0)
+
+def _relative_to_max(values):
+    """divides values by their maximum, or returns zeros if the maximum is zero."""
+    max_value = values.max(initial=0)
+    if max_value == 0:
+        return np.zeros_like(values)
+    return values / max_value
+
+def weight_to_atomic_percent(weight_percents, atomic_weights):
+    """the at% of wt%, one composition or an (alloys, elements) array converted in one step."""
+    return _normalize(np.asarray(weight_percents, dtype=float) / atomic_weights, 100)
+
+def atomic_to_weight_percent(atomic_percents, atomic_weights):
+    """the wt% of at%, one composition or an (alloys, elements) array converted in one step."""
+    return _normalize(atomic_weights * np.asarray(atomic_percents, dtype=float), 100)
+
+class CompositionModel:
+    """holds the at. ratio, at%, wt% and mass of the selected elements as numeric arrays."""
+
+    def __init__(self):
+        self.elements = []
+        self.atomic_weights = np.zeros(0)
+        self.values = {field: np.zeros(0) for field in FIELDS}
+        self.total_weight = 0.0
+        self.rendered = {}
+
+    def add_element(self, element, atomic_weight):
+        self.elements.append(element)
+        self.atomic_weights = np.append(self.atomic_weights, float(atomic_weight))
+        for field in FIELDS:
+            self.values[field] = np.append(self.values[field], 0.0)
+
+    def remove_element(self, element):
+        index = self.elements.index(element)
+        self.elements.pop(index)
+        self.atomic_weights = np.delete(self.atomic_weights, index)
+        for field in FIELDS:
+            self.values[field] = np.delete(self.values[field], index)
+            self.rendered.pop((element, field), None)
+
+    def clear(self):
+        for element in list(self.elements):
+            self.remove_element(element)
+
+    def set_value(self, element, field, value):
+        """sets the value of one element and updates the other representations from field."""
+        self.values[field][self.elements.index(element)] = value
+        self.update_from(field)
+
+    def set_values(self, field, values):
+        """sets the values of several elements at once and updates the other representations from field."""
+        for element, value in values.items():
+            self.values[field][self.elements.index(element)] = value
+        self.update_from(field)
+
+    def set_total_weight(self, total_weight):
+        self.total_weight = total_weight
+        self.values["weight"] = self.total_weight * self.values["weight_percent"] / 100
+
+    def update_from(self, field):
+        """recomputes every representation from the given input field in one vectorized pass."""
+        if field == "weight":
+            self.total_weight = float(self.values["weight"].sum())
+            self.values["weight_percent"] = _normalize(self.values["weight"], 100)
+            field = "weight_percent"
+        if field == "atomic_ratio":
+            self.values["atomic_percent"] = _normalize(self.values["atomic_ratio"], 100)
+        elif field == "weight_percent":
+            self.values["atomic_percent"] = weight_to_atomic_percent(self.values["weight_percent"], self.atomic_weights)
+            self.values["atomic_ratio"] = _relative_to_max(self.values["atomic_percent"])
+        elif field == "atomic_percent":
+            self.values["atomic_ratio"] = _relative_to_max(self.values["atomic_percent"])
+
+        if field != "weight_percent":
+            self.values["weight_percent"] = atomic_to_weight_percent(self.values["atomic_percent"], self.atomic_weights)
+        self.values["weight"] = self.total_weight * self.values["weight_percent"] / 100
+
+    def totals(self):
+        """returns the total at% and wt% of the composition."""
+        return float(self.values["atomic_percent"].sum()), float(self.values["weight_percent"].sum())
+
+    def changed_texts(self, skip_field=None):
+        """yields (element, field, text) for every value whose formatted text changed since the last call."""
+        for field in FIELDS:
+            for element, value in zip(self.elements, self.values[field]):
+                if field == skip_field:
+                    # the widget shows what the user typed, so it has to be rewritten once the field is no longer the input
+                    self.rendered.pop((element, field), None)
+                    continue
+                text = FORMATS[field].format(value)
+                if self.rendered.get((element, field)) != text:
+                    self.rendered[(element, field)] = text
+                    yield element, field, text
\ No newline at end of file
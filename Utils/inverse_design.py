@@ -0,0 +1,156 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/inverse_design.py
+
+import numpy as np
+
+# typical spread of each descriptor, puts violations of different targets on one scale
+SCALES = {"density": 25, "delta": 50, "gamma": 2, "enthalpy_of_mixing": 150, "vec": 12, "mixing_entropy": 20,
+          "melting_temp": 4000, "omega": 10}
+
+def project_to_simplex(points, lower, upper, iterations=60):
+    """projects each row onto {lower <= x <= upper, sum(x) = 1} by bisecting the shift of clip(x - shift)."""
+    low = (points - upper).min(axis=1) - 1
+    high = (points - lower).max(axis=1) + 1
+    for _ in range(iterations):
+        shift = (low + high) / 2
+        total = np.clip(points - shift[:, None], lower, upper).sum(axis=1)
+        too_large = total > 1
+        low = np.where(too_large, shift, low)
+        high = np.where(too_large, high, shift)
+    return np.clip(points - ((low + high) / 2)[:, None], lower, upper)
+
+def violation(values, restriction_values):
+    """sum of how far each composition is outside the filter's ranges, 0 for compositions meeting all of them.
+    Verdicts are compared as codes, restriction_values as from Engine.encode_restrictions."""
+    total = np.zeros(len(values["density"]))
+    for property, restriction in restriction_values.items():
+        if isinstance(restriction, dict):
+            scale = SCALES.get(property, 1)
+            total += np.maximum(float(restriction["min"]) - values[property], 0) / scale
+            total += np.maximum(values[property] - float(restriction["max"]), 0) / scale
+        else:
+            total += values[property] != restriction
+    return total
+
+def grid_size(lower, upper, step):
+    """number of compositions a full grid sweep with this step size would calculate, lower/upper in at%."""
+    n = int(round(100 / step))
+    counts = np.zeros(n + 1, dtype=object)
+    counts[0] = 1
+    for low, high in zip(lower, upper):
+        low, high = int(np.ceil(low / step)), int(np.floor(high / step))
+        new = np.zeros(n + 1, dtype=object)
+        for units in range(low, high + 1):
+            new[units:] += counts[:n + 1 - units]
+        counts = new
+    return int(counts[n])
+
+def diverse_subset(points, count, min_distance):
+    """greedy max-min selection of at most count rows that are at least min_distance apart (L1)."""
+    if not len(points):
+        return []
+    chosen = [0]
+    distances = np.abs(points - points[0]).sum(axis=1)
+    while len(chosen) < count:
+        candidate = int(distances.argmax())
+        if distances[candidate] < min_distance:
+            break
+        chosen.append(candidate)
+        distances = np.minimum(distances, np.abs(points - points[candidate]).sum(axis=1))
+    return chosen
+
+class InverseDesign:
+    """differential evolution over the composition simplex toward the filter's target ranges.
+
+    Every generation is evaluated with one Engine.calculate_batch call, trials replace their parent when they are
+    at least as close to the targets, so feasible members keep drifting through the feasible region. Feasible
+    compositions are archived at a resolution, see diverse_results().
+    """
+
+    def __init__(self, engine, elements, lower, upper, restriction_values, population=60, generations=100,
+                 mutation=0.6, crossover=0.8, resolution=0.5, seed=None):
+        self.engine = engine
+        self.elements = list(elements)
+        self.lower = np.asarray(lower, dtype=float) / 100
+        self.upper = np.asarray(upper, dtype=float) / 100
+        if self.lower.sum() > 1 or self.upper.sum() < 1:
+            raise ValueError("The element ranges do not allow a composition that sums up to 100%.")
+        self.restriction_values = restriction_values
+        self.population_size = population
+        self.generations = generations
+        self.mutation = mutation
+        self.crossover = crossover
+        self.resolution = resolution / 100
+        self.rng = np.random.default_rng(seed)
+        self.evaluations = 0
+        self.archive = {}  # feasible compositions, keyed by their rounding to the resolution
+
+    def evaluate(self, points):
+        values, _ = self.engine.calculate_batch(self.elements, points, self.restriction_values)
+        self.evaluations += len(points)
+        scores = violation(values, self.engine.encode_restrictions(self.restriction_values))
+        for point in points[scores == 0]:
+            self.archive.setdefault(tuple(np.round(point / self.resolution).astype(int)), point)
+        return scores
+
+    def run(self, progress=None, stop=lambda: False):
+        """runs the generations, progress(generation) is called after each of them."""
+        k = len(self.elements)
+        population = project_to_simplex(self.rng.dirichlet(np.ones(k), self.population_size), self.lower, self.upper)
+        scores = self.evaluate(population)
+        for generation in range(1, self.generations + 1):
+            if stop():
+                break
+            # DE/rand/1/bin, three distinct partners other than the member itself
+            keys = self.rng.random((self.population_size, self.population_size))
+            np.fill_diagonal(keys, np.inf)
+            partners = np.argsort(keys, axis=1)[:, :3]
+            a, b, c = (population[partners[:, i]] for i in range(3))
+            mutant = a + self.mutation * (b - c)
+            cross = self.rng.random((self.population_size, k)) < self.crossover
+            cross[np.arange(self.population_size), self.rng.integers(0, k, self.population_size)] = True
+            trial = project_to_simplex(np.where(cross, mutant, population), self.lower, self.upper)
+            trial_scores = self.evaluate(trial)
+            better = trial_scores <= scores
+            population[better] = trial[better]
+            scores[better] = trial_scores[better]
+            if progress:
+                progress(generation)
+        return population, scores
+
+    def diverse_results(self, count, min_distance=None):
+        """returns up to count archived feasible compositions, as at% rows spread over the feasible region."""
+        points = np.array(list(self.archive.values()))
+        if min_distance is None:
+            min_distance = 2 * self.resolution
+        return [points[i] * 100 for i in diverse_subset(points, count, min_distance)]
+
+def round_to_step(at_percents, step, lower=None, upper=None):
+    """rounds at% values to multiples of step that still sum up to 100 and stay within the lower/upper at% bounds,
+    the units missing or left over going to or from the largest remainders first. Returns None when no multiples
+    of step within the bounds sum up to 100."""
+    units = np.asarray(at_percents, dtype=float) / step
+    total = int(round(100 / step))
+    low = np.zeros(len(units)) if lower is None else np.ceil(np.asarray(lower, dtype=float) / step - 1e-9)
+    high = np.full(len(units), total) if upper is None else np.floor(np.asarray(upper, dtype=float) / step + 1e-9)
+    if np.any(low > high) or low.sum() > total or high.sum() < total:
+        return None
+    rounded = np.clip(np.floor(units), low, high)
+    while rounded.sum() < total:
+        room = np.flatnonzero(rounded < high)
+        rounded[room[np.argmax((units - rounded)[room])]] += 1
+    while rounded.sum() > total:
+        room = np.flatnonzero(rounded > low)
+        rounded[room[np.argmin((units - rounded)[room])]] -= 1
+    return rounded * step
+
+def within_bounds(at_percents, lower, upper, tolerance=1e-9):
+    """True when at% values sum up to 100 and lie within the lower/upper at% bounds."""
+    at_percents = np.asarray(at_percents, dtype=float)
+    return bool(abs(at_percents.sum() - 100) <= 100 * tolerance and
+                np.all(at_percents >= np.asarray(lower, dtype=float) - tolerance) and
+                np.all(at_percents <= np.asarray(upper, dtype=float) + tolerance))
\ No newline at end of file
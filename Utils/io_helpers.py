@@ -7,6 +7,8 @@
 
 import json
 import os
+import re
+import pandas as pd
 
 def read_json(file_path):
     """reads a JSON file and returns its content."""
@@ -26,16 +28,73 @@ def write_json(data, file_path):
         print(f"Error writing to JSON file {file_path}: {e}")
 
 def read_results_in_chunks(file_path, chunk_size=100):
-    """yields data from a JSON file in chunks."""
+    """yields [values, alloy_name] rows of a JSON lines results file in chunks."""
     try:
         with open(file_path, 'r') as file:
-            data = json.load(file)
-            for i in range(0, len(data), chunk_size):
-                yield data[i:i + chunk_size]
+            chunk = []
+            for line in file:
+                chunk.append(json.loads(line))
+                if len(chunk) == chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Error reading JSON file {file_path} in chunks: {e}")
         return []
 
+def read_compositions_from_excel(file_path):
+    """reads the alloy compositions of an Excel file as a list of {element: at%} dicts, each normalized to 100."""
+    try:
+        df = pd.read_excel(file_path)
+
+        compositions = []
+        composition_columns = find_composition_columns(df)
+
+        for index, row in df.iterrows():
+            composition = parse_composition_row(row, composition_columns)
+            compositions.append(composition)
+
+        return compositions
+    except Exception as e:
+        print(f"Error reading Excel file: {e}")
+        return []
+
+def parse_composition_row(row, composition_columns):
+    """parses an alloy formula such as Co20Cr20Fe20Mn20Ni20, AlCoCrFeNi2.1 or Al0.5CoCrFeNi into an
+    {element: at%} dict, the ratios normalized to 100 and a missing ratio counted as 1."""
+    composition = {}
+    for col in composition_columns:
+        elements = re.findall(r'([A-Z][a-z]?)(\d*\.?\d*)', str(row[col]))
+        ratios = {}
+        for element, ratio in elements:
+            ratios[element] = ratios.get(element, 0.0) + (float(ratio) if ratio not in ("", ".") else 1.0)
+        total_ratio = sum(ratios.values())
+        if total_ratio > 0:
+            composition = {element: ratio / total_ratio * 100.0 for element, ratio in ratios.items()}
+    return composition
+
+def find_composition_columns(df):
+    """finds the columns of a DataFrame that hold alloy formulas."""
+    possible_headers = [
+        "FORMULA",
+        "IDENTIFIER",
+        "ALLOY",
+        "COMPOSITION",
+        "COMPOSITION: Formula",
+        "COMPOSITION: Elements"
+        # Add more possible headers as needed
+    ]
+
+    composition_columns = []
+    for col in df.columns:
+        for header in possible_headers:
+            if header.lower() in str(col).lower():
+                composition_columns.append(col)
+                break
+
+    return composition_columns
+
 def file_exists(file_path):
     """checks if a file exists."""
     return os.path.exists(file_path)
\ No newline at end of file
@@ -0,0 +1,164 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/jobs.py
+
+import os
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from engine import Engine
+from Utils.checkpoint import Checkpoint
+from Utils.lattice import CompositionLattice
+from Utils.rules import SHIPPED_RULES, RuleRegistry
+from Utils.summary import SummaryStatistics
+from Workers.composition_generation import generate_compositions
+
+JOBS_DIR = "Data/jobs"
+QUEUED, RUNNING, PAUSED, DONE, CANCELLED, FAILED = "queued", "running", "paused", "done", "cancelled", "failed"
+CHUNK_SIZE = 5000  # most compositions one pool task calculates
+MIN_CHUNK_SIZE = 500
+
+def bytes_per_alloy(elements):
+    """estimated peak memory of calculate_batch() per composition, the pair terms grow with the square of the
+    number of elements. tracemalloc measures about 260 bytes for 5 elements."""
+    return 300 + 16 * elements * elements
+
+def chunk_size(elements, processes, memory_mb, alloy_bytes=None):
+    """compositions per pool task, so that processes tasks of a job take about memory_mb together, by the peak
+    bytes per alloy measured in its chunks or, until one of them is back, by bytes_per_alloy()."""
+    size = memory_mb * 2 ** 20 // (processes * (alloy_bytes or bytes_per_alloy(elements)))
+    return int(min(max(size, MIN_CHUNK_SIZE), CHUNK_SIZE))
+
+def chunk_limit(processes, memory_mb, chunk_bytes):
+    """how many chunks of chunk_bytes a job may have in flight: at most processes and only as many as fit into
+    memory_mb, but one even if a chunk of MIN_CHUNK_SIZE takes more."""
+    return int(max(1, min(processes, memory_mb * 2 ** 20 // chunk_bytes)))
+
+class Job(Checkpoint):
+    """a sweep of the job queue: the {element: (start, end)} ranges and step of a grid sweep with its filter and
+    ranking, its priority, process and memory limits and a status. A job is a checkpoint in JOBS_DIR, state and results
+    file, its compositions are not stored: chunks are rank ranges of its CompositionLattice, unranked by the
+    process calculating them. The results file of a finished job holds its results, or the shortlist of its sink.
+    """
+
+    directory = JOBS_DIR
+
+    @classmethod
+    def create(cls, selected_elements, step_size, restriction_values, label="", sink=None, priority=0, processes=1,
+               memory_mb=512, rules=None):
+        os.makedirs(cls.directory, exist_ok=True)
+        job_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        job = cls(job_id, {
+            "label": label,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "restriction_values": restriction_values or {},
+            "total": len(CompositionLattice(selected_elements, step_size)),
+            "position": 0,
+            "count_meeting_criteria": 0,
+            "results_bytes": 0,
+            "sink": sink.spec() if sink is not None else None,
+            "sink_state": {},
+            "elements": {el: list(at_range) for el, at_range in selected_elements.items()},
+            "step_size": step_size,
+            "rules": rules.specs() if rules is not None else None,  # the threshold set the job was added with
+            "priority": priority,
+            "processes": processes,
+            "memory_mb": memory_mb,  # what its chunks in flight may take together, see JobRun
+            "status": QUEUED,
+            "message": "",
+        })
+        open(job.results_file, "wb").close()
+        job.write_state()
+        return job
+
+    @classmethod
+    def list_jobs(cls):
+        """returns the jobs in the order they were added."""
+        return cls.list_checkpoints()[::-1]
+
+    @property
+    def status(self):
+        return self.state["status"]
+
+    @property
+    def priority(self):
+        return self.state["priority"]
+
+    @property
+    def processes(self):
+        return self.state["processes"]
+
+    @property
+    def memory_mb(self):
+        return self.state["memory_mb"]
+
+    def set_status(self, status, message=""):
+        self.state["status"] = status
+        self.state["message"] = message
+        self.write_state()
+
+    def compositions(self):
+        return generate_compositions(self.state["elements"], self.state["step_size"])
+
+    def lattice(self):
+        return CompositionLattice(self.state["elements"], self.state["step_size"])
+
+    def chunk_size(self, alloy_bytes=None):
+        return chunk_size(len(self.state["elements"]), self.processes, self.memory_mb, alloy_bytes)
+
+    def description(self):
+        return f"{self.state['label']} | {self.status} | {self.state['position']} of {self.state['total']} alloys"
+
+_engine = None
+_lattices = {}  # job id -> CompositionLattice, so that a worker process builds the tables of a job once
+_rule_specs = None  # the rule specs _engine evaluates, None for SHIPPED_RULES
+_chunks = {}  # job id -> chunks of it this process has calculated
+
+def process_engine(rules):
+    """the Engine of this worker process, evaluating the rules of the specs rules, e.g. of a calibrated threshold
+    set, or the shipped ones for None. The tasks of jobs, shards and subset screening carry the specs they need."""
+    global _engine, _rule_specs
+    if _engine is None:
+        _engine = Engine()
+    if rules != _rule_specs:
+        _engine.rules = RuleRegistry.from_specs(rules) if rules is not None else RuleRegistry(SHIPPED_RULES)
+        _rule_specs = rules
+    return _engine
+
+def calculate_chunk(task):
+    """calculates the compositions of ranks start..stop of a job, returns (job id, start, number of compositions,
+    at% and calculate_batch() values of those meeting the criteria, the message of the engine giving its numba
+    backend up or None, the peak bytes the chunk allocated or None). This runs in the worker processes of
+    JobManager, each with its own Engine, verdicts come back as codes so that little has to be sent back.
+    rules are the specs of the rules to evaluate, e.g. of a calibrated threshold set, None for the shipped ones.
+    With summarize the chunk is folded into a SummaryStatistics here, returned in place of the values with None
+    for the at%. The second chunk of every job a process calculates is measured with tracemalloc: the first one
+    pays for compiling and checking the kernels, and tracing slows the numpy path down too much to trace them all.
+    """
+    job_id, start, stop, selected_elements, step_size, restriction_values, rules, summarize = task
+    engine = process_engine(rules)
+    if job_id not in _lattices:
+        _lattices[job_id] = CompositionLattice(selected_elements, step_size)
+    lattice = _lattices[job_id]
+    _chunks[job_id] = _chunks.get(job_id, 0) + 1
+    measure = _chunks[job_id] == 2 and not tracemalloc.is_tracing()
+    if measure:
+        tracemalloc.start()
+    at_percents = lattice.unrank_range(start, stop).astype(float)
+    values, meets_criteria = engine.calculate_batch(lattice.elements, at_percents / 100, restriction_values)
+    if summarize:
+        summary = SummaryStatistics()
+        summary.push_batch(values, meets_criteria, engine.rules)
+        result = None, summary
+    else:
+        result = at_percents[meets_criteria], {key: np.asarray(array)[meets_criteria] for key, array in values.items()}
+    peak_bytes = None
+    if measure:
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return (job_id, start, len(at_percents)) + result + (engine.take_backend_message(), peak_bytes)
\ No newline at end of file
@@ -0,0 +1,292 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/kernels.py
+#
+# Set HEAPP_BACKEND=numpy to keep Engine on its numpy path even when Numba is installed.
+
+import ast
+import hashlib
+import importlib.util
+import itertools
+import os
+import sys
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+CRYSTAL_STRUCTURES = ("HCP", "FCC", "BCC", "BCC + FCC")
+KEYS = ("density", "delta", "gamma", "enthalpy_of_mixing", "vec", "mixing_entropy", "omega")
+# the descriptors the scalar kernel returns, in the order of the calculate() values
+SCALAR_KEYS = ("density", "delta", "gamma", "enthalpy_of_mixing", "vec", "mixing_entropy", "melting_temp", "omega",
+               "cstr")
+CHECK_ROWS = 256  # compositions of the first block of an element system also calculated on the numpy path
+KERNELS_DIR = "Data/kernels"  # the generated kernel modules, Numba caches their machine code next to them
+# the calls a rule condition may make, as the numpy functions the numpy path calls for them
+CALLS = {"abs": "np.abs", "sqrt": "np.sqrt", "log": "np.log", "exp": "np.exp", "min": "np.minimum",
+         "max": "np.maximum"}
+
+def backend():
+    """the backend of Engine, "numba" when Numba is installed and not turned off, else "numpy"."""
+    if numba is None or os.environ.get("HEAPP_BACKEND", "auto").lower() == "numpy":
+        return "numpy"
+    return "numba"
+
+# The scalar kernel calculates one alloy after the other with the operations of the numpy path: every sum starts
+# at 0 and adds its terms in element or pair order, so that the results are bit for bit the same. c·ln c comes in
+# as entropy_terms, taken with numpy for the same reason. The conditions of the rules are generated into it.
+_SOURCE = '''import math
+
+import numpy as np
+from numba import njit
+
+@njit(cache=True, nogil=True, error_model="numpy", inline="always")
+def alloy(fractions, entropy_terms, weight, volume, radius, nvalence, melting_point, min_radius, max_radius, pair_i,
+          pair_j, pair_enthalpy, fusion_i, fusion_j, fusion_enthalpy, lowest_formation_enthalpy, R, thresholds):
+    total_weight = 0.0
+    total_volume = 0.0
+    average_radius = 0.0
+    vec = 0.0
+    melting = 0.0
+    entropy = 0.0
+    for i in range(len(fractions)):
+        c = fractions[i]
+        total_weight = total_weight + c * weight[i]
+        total_volume = total_volume + c * volume[i]
+        average_radius = average_radius + c * radius[i]
+        vec = vec + c * nvalence[i]
+        melting = melting + c * melting_point[i]
+        entropy = entropy + entropy_terms[i]
+    density = total_weight / total_volume
+    mismatch = 0.0
+    for i in range(len(fractions)):
+        q = 1 - (radius[i] / average_radius)
+        mismatch = mismatch + fractions[i] * (q * q)
+    delta = math.sqrt(mismatch) * 100
+    smallest = min_radius + average_radius
+    smallest = 1 - math.sqrt(((smallest * smallest) - (average_radius * average_radius)) / (smallest * smallest))
+    largest = max_radius + average_radius
+    largest = 1 - math.sqrt(((largest * largest) - (average_radius * average_radius)) / (largest * largest))
+    gamma = smallest / largest
+    enthalpy_of_mixing = 0.0
+    for p in range(len(pair_enthalpy)):
+        enthalpy_of_mixing = enthalpy_of_mixing + (fractions[pair_i[p]] * fractions[pair_j[p]]) * pair_enthalpy[p]
+    enthalpy_of_mixing = 4 * enthalpy_of_mixing
+    mixing_entropy = -R * entropy
+    melting_temp = math.ceil(melting)
+    omega = (melting_temp * mixing_entropy) / (abs(enthalpy_of_mixing) * 1000) if enthalpy_of_mixing != 0 else 1e10
+    if 2.5 <= vec <= 3.5:
+        cstr = 0
+    elif vec >= 8.0:
+        cstr = 1
+    elif vec <= 6.87:
+        cstr = 2
+    else:
+        cstr = 3
+{descriptors}
+{rules}
+    return (density, delta, gamma, enthalpy_of_mixing, vec, mixing_entropy, melting_temp, omega, cstr{results})
+
+@njit(cache=True, nogil=True, error_model="numpy")
+def pipeline(fractions, entropy_terms, weight, volume, radius, nvalence, melting_point, min_radius, max_radius, pair_i,
+             pair_j, pair_enthalpy, fusion_i, fusion_j, fusion_enthalpy, lowest_formation_enthalpy, R, thresholds, out,
+             melting_temp, cstr, codes, fields):
+    for a in range(fractions.shape[0]):
+        result = alloy(fractions[a], entropy_terms[a], weight, volume, radius, nvalence, melting_point, min_radius,
+                       max_radius, pair_i, pair_j, pair_enthalpy, fusion_i, fusion_j, fusion_enthalpy,
+                       lowest_formation_enthalpy, R, thresholds)
+        out[0, a] = result[0]
+        out[1, a] = result[1]
+        out[2, a] = result[2]
+        out[3, a] = result[3]
+        out[4, a] = result[4]
+        out[5, a] = result[5]
+        melting_temp[a] = result[6]
+        out[6, a] = result[7]
+        cstr[a] = result[8]
+{stores}
+'''
+
+# the lines of the scalar kernel calculating the descriptors only rules use, and the descriptors they need first
+_RULE_DESCRIPTORS = {
+    "lambda_": (["    lambda_ = mixing_entropy / (delta * delta)"], ()),
+    "im_enthalpy": (["    im_enthalpy = 0.0",
+                     "    for p in range(len(fusion_enthalpy)):",
+                     "        im_enthalpy = im_enthalpy + fusion_enthalpy[p] * "
+                     "(fractions[fusion_i[p]] * fractions[fusion_j[p]])",
+                     "    im_enthalpy = 4 * im_enthalpy * 0.09648"], ()),
+    "annealing_temperature": (["    annealing_temperature = melting_temp * 0.6"], ()),
+    "omega_an": (["    omega_an = ((annealing_temperature * mixing_entropy) / (abs(enthalpy_of_mixing) * 1000)",
+                  "                if enthalpy_of_mixing != 0 else 1e10)"], ("annealing_temperature",)),
+    "im_ratio": (["    im_ratio = im_enthalpy / enthalpy_of_mixing if enthalpy_of_mixing != 0 else 1e10"], ("im_enthalpy",)),
+}
+
+def descriptor_source(names):
+    """the lines of the scalar kernel calculating the rule descriptors of names and those they need."""
+    needed = set(names)
+    for name in reversed(list(_RULE_DESCRIPTORS)):
+        if name in needed:
+            needed.update(_RULE_DESCRIPTORS[name][1])
+    return [line for name, (lines, _) in _RULE_DESCRIPTORS.items() if name in needed for line in lines]
+
+class _Fold(ast.NodeTransformer):
+    """replaces the parts of a condition without descriptors, such as 10 ** -2, by their Python value, as the numpy
+    path calculates them with Python numbers, and the calls by the numpy functions."""
+
+    def visit(self, node):
+        if isinstance(node, ast.expr) and not isinstance(node, ast.Constant) and \
+                not any(isinstance(child, ast.Name) for child in ast.walk(node)):
+            value = eval(compile(ast.Expression(node), "<rule>", "eval"), {"__builtins__": {}})
+            return ast.copy_location(ast.Constant(value), node)
+        return super().visit(node)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        node.func = ast.parse(CALLS[node.func.id], mode="eval").body
+        return node
+
+def rule_source(rule, index, offset):
+    """the lines of the scalar kernel giving code{index}, the verdict code of rule, its thresholds taken from
+    thresholds[offset:], so that threshold sets of the same conditions share one kernel."""
+    trees = rule.substitute_thresholds(lambda k, value: ast.parse(f"thresholds[{offset + k}]", mode="eval").body)
+    lines = []
+    if rule.descriptors:
+        lines += [f"    if {' or '.join(f'{name} != {name}' for name in rule.descriptors)}:",
+                  f"        code{index} = 0"]
+    for choice, tree in zip(rule.choices, trees):
+        condition = ast.unparse(ast.fix_missing_locations(_Fold().visit(tree.body)))
+        lines += [f"    {'elif' if lines else 'if'} {condition}:", f"        code{index} = {choice}"]
+    lines += ["    else:" if lines else "    if True:", f"        code{index} = {rule.choices[-1]}"]
+    return lines
+
+def _load(source):
+    """the module of a generated source. It is written to KERNELS_DIR once, named after its hash, so that every
+    process imports the same file and Numba compiles each kernel only once."""
+    name = "pipeline_" + hashlib.sha1(source.encode()).hexdigest()[:16]
+    path = os.path.join(KERNELS_DIR, name + ".py")
+    try:
+        with open(path, encoding="utf-8") as f:
+            written = f.read() == source
+    except OSError:
+        written = False
+    if not written:
+        os.makedirs(KERNELS_DIR, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(source)
+        os.replace(temporary, path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module  # Numba looks the module of a cached kernel up by its name
+    spec.loader.exec_module(module)
+    return module
+
+class Pipeline:
+    """the fused descriptor and rule kernels of a tuple of rules: scalar() calculates one composition, batch() a
+    block, both in one pass over the alloy."""
+
+    modules = {}  # generated source -> module, shared by the pipelines of rules that only differ in thresholds
+
+    def __init__(self, rules):
+        self.rules = rules
+        lines, self.thresholds = [], []
+        for index, rule in enumerate(rules):
+            lines += rule_source(rule, index, len(self.thresholds))
+            self.thresholds += [value for _, value, _ in rule.thresholds()]
+        self.thresholds = np.array(self.thresholds, dtype=float)
+        self.fields = list(dict.fromkeys(name for rule in rules for name in rule.fields))
+        results = [f"code{index}" for index in range(len(rules))] + self.fields
+        stores = [f"        codes[{index}, a] = result[{9 + index}]" for index in range(len(rules))]
+        stores += [f"        fields[{f}, a] = result[{9 + len(rules) + f}]" for f in range(len(self.fields))]
+        names = {name for rule in rules for name in rule.descriptors + rule.fields}
+        source = _SOURCE.format(descriptors="\n".join(descriptor_source(names)), rules="\n".join(lines),
+                                results="".join(", " + name for name in results), stores="\n".join(stores) or "        pass")
+        if source not in Pipeline.modules:
+            Pipeline.modules[source] = _load(source)
+        self.module = Pipeline.modules[source]
+
+    def arguments(self, data, fusion_pairs, R):
+        """the arguments of the kernels after the fractions and their c·ln c terms, for data of one value per
+        element or pair and the (i, j, formation enthalpy) pairs of Engine._fusion_pairs()."""
+        count = len(data["atomic_radius"])
+        pairs = np.array(list(itertools.combinations(range(count), 2)), dtype=np.int64).reshape(-1, 2)
+        fusion = np.array([(i, j) for i, j, _ in fusion_pairs], dtype=np.int64).reshape(-1, 2)
+        fusion_enthalpy = np.asarray(data["fusion_enthalpy"], dtype=float)
+        lowest = float(np.min(fusion_enthalpy)) if len(fusion_enthalpy) else np.nan
+        radius = data["atomic_radius"]
+        return (data["atomic_weight"], data["atomic_volume"], radius, data["nvalence"], data["melting_point"],
+                float(np.min(radius)), float(np.max(radius)), pairs[:, 0], pairs[:, 1],
+                np.asarray(data["mixing_enthalpy"], dtype=float),
+                fusion[:, 0], fusion[:, 1], fusion_enthalpy, lowest, float(R), self.thresholds)
+
+    def scalar(self, fractions, arguments):
+        """(descriptors, verdict codes, fields) of one composition, fractions a 1-d array."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entropy_terms = np.where(fractions == 0, 0.0, fractions * np.log(fractions))
+        result = self.module.alloy(fractions, entropy_terms, *arguments)
+        return result[:9], result[9:9 + len(self.rules)], result[9 + len(self.rules):]
+
+    def batch(self, fractions, columns, arguments):
+        """the values of Engine.calculate_batch() of a block, fractions an (n, elements) array and columns its
+        columns."""
+        n, count = fractions.shape
+        entropy_terms = np.empty((n, count))
+        for i, c in enumerate(columns):
+            entropy_terms[:, i] = np.where(c == 0, 0.0, c * np.log(c))
+        out = np.empty((len(KEYS), n))
+        melting_temp = np.empty(n, dtype=np.int64)
+        cstr = np.empty(n, dtype=np.uint8)
+        codes = np.empty((len(self.rules), n), dtype=np.uint8)
+        fields = np.empty((len(self.fields), n))
+        self.module.pipeline(np.ascontiguousarray(fractions), entropy_terms, *arguments, out, melting_temp, cstr,
+                             codes, fields)
+        values = {key: out[k] for k, key in enumerate(KEYS[:6])}
+        values["melting_temp"] = melting_temp
+        values["omega"] = out[6]
+        values["cstr"] = np.array(CRYSTAL_STRUCTURES, dtype=object)[cstr]
+        for index, rule in enumerate(self.rules):
+            values[rule.key] = codes[index]
+            for name in rule.fields:
+                values[name] = fields[self.fields.index(name)]
+        return values
+
+_pipelines = {}  # tuple of rules -> Pipeline
+
+def pipeline(rules):
+    """the Pipeline of a tuple of rules, generated and compiled on first use."""
+    if rules not in _pipelines:
+        _pipelines[rules] = Pipeline(rules)
+    return _pipelines[rules]
+
+def identical(values, reference):
+    """True when two values dicts hold the same keys in the same order and bit for bit the same arrays."""
+    if list(values) != list(reference):
+        return False
+    for key, array in reference.items():
+        other = values[key]
+        if array.dtype == object:
+            if not np.array_equal(other, array):
+                return False
+        elif other.dtype != array.dtype or other.tobytes() != array.tobytes():
+            return False
+    return True
+
+def same_row(result, reference):
+    """True when two (values, meets_criteria) of calculate() hold the same keys in the same order and the same
+    texts and, bit for bit, numbers."""
+    (values, meets_criteria), (reference_values, reference_meets) = result, reference
+    if list(values) != list(reference_values) or meets_criteria != reference_meets:
+        return False
+    for key, value in reference_values.items():
+        if isinstance(value, str) or isinstance(values[key], str):
+            if values[key] != value:
+                return False
+        elif np.float64(values[key]).tobytes() != np.float64(value).tobytes():
+            return False
+    return True
\ No newline at end of file
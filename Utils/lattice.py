@@ -0,0 +1,122 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/lattice.py
+
+import bisect
+import itertools
+
+import numpy as np
+
+class CompositionLattice:
+    """the compositions of a grid sweep, numbered 0..len-1 in the order generate_compositions() lists them, without
+    generating them. Each element takes the values of range(start, end + 1, step) of its (start, end) at% range and
+    the compositions are the value combinations that sum up to 100, in itertools.product order.
+
+    The numbering is the combinatorial number system generalised to bounded ranges: below[i][s][k] counts the
+    compositions of elements i.. summing up to s whose element i has a value before its k-th, so the rank of a
+    composition is a sum of E table entries and a rank turns back into a composition with one binary search per
+    element. Sweeps become rank ranges: split into shards, sampled, or resumed from a single integer.
+    """
+
+    def __init__(self, selected_elements, step_size, total=100):
+        self.selected_elements = {el: (start, end) for el, (start, end) in selected_elements.items()}
+        self.elements = list(selected_elements)
+        self.step = int(step_size)
+        self.values = [list(range(int(start), int(end) + 1, self.step)) for start, end in selected_elements.values()]
+        self.total = total
+        # ways[i][s]: compositions of elements i.. summing up to s
+        ways = [[0] * (total + 1) for _ in range(len(self.values))] + [[1] + [0] * total]
+        for i in reversed(range(len(self.values))):
+            for s in range(total + 1):
+                ways[i][s] = sum(ways[i + 1][s - v] for v in self.values[i] if 0 <= s - v)
+        self.below = [[list(itertools.accumulate((ways[i + 1][s - v] if 0 <= s - v else 0 for v in values), initial=0))
+                       for s in range(total + 1)] for i, values in enumerate(self.values)]
+        self.size = ways[0][total] if self.values else 0
+        self._tables = None
+
+    def __len__(self):
+        return self.size
+
+    def spec(self):
+        return {"kind": "lattice", "elements": {el: list(at_range) for el, at_range in self.selected_elements.items()},
+                "step": self.step, "total": self.total}
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec["elements"], spec["step"], spec["total"])
+
+    def rank(self, composition):
+        """the rank of a composition, a {element: at%} dict or the at% in the order of elements. Raises ValueError
+        for compositions not on the lattice."""
+        at_percents = [composition[el] for el in self.elements] if isinstance(composition, dict) else list(composition)
+        if len(at_percents) != len(self.elements):
+            raise ValueError(f"Expected {len(self.elements)} at% values, got {len(at_percents)}")
+        rank, remaining = 0, self.total
+        for i, at_p in enumerate(at_percents):
+            values = self.values[i]
+            k = int((at_p - values[0]) // self.step) if values else -1
+            if not (0 <= k < len(values) and values[k] == at_p and at_p <= remaining):
+                raise ValueError(f"{self.elements[i]}{at_p:g} is not on the lattice")
+            rank += self.below[i][remaining][k]
+            remaining -= at_p
+        if remaining:
+            raise ValueError("The composition does not sum up to 100")
+        return rank
+
+    def unrank(self, rank):
+        """the {element: at%} of a rank."""
+        if not 0 <= rank < self.size:
+            raise IndexError(f"Rank {rank} is outside of 0..{self.size - 1}")
+        composition, remaining = {}, self.total
+        for i, element in enumerate(self.elements):
+            below = self.below[i][remaining]
+            k = bisect.bisect_right(below, rank) - 1  # the last value with fewer compositions before it than rank
+            rank -= below[k]
+            composition[element] = self.values[i][k]
+            remaining -= self.values[i][k]
+        return composition
+
+    def unrank_many(self, ranks):
+        """the (len(ranks), elements) integer at% array of an array of ranks, unranked together with numpy."""
+        ranks = np.asarray(ranks, dtype=np.int64)
+        if ranks.size and (ranks.min() < 0 or ranks.max() >= self.size):
+            raise IndexError(f"Ranks outside of 0..{self.size - 1}")
+        if self.size >= 2 ** 63:
+            return np.array([list(self.unrank(int(rank)).values()) for rank in ranks], dtype=object)
+        if self._tables is None:
+            self._tables = [np.array(below, dtype=np.int64) for below in self.below]
+        at_percents = np.empty((len(ranks), len(self.elements)), dtype=np.int64)
+        ranks = ranks.copy()
+        remaining = np.full(len(ranks), self.total)
+        rows = np.arange(len(ranks))
+        for i, table in enumerate(self._tables):
+            below = table[remaining]
+            k = np.count_nonzero(below <= ranks[:, None], axis=1) - 1
+            ranks -= below[rows, k]
+            at_percents[:, i] = np.asarray(self.values[i])[k]
+            remaining -= at_percents[:, i]
+        return at_percents
+
+    def unrank_range(self, start=0, stop=None):
+        """the at% array of ranks start..stop, as unrank_many()."""
+        stop = self.size if stop is None else min(stop, self.size)
+        return self.unrank_many(np.arange(start, max(start, stop), dtype=np.int64))
+
+    def blocks(self, size, position=0, cursor=None):
+        """yields ((elements, at% rows), None) of the compositions of ranks position.., at most size at a time, as
+        SampledCompositions.blocks() does; the position is all it takes to continue, there is no cursor."""
+        for start in range(position, self.size, size):
+            yield (self.elements, self.unrank_range(start, start + size).astype(float)), None
+
+    def shard(self, index, count):
+        """the (start, stop) rank range of shard index of count nearly equal shards."""
+        return self.size * index // count, self.size * (index + 1) // count
+
+    def sample(self, count, seed=None):
+        """count distinct ranks drawn uniformly at random, in increasing order, all of them when count >= len."""
+        if count >= self.size:
+            return np.arange(self.size, dtype=np.int64)
+        return np.sort(np.random.default_rng(seed).choice(self.size, count, replace=False))
\ No newline at end of file
@@ -0,0 +1,170 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/phase_map.py
+
+import math
+
+import numpy as np
+
+# label shown in the map -> key of Engine.calculate values
+PROPERTIES = {"R1": "model1", "R2": "model2", "R3": "model3", "R4": "model4", "R5": "model6", "R6": "model7",
+              "Crystal Str.": "cstr", "Density (g/cm³)": "density", "δ": "delta", "γ": "gamma",
+              "ΔHₘᵢₓ (kJ/mol)": "enthalpy_of_mixing", "VEC": "vec", "ΔSₘᵢₓ (J/mol·K)": "mixing_entropy",
+              "Tₘ (K)": "melting_temp", "Ω (log₁₀)": "omega"}
+CATEGORICAL = ("model1", "model2", "model3", "model4", "model6", "model7", "cstr")
+CATEGORY_COLORS = {"SS": (46, 160, 67), "IM": (207, 34, 46), "SS+IM": (219, 143, 0), "Mixed": (219, 143, 0),
+                   "N/A": (140, 140, 140), "FCC": (31, 111, 235), "BCC": (207, 34, 46), "BCC + FCC": (130, 80, 223),
+                   "HCP": (219, 143, 0)}
+OTHER_COLORS = [(0, 150, 160), (191, 57, 137), (120, 120, 40), (90, 90, 200)]
+# viridis at 0, 0.25, 0.5, 0.75 and 1
+COLORMAP = np.array([(68, 1, 84), (59, 82, 139), (33, 145, 140), (94, 201, 98), (253, 231, 37)], dtype=float)
+HEIGHT_RATIO = math.sqrt(3) / 2
+
+def verdict(text):
+    """reduces a rule result such as "SS (Tₐₙ: 1200 K)" or "SS above 900.0 K" to its phase prediction."""
+    return text.split(" ")[0] if isinstance(text, str) else text
+
+class PhaseMapData:
+    """the results of a calculation as columns: the at% of every element and every property of PROPERTIES."""
+
+    def __init__(self, elements, compositions, columns):
+        self.elements = elements
+        self.compositions = compositions  # (alloys, elements) at%
+        self.columns = columns  # key -> numpy array, floats or verdict strings
+
+    def __len__(self):
+        return len(self.compositions)
+
+    @classmethod
+    def from_result_set(cls, result_set):
+        """takes the columns of a Utils.result_set.ResultSet, verdicts reduced once per distinct text."""
+        columns = {}
+        for key in PROPERTIES.values():
+            if key == "cstr":
+                columns[key] = result_set.texts(key)
+            elif key in CATEGORICAL:
+                columns[key] = result_set.texts(key, verdict)
+            else:
+                columns[key] = np.asarray(result_set.column(key), dtype=float)
+        with np.errstate(divide="ignore"):
+            columns["omega"] = np.log10(columns["omega"])  # Ω spans decades and is 1e10 when ΔHmix is 0
+        return cls(list(result_set.elements), result_set.at_percents(), columns)
+
+    def slice_values(self, corners):
+        """returns the at% each element other than the three corners takes, {element: sorted values}."""
+        return {el: np.unique(self.compositions[:, i]).tolist()
+                for i, el in enumerate(self.elements) if el not in corners}
+
+    def select(self, corners, fixed):
+        """returns the corner fractions, normalized to their sum, and the row indices of the alloys in the slice
+        where every other element has the at% in fixed."""
+        mask = np.ones(len(self), dtype=bool)
+        for el, at_p in fixed.items():
+            mask &= np.isclose(self.compositions[:, self.elements.index(el)], at_p)
+        fractions = self.compositions[:, [self.elements.index(el) for el in corners]]
+        totals = fractions.sum(axis=1)
+        mask &= totals > 0
+        rows = np.flatnonzero(mask)
+        return fractions[rows] / totals[rows, None], rows
+
+def ternary_xy(fractions):
+    """maps (a, b, c) fractions to a triangle with a at the bottom left, b at the bottom right and c on top."""
+    return fractions[:, 1] + fractions[:, 2] / 2, fractions[:, 2] * HEIGHT_RATIO
+
+def triangle_mask(size):
+    """True for the pixels of a size wide image that lie inside the triangle."""
+    height = int(round(size * HEIGHT_RATIO))
+    y = (height - 1 - np.arange(height))[:, None] / max(height - 1, 1) * HEIGHT_RATIO
+    x = np.arange(size)[None, :] / max(size - 1, 1)
+    tolerance = 1.0 / size
+    return (y <= 2 * HEIGHT_RATIO * x + tolerance) & (y <= 2 * HEIGHT_RATIO * (1 - x) + tolerance)
+
+def rasterize(fractions, values, size, categorical=False):
+    """bins alloys into a size wide pixel grid of the triangle in one pass.
+
+    Returns (grid, categories): for numbers the mean of each pixel, NaN where empty; for verdicts the index in
+    categories of the most common one, -1 where empty. The grid points of a sweep are spread over the pixels
+    around them, so a coarse sweep still fills the triangle.
+    """
+    height = int(round(size * HEIGHT_RATIO))
+    x, y = ternary_xy(fractions)
+    columns = np.clip(np.rint(x * (size - 1)), 0, size - 1).astype(np.int64)
+    rows = np.clip(height - 1 - np.rint(y / HEIGHT_RATIO * (height - 1)), 0, height - 1).astype(np.int64)
+    pixels = rows * size + columns
+
+    categories = []
+    if categorical:
+        categories, codes = np.unique(values.astype(str), return_inverse=True)
+        counts = np.bincount(pixels * len(categories) + codes, minlength=size * height * len(categories))
+        counts = counts.reshape(height * size, len(categories))
+        grid = np.where(counts.sum(axis=1) > 0, counts.argmax(axis=1), -1).reshape(height, size)
+        categories = categories.tolist()
+    else:
+        finite = np.isfinite(values)
+        sums = np.bincount(pixels[finite], weights=values[finite], minlength=size * height)
+        counts = np.bincount(pixels[finite], minlength=size * height)
+        with np.errstate(invalid="ignore"):
+            grid = (sums / counts).reshape(height, size)
+
+    # grows every filled pixel into the empty ones around it, as far as the sweep's grid points, or twice the
+    # typical distance of scattered samples, are apart
+    steps = np.diff(np.unique(np.round(fractions, 6)))
+    spacing = max(steps[steps > 1e-6].min() if np.any(steps > 1e-6) else 0,
+                  2 * math.sqrt(HEIGHT_RATIO / 2 / max(len(fractions), 1)))
+    empty = (lambda g: g < 0) if categorical else np.isnan
+    inside = triangle_mask(size)
+    for step in range(int(math.ceil(spacing * size / 2))):
+        missing = empty(grid) & inside
+        if not missing.any():
+            break
+        filled = grid.copy()
+        # alternating 4 and 8 neighbours grows octagons, close to the hexagonal cells of a ternary grid
+        for neighbour in shifted(grid, -1 if categorical else np.nan, diagonal=step % 2 == 1):
+            take = missing & ~empty(neighbour) & empty(filled)
+            filled[take] = neighbour[take]
+        grid = filled
+    return grid, categories
+
+def shifted(grid, fill, diagonal=False):
+    """the grid moved by one pixel in each direction, fill coming in at the edges."""
+    moves = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    if diagonal:
+        moves += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    height, width = grid.shape
+    for dy, dx in moves:
+        neighbour = np.full_like(grid, fill)
+        neighbour[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] = \
+            grid[max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+        yield neighbour
+
+def colorize(grid, categories=None, low=None, high=None):
+    """turns a rasterize() grid into a (height, width, 4) RGBA image, transparent outside the triangle and where
+    empty. Numbers are mapped from low..high (the grid's range by default) onto the viridis colormap."""
+    image = np.zeros(grid.shape + (4,), dtype=np.uint8)
+    inside = triangle_mask(grid.shape[1])
+    if categories is not None and len(categories):
+        palette = np.array([category_color(category, i) for i, category in enumerate(categories)], dtype=np.uint8)
+        filled = (grid >= 0) & inside
+        image[filled, :3] = palette[grid[filled]]
+    else:
+        filled = np.isfinite(grid) & inside
+        if not filled.any():
+            return image
+        low = np.nanmin(grid[filled]) if low is None else low
+        high = np.nanmax(grid[filled]) if high is None else high
+        position = np.clip((grid[filled] - low) / (high - low) if high > low else 0.5 * np.ones(filled.sum()), 0, 1)
+        anchors = np.linspace(0, 1, len(COLORMAP))
+        image[filled, :3] = np.column_stack([np.interp(position, anchors, COLORMAP[:, i]) for i in range(3)])
+    image[filled, 3] = 255
+    return image
+
+def category_color(category, index=0):
+    return CATEGORY_COLORS.get(category, OTHER_COLORS[index % len(OTHER_COLORS)])
+
+def colormap_color(position):
+    """the viridis color at position in 0..1."""
+    anchors = np.linspace(0, 1, len(COLORMAP))
+    return tuple(int(np.interp(position, anchors, COLORMAP[:, i])) for i in range(3))
\ No newline at end of file
@@ -0,0 +1,123 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/profiler.py
+
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+class _Timer:
+    """accumulates the wall time and the number of calls of one stage."""
+    __slots__ = ("calls", "total", "_start")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.total += time.perf_counter() - self._start
+        self.calls += 1
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+class NullProfiler:
+    """profiler used when profiling is off, every call is a no-op."""
+    enabled = False
+    _timer = _NullTimer()
+
+    def stage(self, name):
+        return self._timer
+
+    def count(self, name, n=1):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+class Profiler:
+    """collects per-stage wall times, counters and optionally Python memory allocations of one run."""
+    enabled = True
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.timers = {}
+        self.counters = {}
+        self.started = None
+        self.wall_time = 0.0
+        self.peak_memory = None
+        self.top_allocations = []
+        self._start = None
+
+    def stage(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = _Timer()
+        return timer
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def start(self):
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        if self._start is None:
+            return
+        self.wall_time = time.perf_counter() - self._start
+        self._start = None
+        if self.track_memory and tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            snapshot = tracemalloc.take_snapshot()
+            self.top_allocations = [
+                {"location": str(stat.traceback), "size_kb": stat.size / 1024, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:10]
+            ]
+            tracemalloc.stop()
+
+    def report(self):
+        """returns the collected measurements as a JSON serializable dict."""
+        stages = {}
+        for name, timer in sorted(self.timers.items(), key=lambda item: -item[1].total):
+            stages[name] = {
+                "calls": timer.calls,
+                "total_s": timer.total,
+                "mean_us": timer.total / timer.calls * 1e6 if timer.calls else 0.0,
+                "share_of_wall_time": timer.total / self.wall_time if self.wall_time else None,
+            }
+        return {
+            "started": self.started,
+            "wall_time_s": self.wall_time,
+            "stages": stages,
+            "counters": dict(self.counters),
+            "peak_memory_mb": self.peak_memory,
+            "top_allocations": self.top_allocations,
+        }
+
+    def save(self, file_path):
+        with open(file_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
\ No newline at end of file
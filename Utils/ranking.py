@@ -0,0 +1,291 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/ranking.py
+
+import ast
+import bisect
+import heapq
+import math
+
+import numpy as np
+
+from Utils.rules import Vectorize, compile_function
+from Utils.summary import SummaryStatistics
+
+# R1..R6 as shown in the table, mapped to the keys of Engine.calculate values
+RULE_ALIASES = {"R1": "model1", "R2": "model2", "R3": "model3", "R4": "model4", "R5": "model6", "R6": "model7"}
+FUNCTIONS = {"abs": abs, "min": min, "max": max, "sqrt": math.sqrt, "log": math.log, "exp": math.exp}
+NAMES = ["density", "delta", "gamma", "enthalpy_of_mixing", "vec", "mixing_entropy", "melting_temp", "omega",
+         "cstr", "model1", "model2", "model3", "model4", "model6", "model7"] + list(RULE_ALIASES)
+OBJECTIVE_PROPERTIES = ["density", "delta", "gamma", "enthalpy_of_mixing", "vec", "mixing_entropy", "melting_temp",
+                        "omega"]
+HISTORY_INTERVAL = 1000  # offered results between two recorded Pareto front sizes
+SCORE_TOLERANCE = 1e-9  # relative, numpy's log, exp and ** may round the last bits differently from math's
+_ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Name,
+                  ast.Load, ast.Constant, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+
+def compile_objective(expression):
+    """compiles an objective such as "omega", "-delta" or "density if 'SS' in R6 else None" into a function of
+    the calculated values. Raises ValueError for anything but arithmetic on the alloy properties."""
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid objective: {e.msg}")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Invalid objective: {type(node).__name__} is not allowed")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS):
+            raise ValueError("Invalid objective: only " + ", ".join(FUNCTIONS) + " can be called")
+        if isinstance(node, ast.Name) and node.id not in NAMES and node.id not in FUNCTIONS:
+            raise ValueError(f"Invalid objective: unknown name {node.id}")
+    code = compile(tree, "<objective>", "eval")
+    namespace = {"__builtins__": {}, **FUNCTIONS}
+
+    def objective(values):
+        variables = dict(values)
+        for alias, key in RULE_ALIASES.items():
+            if key in values:
+                variables[alias] = values[key]
+        return eval(code, namespace, variables)
+    return objective
+
+def compile_batch_objective(expression):
+    """compiles an objective compile_objective() accepts into a function of calculate_batch() values, returning
+    the scores of the whole block as an array, NaN where they are not finite. Returns None for objectives that need
+    the values of single alloys: of verdicts or cstr, with and/or, None or strings."""
+    tree = ast.parse(expression.strip(), mode="eval")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.BoolOp) or (isinstance(node, ast.Name) and node.id not in OBJECTIVE_PROPERTIES and
+                                            node.id not in FUNCTIONS):
+            return None
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            return None
+        if isinstance(node, ast.Compare) and not all(isinstance(op, (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq,
+                                                                     ast.NotEq)) for op in node.ops):
+            return None
+        if isinstance(node, ast.Call) and len(node.args) != (2 if node.func.id in ("min", "max") else 1):
+            return None  # np.minimum takes a third argument as its output
+    function = compile_function(Vectorize().visit(tree).body, OBJECTIVE_PROPERTIES)
+
+    def scores(values):
+        with np.errstate(all="ignore"):
+            score = function(*(values[name] for name in OBJECTIVE_PROPERTIES))
+            score = np.broadcast_to(np.asarray(score, dtype=float), np.shape(values["omega"]))
+        return np.where(np.isfinite(score), score, np.nan)
+    return scores
+
+def _may_beat(scores, bound):
+    """the scores that may be above bound once the objective is evaluated alloy by alloy, NaN ones included."""
+    return ~(scores < bound - SCORE_TOLERANCE * abs(bound))
+
+def _dominated(points, margin, others):
+    """which points one of others is at least margin better than in every objective and better than in one."""
+    at_least = np.ones((len(points), len(others)), dtype=bool)
+    better = np.zeros((len(points), len(others)), dtype=bool)
+    for k in range(points.shape[1]):
+        at_least &= others[None, :, k] >= (points[:, k] + margin[:, k])[:, None]
+        better |= others[None, :, k] > points[:, k][:, None]
+    return (at_least & better).any(axis=1)
+
+def objective_score(objective, values):
+    """evaluates an objective, returns None if it is undefined for these values."""
+    try:
+        score = objective(values)
+    except (TypeError, ValueError, ZeroDivisionError, KeyError):
+        return None
+    if score is None or isinstance(score, str) or not math.isfinite(score):
+        return None
+    return float(score)
+
+class TopK:
+    """keeps the k best [values, alloy_name] results by an objective in a bounded heap, O(k) memory."""
+
+    def __init__(self, expression, k, maximize=True):
+        self.expression = expression
+        self.k = int(k)
+        self.maximize = maximize
+        self.objective = compile_objective(expression)
+        self.batch_objective = compile_batch_objective(expression)
+        self.heap = []  # min-heap of (score, sequence, values, alloy_name), the worst kept result on top
+        self.sequence = 0
+
+    def spec(self):
+        return {"kind": "top_k", "expression": self.expression, "k": self.k, "maximize": self.maximize}
+
+    def push(self, values, alloy_name):
+        """offers a result, returns False if the objective is undefined for it."""
+        score = objective_score(self.objective, values)
+        if score is None:
+            return False
+        score = score if self.maximize else -score
+        # the sequence number keeps the first found alloy ahead on ties and stops heapq from comparing dicts
+        entry = (score, self.sequence, values, alloy_name)
+        self.sequence += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif score > self.heap[0][0]:
+            heapq.heapreplace(self.heap, entry)
+        return True
+
+    def push_batch(self, values, rows, result):
+        """offers the rows of calculate_batch() values, result(j) making the values and alloy name of row j. Scores
+        over the block arrays skip the rows below the worst kept result or below the k best of the block, which
+        push() would turn away anyway, so only the others are made into dicts and scored one by one."""
+        if self.batch_objective is not None:
+            scores = self.batch_objective(values)[rows] * (1.0 if self.maximize else -1.0)
+            defined = scores[~np.isnan(scores)]
+            bounds = [self.heap[0][0]] if len(self.heap) == self.k else []
+            if len(defined) > self.k:
+                bounds.append(np.partition(defined, -self.k)[-self.k])
+            if bounds:
+                rows = rows[_may_beat(scores, max(bounds))]
+        for j in rows:
+            self.push(*result(j))
+
+    def results(self):
+        """returns the kept results best first, as [values, alloy_name] rows."""
+        return [[values, alloy_name] for _, _, values, alloy_name in sorted(self.heap, key=lambda e: (-e[0], e[1]))]
+
+    def dump(self):
+        return {"results": self.results()}
+
+    def load(self, state):
+        """refills the heap from dump() of a checkpoint."""
+        for values, alloy_name in state.get("results", []):
+            self.push(values, alloy_name)
+
+class ParetoFront:
+    """keeps the non-dominated [values, alloy_name] results over several objectives.
+
+    objectives is a list of (expression, maximize) pairs. With two objectives the front is kept sorted, so an
+    offer costs two binary searches; with more, dominance is checked against the whole front in one numpy pass.
+    """
+
+    def __init__(self, objectives):
+        self.objectives = [(expression, bool(maximize)) for expression, maximize in objectives]
+        if len(self.objectives) < 2:
+            raise ValueError("A Pareto front needs at least two objectives.")
+        self.functions = [compile_objective(expression) for expression, _ in self.objectives]
+        self.batch_functions = [compile_batch_objective(expression) for expression, _ in self.objectives]
+        self.signs = np.array([1.0 if maximize else -1.0 for _, maximize in self.objectives])
+        self.points = np.empty((16, len(self.objectives)))  # scores, every objective turned into higher is better
+        self.rows = []
+        self.keys = []  # two objectives only: -first score of each row, ascending
+        self.seen = 0
+        self.history = []  # [results offered, front size] every HISTORY_INTERVAL offers
+
+    def spec(self):
+        return {"kind": "pareto", "objectives": self.objectives}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def push(self, values, alloy_name):
+        """offers a result, returns False if an objective is undefined for it."""
+        self.seen += 1
+        if self.seen % HISTORY_INTERVAL == 0:
+            self.history.append([self.seen, len(self.rows)])
+        scores = [objective_score(function, values) for function in self.functions]
+        if None in scores:
+            return False
+        point = np.array(scores) * self.signs
+        if len(self.objectives) == 2:
+            self._push_2d(point, [values, alloy_name])
+        else:
+            self._push_nd(point, [values, alloy_name])
+        return True
+
+    def push_batch(self, values, rows, result):
+        """offers the rows of calculate_batch() values, result(j) making the values and alloy name of row j. Scores
+        over the block arrays skip the rows the front already dominates, or another row of the block does, which
+        push() would turn away or drop again, so only the others are made into dicts and scored one by one."""
+        if None not in self.batch_functions:
+            points = np.stack([function(values)[rows] for function in self.batch_functions], axis=1) * self.signs
+            defined = ~np.isnan(points).any(axis=1)
+            margin = SCORE_TOLERANCE * np.abs(points)
+            kept = np.ones(len(rows), dtype=bool)
+            kept[defined] = ~_dominated(points[defined], margin[defined], self.points[:len(self.rows)])
+            # a row of the block that is at least as good in every objective and better in one drops it later
+            left = np.flatnonzero(kept & defined)
+            kept[left] = ~_dominated(points[left], margin[left], points[defined])
+        else:
+            kept = np.ones(len(rows), dtype=bool)
+        skipped = 0
+        for j, keep in zip(rows, kept):
+            if not keep:
+                skipped += 1
+                continue
+            self._skip(skipped)
+            skipped = 0
+            self.push(*result(j))
+        self._skip(skipped)
+
+    def _skip(self, count):
+        """counts count offers that could not change the front, as push() would have."""
+        for seen in range((self.seen // HISTORY_INTERVAL + 1) * HISTORY_INTERVAL, self.seen + count + 1,
+                          HISTORY_INTERVAL):
+            self.history.append([seen, len(self.rows)])
+        self.seen += count
+
+    def _push_2d(self, point, row):
+        # sorted by the first score descending, so along the front the second score is ascending
+        first, second = point
+        end = bisect.bisect_right(self.keys, -first)
+        if end and self.points[end - 1, 1] >= second:
+            return  # dominated by, or equal to, a kept result
+        start = bisect.bisect_left(self.keys, -first)
+        stop = start
+        while stop < len(self.rows) and self.points[stop, 1] <= second:
+            stop += 1
+        kept = self.points[stop:len(self.rows)].copy()
+        self._reserve(len(self.rows) - (stop - start) + 1)
+        self.points[start] = point
+        self.points[start + 1:start + 1 + len(kept)] = kept
+        self.keys[start:stop] = [-first]
+        self.rows[start:stop] = [row]
+
+    def _push_nd(self, point, row):
+        n = len(self.rows)
+        points = self.points[:n]
+        if n and np.any(np.all(points >= point, axis=1)):
+            return
+        kept = ~np.all(points <= point, axis=1)
+        if not kept.all():
+            self.rows = [r for r, keep in zip(self.rows, kept) if keep]
+            self.points[:len(self.rows)] = points[kept]
+            n = len(self.rows)
+        self._reserve(n + 1)
+        self.points[n] = point
+        self.rows.append(row)
+
+    def _reserve(self, size):
+        if size > len(self.points):
+            points = np.empty((max(size, 2 * len(self.points)), self.points.shape[1]))
+            points[:len(self.rows)] = self.points[:len(self.rows)]
+            self.points = points
+
+    def results(self):
+        """returns the front sorted by the first objective, best first."""
+        order = np.argsort(-self.points[:len(self.rows), 0], kind="stable")
+        return [self.rows[i] for i in order]
+
+    def dump(self):
+        return {"results": self.results(), "seen": self.seen, "history": self.history}
+
+    def load(self, state):
+        """refills the front from dump() of a checkpoint."""
+        for values, alloy_name in state.get("results", []):
+            self.push(values, alloy_name)
+        self.seen = state.get("seen", 0)
+        self.history = state.get("history", [])
+
+def from_spec(spec):
+    """creates the TopK, ParetoFront or SummaryStatistics described by spec()."""
+    if spec.get("kind", "top_k") == "pareto":
+        return ParetoFront(spec["objectives"])
+    if spec["kind"] == "summary":
+        return SummaryStatistics()
+    return TopK(spec["expression"], spec["k"], spec.get("maximize", True))
\ No newline at end of file
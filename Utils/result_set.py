@@ -0,0 +1,248 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/result_set.py
+
+import json
+
+import numpy as np
+
+from Utils.alloy_names import parse_alloy_name, to_subscript
+
+UNITS = 1000000  # composition matrix units per at%, enough for the 6 significant digits f"{at_p:g}" shows
+ABSENT = -1  # composition matrix entry of an element an alloy does not contain
+CODE_TYPES = (np.uint8, np.uint16, np.uint32)
+
+class ResultSet:
+    """the alloys meeting the criteria as columns instead of [values, alloy_name] rows.
+
+    Numbers are typed numpy arrays, texts such as verdicts small integer codes into a list of the distinct texts
+    of their column, and the compositions an integer matrix the alloy names are rendered from on demand. That is
+    about a hundred bytes per alloy where a values dict and a name take close to a kilobyte. The arrays grow by
+    doubling and column() returns views, so the table, the phase map and the export read the memory the worker
+    filled without copying it. Given the engine's rules, verdicts are stored as the codes calculate_batch()
+    gives and their texts rendered with the rules' details only when rows are read.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = {rule.key: rule for rule in rules}  # verdict columns whose codes are the rule's codes
+        self.size = 0
+        self.elements = []  # columns of the composition matrix, in the order they were first seen
+        self.compositions = np.full((16, 0), ABSENT, dtype=np.int32)
+        self.orders = []  # element orders of the names, as composition matrix columns
+        self.order_lookup = {}  # order -> index into orders
+        self.order_codes = np.zeros(16, dtype=np.int32)  # index into orders of each alloy
+        self.keys = []  # value keys, in the order of calculate()
+        self.numbers = {}  # key -> array
+        self.codes = {}  # key -> array of indices into categories
+        self.categories = {}  # key -> distinct texts
+        self.lookup = {}  # key -> {text: code}
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.compositions)
+
+    def nbytes(self):
+        """memory of the arrays, the distinct texts not counted."""
+        return (self.compositions.nbytes + self.order_codes.nbytes + sum(array.nbytes for array in self.numbers.values()) +
+                sum(array.nbytes for array in self.codes.values()))
+
+    def append_batch(self, elements, at_percents, values, mask=None):
+        """adds the rows of a calculate_batch() block where mask is True. at_percents is (n, len(elements)),
+        NaN for elements a composition does not contain."""
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(at_percents))
+        if not len(rows):
+            return
+        start, stop = self.size, self.size + len(rows)
+        self._reserve(stop)
+        at_percents = np.asarray(at_percents, dtype=float)[rows]
+        columns = self._element_columns(elements)
+        self.compositions[start:stop, columns] = np.where(np.isnan(at_percents), ABSENT, np.rint(at_percents * UNITS))
+        self.order_codes[start:stop] = self._order_code(columns)
+        for key, array in values.items():
+            array = np.asarray(array)[rows]
+            if key not in self.keys:
+                self._add_column(key, array)
+            if key in self.numbers:
+                if array.dtype.kind == "f" and self.numbers[key].dtype.kind != "f":
+                    self.numbers[key] = self.numbers[key].astype(float)  # e.g. Ω, an int 10¹⁰ from calculate()
+                self.numbers[key][start:stop] = array
+            else:
+                self.codes[key][start:stop] = self._encode(key, array)
+        self.size = stop
+
+    def append_rows(self, rows):
+        """adds (values, {element: at%}) rows, e.g. of calculate() results."""
+        if not rows:
+            return
+        elements = list(dict.fromkeys(el for _, composition in rows for el in composition))
+        at_percents = np.full((len(rows), len(elements)), np.nan)
+        indices = {el: i for i, el in enumerate(elements)}
+        for i, (_, composition) in enumerate(rows):
+            for el, at_p in composition.items():
+                at_percents[i, indices[el]] = at_p
+        values = {}
+        for key, first in rows[0][0].items():
+            column = [row_values[key] for row_values, _ in rows]
+            values[key] = np.array(column, dtype=object if isinstance(first, str) else None)
+        start = self.size
+        self.append_batch(elements, at_percents, values)
+        # names keep the element order of their own composition
+        columns = self._element_columns(elements)
+        self.order_codes[start:self.size] = [self._order_code([columns[indices[el]] for el in composition])
+                                             for _, composition in rows]
+
+    def extend(self, rows):
+        """adds [values, alloy_name] rows, as the results files and the sinks hold them."""
+        self.append_rows([(values, parse_alloy_name(alloy_name)) for values, alloy_name in rows])
+
+    @classmethod
+    def read_jsonl(cls, file_name, rules=(), chunk_size=10000):
+        """reads a results file of [values, alloy_name] JSON lines."""
+        result_set = cls(rules)
+        with open(file_name, "r") as results:
+            chunk = []
+            for line in results:
+                chunk.append(json.loads(line))
+                if len(chunk) == chunk_size:
+                    result_set.extend(chunk)
+                    chunk = []
+            result_set.extend(chunk)
+        return result_set
+
+    def write_jsonl(self, file, start=0, stop=None):
+        """writes rows start..stop to a binary file as [values, alloy_name] JSON lines."""
+        for row in self.rows(start, stop):
+            file.write((json.dumps(row) + "\n").encode("utf-8"))
+
+    def column(self, key):
+        """the numbers of a numeric key, a view."""
+        if not self.size and key not in self.numbers:
+            return np.zeros(0)
+        return self.numbers[key][:self.size]
+
+    def texts(self, key, transform=None):
+        """the texts of a key as an object array, transform applied once per distinct text."""
+        if key in self.numbers or not self.size:
+            return self.column(key).astype(object)
+        categories = self.categories[key] if transform is None else [transform(text) for text in self.categories[key]]
+        return np.array(categories + [None], dtype=object)[:-1][self.codes[key][:self.size]]
+
+    def at_percents(self):
+        """the compositions as an (alloys, elements) at% array, 0 for elements an alloy does not contain."""
+        units = self.compositions[:self.size]
+        return np.where(units == ABSENT, 0, units) / UNITS
+
+    def name(self, index):
+        units = self.compositions[index].tolist()
+        return "".join(f"{self.elements[column]}{to_subscript(f'{units[column] / UNITS:g}')}"
+                       for column in self.orders[self.order_codes[index]] if units[column] != ABSENT)
+
+    def row(self, index):
+        """the [values, alloy_name] row of an alloy, as calculate() values."""
+        return next(self.rows(index, index + 1))
+
+    def rows(self, start=0, stop=None):
+        """yields [values, alloy_name] rows, each column converted to Python values in one pass."""
+        stop = self.size if stop is None else min(stop, self.size)
+        if start >= stop:
+            return
+        columns = [self._values(key, start, stop) for key in self.keys]
+        for i, row in enumerate(zip(*columns)):
+            yield [dict(zip(self.keys, row)), self.name(start + i)]
+
+    def _values(self, key, start, stop):
+        if key in self.numbers:
+            return self.numbers[key][start:stop].tolist()
+        codes = self.codes[key][start:stop].tolist()
+        if key in self.rules:
+            rule = self.rules[key]
+            return rule.texts(codes, [self.numbers[name][start:stop].tolist() for name in rule.fields])
+        return [self.categories[key][code] for code in codes]
+
+    def take(self, indices):
+        """a new ResultSet of the rows at indices, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        taken = ResultSet(self.rules.values())
+        taken.size = len(indices)
+        taken.elements = list(self.elements)
+        taken.compositions = self.compositions[indices]
+        taken.orders = list(self.orders)
+        taken.order_lookup = dict(self.order_lookup)
+        taken.order_codes = self.order_codes[indices]
+        taken.keys = list(self.keys)
+        taken.numbers = {key: array[indices] for key, array in self.numbers.items()}
+        taken.codes = {key: array[indices] for key, array in self.codes.items()}
+        taken.categories = {key: list(categories) for key, categories in self.categories.items()}
+        taken.lookup = {key: dict(lookup) for key, lookup in self.lookup.items()}
+        return taken
+
+    def _reserve(self, size):
+        if size <= self.capacity:
+            return
+        capacity = max(size, 2 * self.capacity)
+        self.compositions = self._grow(self.compositions, capacity, ABSENT)
+        self.order_codes = self._grow(self.order_codes, capacity)
+        self.numbers = {key: self._grow(array, capacity) for key, array in self.numbers.items()}
+        self.codes = {key: self._grow(array, capacity) for key, array in self.codes.items()}
+
+    @staticmethod
+    def _grow(array, capacity, fill=0):
+        grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _element_columns(self, elements):
+        new = [el for el in elements if el not in self.elements]
+        if new:
+            self.elements += new
+            self.compositions = np.hstack([self.compositions,
+                                           np.full((self.capacity, len(new)), ABSENT, dtype=np.int32)])
+        return [self.elements.index(el) for el in elements]
+
+    def _order_code(self, columns):
+        columns = tuple(columns)
+        if columns not in self.order_lookup:
+            self.order_lookup[columns] = len(self.orders)
+            self.orders.append(columns)
+        return self.order_lookup[columns]
+
+    def _add_column(self, key, array):
+        # rows added before the key existed read 0 or the first text
+        self.keys.append(key)
+        if key in self.rules:
+            self.codes[key] = np.zeros(self.capacity, dtype=CODE_TYPES[0])
+            self.categories[key] = list(self.rules[key].labels)
+            self.lookup[key] = dict(self.rules[key].codes)
+        elif array.dtype.kind in "iub":
+            self.numbers[key] = np.zeros(self.capacity, dtype=np.int64)
+        elif array.dtype.kind == "f":
+            self.numbers[key] = np.zeros(self.capacity)
+        else:
+            self.codes[key] = np.zeros(self.capacity, dtype=CODE_TYPES[0])
+            self.categories[key] = []
+            self.lookup[key] = {}
+
+    def _encode(self, key, texts):
+        if key in self.rules:
+            if texts.dtype.kind in "iu":
+                return texts
+            distinct, inverse = np.unique(texts.astype(str), return_inverse=True)
+            codes = np.array([self.rules[key].parse(text) for text in distinct.tolist()], dtype=CODE_TYPES[0])
+            return codes[inverse.reshape(-1)]
+        categories, lookup = self.categories[key], self.lookup[key]
+        distinct, inverse = np.unique(texts.astype(str), return_inverse=True)
+        for text in distinct.tolist():
+            if text not in lookup:
+                lookup[text] = len(categories)
+                categories.append(text)
+        # the code type widens only once a column has more distinct texts than it can index
+        code_type = next(t for t in CODE_TYPES if len(categories) <= np.iinfo(t).max + 1)
+        if self.codes[key].dtype != code_type:
+            self.codes[key] = self.codes[key].astype(code_type)
+        return np.array([lookup[text] for text in distinct.tolist()], dtype=code_type)[inverse.reshape(-1)]
\ No newline at end of file
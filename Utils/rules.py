@@ -0,0 +1,326 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/rules.py
+
+import ast
+import copy
+import functools
+import string
+
+import numpy as np
+
+# descriptors a rule can reference, calculated by engine.Descriptors on first use
+DESCRIPTORS = {
+    "density": "g/cm³", "delta": "δ, atomic size mismatch in %", "gamma": "γ, solid angle ratio",
+    "enthalpy_of_mixing": "ΔHmix in kJ/mol", "vec": "valence electron concentration",
+    "mixing_entropy": "ΔSmix in J/(mol·K)", "melting_temp": "Tm in K, rule of mixtures rounded up",
+    "omega": "Ω = Tm ΔSmix / |ΔHmix|, 10¹⁰ when ΔHmix is 0",
+    "lambda_": "Λ = ΔSmix / δ², NaN for pure elements",
+    "lowest_formation_enthalpy": "lowest formation enthalpy of the element pairs, NaN without data",
+    "im_enthalpy": "ΔH_IM, formation enthalpy of the intermetallics in eV/atom",
+    "annealing_temperature": "Tₐₙ = 0.6 Tm in K",
+    "omega_an": "Ω at Tₐₙ, 10¹⁰ when ΔHmix is 0",
+    "im_ratio": "ΔH_IM / ΔHmix, 10¹⁰ when ΔHmix is 0",
+}
+# and/or/not, chained comparisons and a if c else b are rewritten to these, so conditions work on arrays
+FUNCTIONS = {"abs": np.abs, "sqrt": np.sqrt, "log": np.log, "exp": np.exp, "min": np.minimum, "max": np.maximum,
+             "_not": np.logical_not, "_where": np.where}
+NA = 0  # code of "N/A", the verdict where a descriptor a rule needs is NaN
+LABEL_ALIASES = {"Mixed": "SS+IM"}  # labels filters used to offer
+OPERATORS = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=", ast.Eq: "==", ast.NotEq: "!="}
+_ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Name,
+                  ast.Load, ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd, ast.Not,
+                  ast.And, ast.Or, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+class Vectorize(ast.NodeTransformer):
+    """rewrites the Python operators that need single booleans into their elementwise numpy forms."""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        return functools.reduce(lambda left, right: ast.BinOp(left, op, right), node.values)
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        operands = [node.left] + node.comparators
+        parts = [ast.Compare(operands[i], [op], [operands[i + 1]]) for i, op in enumerate(node.ops)]
+        return functools.reduce(lambda left, right: ast.BinOp(left, ast.BitAnd(), right), parts)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.Call(ast.Name("_not", ast.Load()), [node.operand], [])
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return ast.Call(ast.Name("_where", ast.Load()), [node.test, node.body, node.orelse], [])
+
+def parse_condition(expression):
+    """parses a threshold expression such as "omega >= 1.1 and 0 < delta < 6.6" into its elementwise form.
+    Returns (expression node, referenced descriptors), raises ValueError for anything but arithmetic and
+    comparisons of DESCRIPTORS."""
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid condition: {e.msg}")
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Invalid condition: {type(node).__name__} is not allowed")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS):
+            raise ValueError("Invalid condition: only " + ", ".join(name for name in FUNCTIONS if name[0] != "_") +
+                             " can be called")
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in DESCRIPTORS:
+                raise ValueError(f"Invalid condition: unknown descriptor {node.id}")
+            names.add(node.id)
+    return Vectorize().visit(tree).body, names
+
+def compile_function(body, arguments):
+    """compiles an expression node into a function taking the descriptors in arguments, positionally."""
+    function = ast.Expression(ast.Lambda(ast.arguments(posonlyargs=[], args=[ast.arg(name) for name in arguments],
+                                                       kwonlyargs=[], kw_defaults=[], defaults=[]), body))
+    code = compile(ast.fix_missing_locations(function), "<rule>", "eval")
+    return eval(code, {"__builtins__": {}, **FUNCTIONS})
+
+def _number(node):
+    """the value of a number operand such as 1.1 or -11.6, None for anything else."""
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _number(node.operand)
+        return None if value is None else -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+    return None
+
+def find_thresholds(tree):
+    """the numbers a condition compares with, as (Compare node, operand index, value, label, compared operand) in
+    ast.walk order, e.g. the 1.1 of "omega >= 1.1" labelled "omega >= 1.1" and compared with "omega". Numbers
+    inside arithmetic are not thresholds."""
+    thresholds = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Compare):
+            continue
+        operands = [node.left] + node.comparators
+        for i, operand in enumerate(operands):
+            value = _number(operand)
+            if value is None:
+                continue
+            j = i - 1 if i else 1  # the operand it is compared with
+            left, right = (operands[i], operands[j]) if i < j else (operands[j], operands[i])
+            label = f"{ast.unparse(left)} {OPERATORS[type(node.ops[min(i, j)])]} {ast.unparse(right)}"
+            thresholds.append((node, i, value, label, ast.unparse(operands[j])))
+    return thresholds
+
+def _set_operand(node, index, operand):
+    if index == 0:
+        node.left = operand
+    else:
+        node.comparators[index - 1] = operand
+
+def positional_template(detail):
+    """turns a detail such as "{verdict} (Tₐₙ: {annealing_temperature:.1f} K)" into ("{0} (Tₐₙ: {1:.1f} K)",
+    ["annealing_temperature"]), positional fields format faster than keywords."""
+    template, fields = "", []
+    for literal, field, spec, conversion in string.Formatter().parse(detail):
+        template += literal.replace("{", "{{").replace("}", "}}")
+        if field is None:
+            continue
+        if field != "verdict" and field not in DESCRIPTORS:
+            raise ValueError(f"Invalid detail: unknown descriptor {field}")
+        if field != "verdict" and field not in fields:
+            fields.append(field)
+        index = fields.index(field) + 1 if field != "verdict" else 0
+        template += "{" + str(index) + ("!" + conversion if conversion else "") + (":" + spec if spec else "") + "}"
+    return template, fields
+
+class Rule:
+    """a phase-formation rule, outcomes are (verdict, condition) pairs tried in order and default is the verdict
+    where none of them holds. Where a descriptor a condition references is NaN the verdict is "N/A".
+
+    Verdicts are codes, indices into labels with NA for "N/A", text is only made for display: the label, or
+    detail formatted with the label as {verdict} and the descriptors it names, which Engine keeps as numeric
+    columns next to the codes.
+
+    Conditions are compiled once into functions of the descriptors they reference: calculate_batch() evaluates
+    them as boolean masks over a block of compositions, calculate() chains them into one function that stops at
+    the first condition that holds.
+    """
+
+    def __init__(self, name, key, outcomes, default, detail=None):
+        self.name = name  # column title, e.g. R1
+        self.key = key  # key of the Engine.calculate values, e.g. model1
+        self.outcomes = [(verdict, condition) for verdict, condition in outcomes]
+        self.default = default
+        self.detail = detail
+        parsed = [parse_condition(condition) for _, condition in self.outcomes]
+        self.descriptors = sorted(set().union(*(names for _, names in parsed)))
+        self.masks = [compile_function(copy.deepcopy(body), self.descriptors) for body, _ in parsed]
+        chain = ast.Constant(len(parsed))
+        for i in reversed(range(len(parsed))):
+            chain = ast.IfExp(parsed[i][0], ast.Constant(i), chain)
+        self.choose = compile_function(chain, self.descriptors)  # index of the first outcome that holds
+        verdicts = [verdict for verdict, _ in self.outcomes] + [default]
+        self.labels = ["N/A"] + [label for label in dict.fromkeys(verdicts) if label != "N/A"]
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+        self.choices = [self.codes[verdict] for verdict in verdicts]  # code of each outcome, then of the default
+        self.choice_codes = np.array(self.choices, dtype=np.uint8)
+        self.threshold_masks = None  # conditions taking their thresholds as arguments, see evaluate_thresholds()
+        self.template, self.fields = positional_template(detail) if detail else (None, [])
+        # the text between the label and the first descriptor of a detail, where parse() cuts a text
+        self.separator = next((literal for literal, field, _, _ in string.Formatter().parse(detail or "")
+                               if field is not None and field != "verdict"), None)
+
+    def spec(self):
+        return {"name": self.name, "key": self.key, "outcomes": self.outcomes, "default": self.default,
+                "detail": self.detail}
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec["name"], spec["key"], spec["outcomes"], spec["default"], spec.get("detail"))
+
+    def substitute_thresholds(self, replacement):
+        """the parsed conditions with the k-th threshold, see find_thresholds(), replaced by replacement(k, value)."""
+        trees, k = [], 0
+        for _, condition in self.outcomes:
+            tree = ast.parse(condition.strip(), mode="eval")
+            for node, index, value, _, _ in find_thresholds(tree):
+                _set_operand(node, index, replacement(k, value))
+                k += 1
+            trees.append(tree)
+        return trees
+
+    def thresholds(self):
+        """(label, value, compared operand) of the thresholds of the conditions, in the order with_thresholds()
+        takes them."""
+        return [(label, value, compared) for _, condition in self.outcomes
+                for _, _, value, label, compared in find_thresholds(ast.parse(condition.strip(), mode="eval"))]
+
+    def with_thresholds(self, values):
+        """a copy of the rule whose thresholds are values."""
+        numbers = [float(f"{value:.6g}") for value in values]
+        numbers = [int(number) if number.is_integer() else number for number in numbers]
+        trees = self.substitute_thresholds(lambda k, value: ast.Constant(numbers[k]))
+        outcomes = [(verdict, ast.unparse(tree)) for (verdict, _), tree in zip(self.outcomes, trees)]
+        return Rule(self.name, self.key, outcomes, self.default, self.detail)
+
+    def evaluate_thresholds(self, descriptors, n, values):
+        """the verdict codes of n compositions under many threshold sets at once, values a (sets, thresholds)
+        array, as a (sets, n) uint8 array. The thresholds are arguments of the compiled conditions, so each
+        condition is one broadcast comparison of the descriptors against a column of values."""
+        if self.threshold_masks is None:
+            names = [f"_t{k}" for k in range(len(self.thresholds()))]
+            trees = self.substitute_thresholds(lambda k, value: ast.Name(names[k], ast.Load()))
+            self.threshold_masks = [compile_function(Vectorize().visit(tree).body, self.descriptors + names)
+                                    for tree in trees]
+        values = np.asarray(values, dtype=float)
+        arguments = [descriptors[name] for name in self.descriptors]
+        arguments += [values[:, k, None] for k in range(values.shape[1])]  # a column of thresholds per set
+        masks = [np.broadcast_to(mask(*arguments), (len(values), n)) for mask in self.threshold_masks]
+        codes = self.choice_codes[np.select(masks, np.arange(len(masks)), len(masks))]
+        missing = np.zeros(n, dtype=bool)
+        for name in self.descriptors:
+            missing |= np.isnan(np.broadcast_to(descriptors[name], (n,)))
+        codes[:, missing] = NA
+        return codes
+
+    def code(self, label):
+        """the code of a label, -1 for labels this rule never gives, so filtering on them matches nothing."""
+        if label not in self.codes:
+            label = LABEL_ALIASES.get(label, label)
+        return self.codes.get(label, -1)
+
+    def text(self, code, *fields):
+        """the display text of a code, fields the values of the detail's descriptors."""
+        if self.template is None or code == NA:
+            return self.labels[code]
+        return self.template.format(self.labels[code], *fields)
+
+    def texts(self, codes, columns):
+        """text() of a list of codes, columns the lists of the detail's descriptors."""
+        if self.template is None:
+            return [self.labels[code] for code in codes]
+        return [self.labels[code] if code == NA else self.template.format(self.labels[code], *fields)
+                for code, *fields in zip(codes, *columns)]
+
+    def parse(self, text):
+        """the code of a display text, e.g. of results saved as text."""
+        label = text.split(self.separator)[0].strip() if self.separator else text
+        return self.codes[label]
+
+    def evaluate(self, descriptors):
+        """the verdict code of one composition."""
+        values = [descriptors[name] for name in self.descriptors]
+        for value in values:
+            if value != value:
+                return NA
+        return self.choices[self.choose(*values)]
+
+    def evaluate_batch(self, descriptors, n):
+        """the verdict codes of a block of n compositions, as a uint8 array."""
+        values = [descriptors[name] for name in self.descriptors]
+        masks = [np.broadcast_to(mask(*values), (n,)) for mask in self.masks]
+        codes = self.choice_codes[np.select(masks, np.arange(len(masks)), len(masks))]
+        missing = np.zeros(n, dtype=bool)
+        for value in values:
+            missing |= np.isnan(np.broadcast_to(value, (n,)))
+        codes[missing] = NA
+        return codes
+
+class RuleRegistry:
+    """the rules Engine evaluates, in column order. Registering a rule with the key of another replaces it, e.g.
+
+        engine.rules.register(Rule("VEC-δ", "vec_delta", [("SS", "vec >= 8 and delta < 4")], "IM"))
+
+    adds a "vec_delta" verdict to the values of every calculation.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = {}
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule):
+        self.rules[rule.key] = rule
+
+    def __getitem__(self, key):
+        return self.rules[key]
+
+    def __contains__(self, key):
+        return key in self.rules
+
+    @classmethod
+    def from_specs(cls, specs):
+        return cls(Rule.from_spec(spec) for spec in specs)
+
+    def specs(self):
+        return [rule.spec() for rule in self]
+
+    def unregister(self, key):
+        self.rules.pop(key, None)
+
+    def __iter__(self):
+        return iter(self.rules.values())
+
+    def __len__(self):
+        return len(self.rules)
+
+SHIPPED_RULES = [
+    Rule("R1", "model1", [("SS", "omega >= 1.1 and 0 < delta < 6.6")], "IM"),
+    Rule("R2", "model2", [("SS", "0 < delta < 6.6 and 3.2 > enthalpy_of_mixing > -11.6")], "IM"),
+    Rule("R3", "model3", [("SS", "gamma < 1.175 and 3.2 > enthalpy_of_mixing > -11.6")], "IM"),
+    # the bracketed verdicts are for the Λ, ΔHmix pairs outside the four regions of the map
+    Rule("R4", "model4", [("IM", "lambda_ < 0.24 and enthalpy_of_mixing < -15"),
+                          ("SS+IM", "0.24 <= lambda_ <= 0.96 and -15 <= enthalpy_of_mixing <= -5"),
+                          ("SS", "0.96 <= lambda_ and -5 <= enthalpy_of_mixing <= 0"),
+                          ("SS+SS", "0.96 <= lambda_ and 0 < enthalpy_of_mixing"),
+                          ("[IM]", "lambda_ < 0.24"),
+                          ("[SS]", "0.96 < lambda_")], "[Mixed]"),
+    Rule("R5", "model6", [("SS", "-1 * (melting_temp * 0.55) * mixing_entropy * 1.04 * 10 ** -2 "
+                                 "<= lowest_formation_enthalpy <= 37")], "IM"),
+    Rule("R6", "model7", [("SS", "omega_an * (1 - 0.6) + 1 > im_ratio")], "IM",
+         detail="{verdict} (Tₐₙ: {annealing_temperature:.1f} K)"),
+]
\ No newline at end of file
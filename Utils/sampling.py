@@ -0,0 +1,358 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/sampling.py
+
+import math
+import numpy as np
+
+BATCH_SIZE = 4096  # sequence points drawn at a time
+RESOLUTION = 0.01  # at% the samples are rounded to, so alloy names stay readable
+MAX_DRAWS_PER_SAMPLE = 1000  # gives up when the element bounds reject nearly every point
+# VEC ranges of the crystal structures that are a single interval, BCC (VEC <= 6.87 outside of HCP) is not
+CSTR_VEC_RANGES = {"HCP": (2.5, 3.5), "FCC": (8.0, math.inf), "BCC + FCC": (6.87, 8.0)}
+
+def primes(count):
+    """returns the first count prime numbers."""
+    found = []
+    candidate = 2
+    while len(found) < count:
+        if all(candidate % p for p in found if p * p <= candidate):
+            found.append(candidate)
+        candidate += 1
+    return found
+
+def radical_inverse(indices, base, permutation=None):
+    """van der Corput radical inverse of each index in base, the digits optionally permuted (scrambled)."""
+    indices = np.asarray(indices, dtype=np.int64).copy()
+    result = np.zeros(len(indices))
+    factor = 1.0 / base
+    while indices.any():
+        digits = indices % base
+        result += (permutation[digits] if permutation is not None else digits) * factor
+        indices //= base
+        factor /= base
+    return result
+
+class Halton:
+    """Halton low-discrepancy sequence in [0, 1)^dimensions, drawn in consecutive chunks.
+
+    With a seed the digits of every dimension are randomly permuted (0 kept in place), which removes the
+    correlation between the high dimensions of the plain sequence while keeping its low discrepancy.
+    """
+
+    def __init__(self, dimensions, seed=None):
+        self.bases = primes(dimensions)
+        self.permutations = [None] * dimensions
+        if seed is not None:
+            rng = np.random.default_rng(seed)
+            self.permutations = [np.concatenate(([0], 1 + rng.permutation(base - 1))) for base in self.bases]
+        self.index = 1  # the point at index 0 is the origin
+
+    def points(self, start, count):
+        """returns the points at indices start..start + count as a (count, dimensions) array."""
+        indices = np.arange(start, start + count)
+        if not self.bases:
+            return np.empty((count, 0))
+        return np.column_stack([radical_inverse(indices, base, permutation)
+                                for base, permutation in zip(self.bases, self.permutations)])
+
+    def draw(self, count):
+        """returns the next count points as a (count, dimensions) array."""
+        points = self.points(self.index, count)
+        self.index += count
+        return points
+
+def to_simplex(points):
+    """maps points of [0, 1)^(k-1) uniformly onto the k-simplex, the spacings of each row's sorted coordinates."""
+    points = np.sort(points, axis=1)
+    edges = np.column_stack([np.zeros(len(points)), points, np.ones(len(points))])
+    return np.diff(edges, axis=1)
+
+def round_rows_to_step(at_percents, step):
+    """rounds every row of an at% array to multiples of step that still sum up to 100, the units missing after
+    rounding down going to the largest remainders of the row."""
+    units = np.asarray(at_percents, dtype=float) / step
+    rounded = np.floor(units)
+    missing = np.rint(100 / step - rounded.sum(axis=1)).astype(np.int64)
+    order = np.argsort(rounded - units, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(units.shape[1]), units.shape), axis=1)
+    return (rounded + (ranks < missing[:, None])) * step
+
+class SimplexSampler:
+    """quasi-random compositions spread uniformly over {lower <= x <= upper, sum(x) = 100}, lower/upper in at%.
+
+    Elements with lower == upper are fixed, the simplex of the others is scaled into the space the lower bounds
+    leave, so its dimension is the number of free elements - 1, and the points above the upper bounds are
+    skipped. The points come from consecutive batches of the sequence, a cursor (sequence index of a batch,
+    accepted points of it already produced) is all it takes to continue the compositions, see batches().
+    """
+
+    def __init__(self, lower, upper, seed=None):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        if len(self.lower) < 2:
+            raise ValueError("Sampling needs at least two elements.")
+        if self.lower.sum() > 100 or self.upper.sum() < 100 or (self.lower > self.upper).any():
+            raise ValueError("The element ranges do not allow a composition that sums up to 100%.")
+        self.free = self.upper - self.lower > 1e-9
+        self.sequence = Halton(max(int(self.free.sum()) - 1, 0), seed)
+        self.draws = 0
+        self.accepted = 0
+
+    def accepted_points(self, start, count):
+        """the compositions of the sequence points start..start + count, rounded to RESOLUTION, that are within
+        the bounds, as at% rows."""
+        points = np.tile(self.lower, (count, 1))
+        if self.free.any():
+            points[:, self.free] += (100 - self.lower.sum()) * to_simplex(self.sequence.points(start, count))
+        points = np.round(round_rows_to_step(points, RESOLUTION), 2)
+        return points[(points >= self.lower - 1e-9).all(axis=1) & (points <= self.upper + 1e-9).all(axis=1)]
+
+    def batches(self, count, block_size=None, cursor=None, batch_size=BATCH_SIZE):
+        """yields (at% rows, cursor) until count compositions have been produced, at most block_size rows at a
+        time. cursor is where the compositions after the yielded rows come from, batches(rest, cursor=cursor)
+        continues with them; None starts at the beginning of the sequence."""
+        index, skip = cursor or (1, 0)
+        produced = 0
+        max_draws = MAX_DRAWS_PER_SAMPLE * count
+        drawn = 0
+        while produced < count:
+            if drawn >= max_draws:
+                raise ValueError("The element ranges leave too little room, almost every sample is outside of them.")
+            points = self.accepted_points(index, batch_size)
+            drawn += batch_size
+            self.draws += batch_size
+            while skip < len(points) and produced < count:
+                block = points[skip:skip + min(block_size or len(points), count - produced)]
+                skip += len(block)
+                produced += len(block)
+                self.accepted += len(block)
+                yield block, ((index, skip) if skip < len(points) else (index + batch_size, 0))
+            index, skip = index + batch_size, 0
+
+class SampledCompositions:
+    """the count compositions a seeded SimplexSampler draws within the (start, end) ranges of selected_elements.
+
+    They are made block by block while a sweep calculates them instead of being kept in a list, spec() and the
+    cursor of the last block calculated are all a checkpoint needs to make the rest of them again.
+    """
+
+    def __init__(self, selected_elements, count, seed=None):
+        self.selected_elements = {el: (float(start), float(end)) for el, (start, end) in selected_elements.items()}
+        self.elements = list(selected_elements)
+        self.count = int(count)
+        self.seed = seed
+        lower, upper = zip(*self.selected_elements.values())
+        self.sampler = SimplexSampler(lower, upper, seed)
+
+    def __len__(self):
+        return self.count
+
+    def spec(self):
+        return {"kind": "simplex", "elements": {el: list(at_range) for el, at_range in self.selected_elements.items()},
+                "count": self.count, "seed": self.seed}
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec["elements"], spec["count"], spec["seed"])
+
+    def check(self):
+        """raises ValueError when the element ranges leave too little room to sample, before any calculation."""
+        next(self.sampler.batches(1), None)
+
+    def blocks(self, size, position=0, cursor=None):
+        """yields ((elements, at% rows), cursor) of the compositions after position, at most size at a time;
+        cursor is the one of the block before position, see SimplexSampler.batches()."""
+        for points, cursor in self.sampler.batches(self.count - position, size, cursor):
+            yield (self.elements, points), cursor
+
+def linear_constraints(engine, elements, restriction_values):
+    """returns (A, b) with A @ x <= b for the atomic fractions x meeting the filter's ranges that are linear in them.
+
+    VEC and Tm are weighted sums, ρ_min <= Σxw / Σxv <= ρ_max is Σx(w - ρ_max v) <= 0 <= Σx(w - ρ_min v). Tm is
+    rounded up by Engine, so its range is widened to the sums that round into it. The other filters stay
+    with Engine.
+    """
+    properties = [engine.periodic_table[el]["properties"] for el in elements]
+    weight, volume, nvalence, melting_point = (
+        np.array([float(p[name]) for p in properties])
+        for name in ("atomic_weight", "atomic_volume", "nvalence", "melting_point"))
+    rows, bounds = [], []
+
+    def between(coefficients, low, high):
+        if low > -math.inf:
+            rows.append(-coefficients)
+            bounds.append(-low)
+        if high < math.inf:
+            rows.append(coefficients)
+            bounds.append(high)
+
+    for property, restriction in restriction_values.items():
+        if isinstance(restriction, dict):
+            low, high = float(restriction["min"]), float(restriction["max"])
+            if property == "vec":
+                between(nvalence, low, high)
+            elif property == "melting_temp":
+                between(melting_point, math.ceil(low) - 1, math.floor(high))
+            elif property == "density":
+                between(weight - low * volume, 0, math.inf)
+                between(weight - high * volume, -math.inf, 0)
+        elif property == "cstr" and restriction in CSTR_VEC_RANGES:
+            between(nvalence, *CSTR_VEC_RANGES[restriction])
+    return np.array(rows).reshape(-1, len(elements)), np.array(bounds)
+
+def linear_program(c, A_ub, b_ub, A_eq, b_eq, tolerance=1e-10):
+    """minimizes c @ x subject to A_ub @ x <= b_ub, A_eq @ x = b_eq and x >= 0 with the two-phase simplex method
+    (Bland's rule), for the few constraints of a sampler. Returns None if there is no such x, assumes a bounded
+    problem."""
+    n, m_ub = len(c), len(b_ub)
+    m = m_ub + len(b_eq)
+    width = n + m_ub + m
+    tableau = np.zeros((m, width + 1))
+    tableau[:m_ub, :n] = A_ub
+    tableau[:m_ub, n:n + m_ub] = np.eye(m_ub)
+    tableau[m_ub:, :n] = A_eq
+    tableau[:, -1] = np.concatenate([b_ub, b_eq])
+    tableau[tableau[:, -1] < 0] *= -1
+    tableau[:, n + m_ub:width] = np.eye(m)  # artificial variables, the first basis
+    basis = list(range(n + m_ub, width))
+
+    def pivot(row, column):
+        tableau[row] /= tableau[row, column]
+        for other in range(m):
+            if other != row and tableau[other, column] != 0:
+                tableau[other] -= tableau[other, column] * tableau[row]
+        basis[row] = column
+
+    def optimize(cost, columns):
+        while True:
+            reduced = cost[:columns] - cost[basis] @ tableau[:, :columns]
+            entering = np.flatnonzero(reduced < -tolerance)
+            if not len(entering):
+                return
+            column = entering[0]
+            rows = np.flatnonzero(tableau[:, column] > tolerance)
+            ratios = tableau[rows, -1] / tableau[rows, column]
+            ties = rows[ratios <= ratios.min() + tolerance]
+            pivot(min(ties, key=lambda row: basis[row]), column)
+
+    optimize(np.concatenate([np.zeros(n + m_ub), np.ones(m)]), width)
+    if tableau[[row for row in range(m) if basis[row] >= n + m_ub], -1].sum() > 1e-9:
+        return None
+    for row in range(m):  # drives the artificial variables left at 0 out of the basis
+        if basis[row] >= n + m_ub:
+            columns = np.flatnonzero(np.abs(tableau[row, :n + m_ub]) > tolerance)
+            if len(columns):
+                pivot(row, columns[0])
+    optimize(np.concatenate([c, np.zeros(m_ub + m)]), n + m_ub)
+    x = np.zeros(width)
+    x[basis] = tableau[:, -1]
+    return x[:n]
+
+class PolytopeSampler:
+    """compositions spread uniformly over the polytope of the element ranges and linear constraints A @ x <= b.
+
+    Hit-and-run: every chain moves along a random direction that keeps the sum at 100%, to a uniform point of
+    the chord through the polytope. The chains run side by side as numpy arrays and are thinned, so every
+    sample is inside the polytope by construction. The constraints are tightened by the most the rounding to
+    RESOLUTION can move a sample, lower/upper in at%, x in atomic fractions.
+    """
+
+    def __init__(self, lower, upper, A, b, seed=None, chains=64, burn_in=500, thinning=None):
+        self.lower = np.asarray(lower, dtype=float) / 100
+        self.upper = np.asarray(upper, dtype=float) / 100
+        if len(self.lower) < 2:
+            raise ValueError("Sampling needs at least two elements.")
+        if self.lower.sum() > 1 or self.upper.sum() < 1 or (self.lower > self.upper).any():
+            raise ValueError("The element ranges do not allow a composition that sums up to 100%.")
+        self.free = self.upper - self.lower > 1e-12  # fixed elements never move
+        A, b = np.asarray(A, dtype=float).reshape(-1, len(self.lower)), np.asarray(b, dtype=float)
+        b = b - RESOLUTION / 100 * np.abs(A - np.median(A, axis=1, keepdims=True)).sum(axis=1)
+        self.A, self.b = A, b
+        self.rng = np.random.default_rng(seed)
+        self.thinning = thinning or len(self.lower)
+        self.draws = 0
+        self.accepted = 0
+        start = self.interior_point()
+        self.chains = np.tile(start, (chains, 1))
+        for _ in range(burn_in):
+            self.step()
+
+    def feasible(self, points, tolerance=1e-9):
+        return ((points >= self.lower - tolerance).all(axis=1) & (points <= self.upper + tolerance).all(axis=1) &
+                (points @ self.A.T <= self.b + tolerance).all(axis=1))
+
+    def interior_point(self):
+        """returns the composition deepest inside the polytope, the largest margin s to every constraint."""
+        # constraints on the fixed elements only are a constant, which either always or never holds
+        directions = np.where(self.free, self.A, 0)
+        directions = directions - np.where(self.free, directions.sum(axis=1, keepdims=True) / self.free.sum(), 0)
+        norms = np.linalg.norm(directions, axis=1)
+        constant = norms < 1e-12
+        if (self.A[constant] @ self.lower > self.b[constant] + 1e-9).any():
+            raise ValueError("No composition within the element ranges meets the filter's VEC, Tm and density ranges.")
+        A, b = self.A[~constant] / norms[~constant, None], self.b[~constant] / norms[~constant]
+
+        # y = x - lower >= 0 and s >= 0: maximize s subject to A(lower + y) + s <= b, s <= y <= upper - lower - s
+        # for the free elements, y = 0 for the fixed ones and sum(y) = 1 - sum(lower)
+        k = len(self.lower)
+        free = self.free.astype(float)
+        identity = np.eye(k)
+        A_ub = np.vstack([np.column_stack([A, np.ones(len(A))]),
+                          np.column_stack([identity, free]),
+                          np.column_stack([-identity[self.free], np.ones(self.free.sum())]),
+                          np.append(np.zeros(k), 1.0)[None]])
+        b_ub = np.concatenate([b - A @ self.lower, self.upper - self.lower, np.zeros(self.free.sum()), [1.0]])
+        A_eq = np.append(np.ones(k), 0.0)[None]
+        b_eq = np.array([1 - self.lower.sum()])
+        solution = linear_program(np.append(np.zeros(k), -1.0), A_ub, b_ub, A_eq, b_eq)
+        if solution is None or solution[-1] <= 1e-12:
+            raise ValueError("No composition within the element ranges meets the filter's VEC, Tm and density ranges.")
+        return self.lower + solution[:k]
+
+    def step(self):
+        """moves every chain once."""
+        x = self.chains
+        d = self.rng.normal(size=x.shape) * self.free
+        d -= self.free * (d.sum(axis=1, keepdims=True) / self.free.sum())
+        d /= np.linalg.norm(d, axis=1, keepdims=True)
+        G = np.vstack([self.A, np.eye(len(self.lower)), -np.eye(len(self.lower))])
+        h = np.concatenate([self.b, self.upper, -self.lower])
+        slack = np.maximum(h - x @ G.T, 0)
+        rate = d @ G.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limits = slack / rate
+        t_max = np.where(rate > 1e-15, limits, np.inf).min(axis=1)
+        t_min = np.where(rate < -1e-15, limits, -np.inf).max(axis=1)
+        t = t_min + (t_max - t_min) * self.rng.random(len(x))
+        self.chains = x + t[:, None] * d
+
+    def batches(self, count):
+        """yields arrays of at% rows until count compositions have been produced."""
+        produced = 0
+        while produced < count:
+            for _ in range(self.thinning):
+                self.step()
+            self.draws += len(self.chains)
+            points = np.round(round_rows_to_step(self.chains * 100, RESOLUTION), 2)
+            points = points[self.feasible(points / 100)][:count - produced]
+            produced += len(points)
+            self.accepted += len(points)
+            if len(points):
+                yield points
+
+def sample_polytope_compositions(engine, selected_elements, restriction_values, count, seed=None):
+    """returns count {element: at%} compositions within the (start, end) ranges of selected_elements that meet
+    the linear ranges of restriction_values."""
+    elements = list(selected_elements)
+    lower, upper = zip(*selected_elements.values())
+    A, b = linear_constraints(engine, elements, restriction_values)
+    sampler = PolytopeSampler(lower, upper, A, b, seed)
+    compositions = []
+    for points in sampler.batches(count):
+        compositions.extend({el: float(at_p) for el, at_p in zip(elements, point)} for point in points)
+    return compositions
\ No newline at end of file
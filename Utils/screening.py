@@ -0,0 +1,130 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/screening.py
+
+import itertools
+import math
+
+import numpy as np
+
+from Utils.alloy_names import alloy_name
+from Utils.jobs import CHUNK_SIZE, process_engine
+from Utils.lattice import CompositionLattice
+from Utils.ranking import TopK, objective_score
+from Utils.rules import SHIPPED_RULES
+
+MAX_DELTA = 6.6  # δ limit of R1 and R2
+R5_MAX_FORMATION_ENTHALPY = 37
+ELEMENT_PROPERTIES = ("atomic_weight", "atomic_volume", "atomic_radius", "nvalence", "melting_point")
+
+def requires_ss(engine, restriction_values, key):
+    """True when the filter only lets alloys through that the shipped rule key predicts SS for. Rules whose
+    thresholds differ from the shipped ones, e.g. of a calibrated threshold set, are never assumed to."""
+    shipped = next(rule for rule in SHIPPED_RULES if rule.key == key)
+    if key not in engine.rules or engine.rules[key].spec() != shipped.spec():
+        return False
+    restriction = restriction_values.get(key)
+    return isinstance(restriction, str) and shipped.code(restriction) == shipped.codes["SS"]
+
+def delta_limits(engine, restriction_values):
+    """the upper bounds of δ the filter puts on every passing alloy, as (limit, inclusive) pairs: the maximum of
+    a δ range and the δ < MAX_DELTA of R1 and R2 when one of them has to predict SS."""
+    limits = []
+    restriction = restriction_values.get("delta")
+    if isinstance(restriction, dict):
+        try:
+            limits.append((float(restriction.get("max")), True))
+        except (TypeError, ValueError):
+            pass
+    if requires_ss(engine, restriction_values, "model1") or requires_ss(engine, restriction_values, "model2"):
+        limits.append((MAX_DELTA, False))
+    return limits
+
+def prune_reason(engine, elements, min_fraction=0.0, restriction_values=None):
+    """returns why no composition of elements can pass the composition-independent checks, or None.
+
+    The checks are the same whatever the composition: element data has to exist and, only
+    as far as restriction_values constrains them, the binary formation enthalpies have to allow R5 to predict SS
+    and the radii have to allow δ below the limits of delta_limits() when every element has at least min_fraction.
+    """
+    restriction_values = restriction_values or {}
+    for element in elements:
+        properties = engine.periodic_table.get(element, {}).get("properties", {})
+        if any(properties.get(name) in (None, "", "NaN") for name in ELEMENT_PROPERTIES):
+            return "missing element data"
+
+    # no check of the mixing enthalpies, Engine takes a pair without data as 0
+    # same pair order as Engine, R5 only reads fusion_enthalpy_data[first][second]
+    pairs = list(itertools.combinations(elements, 2))
+    if requires_ss(engine, restriction_values, "model6"):
+        formation_enthalpies = [engine.fusion_enthalpy_data[first][second] for first, second in pairs
+                                if first in engine.fusion_enthalpy_data and second in engine.fusion_enthalpy_data[first]]
+        if not formation_enthalpies:
+            return "no formation enthalpy data for R5"
+        lowest = min(formation_enthalpies)
+        if lowest > R5_MAX_FORMATION_ENTHALPY:
+            return "R5 formation enthalpy above its limit"
+        # Tm and ΔSmix are at most the highest melting point and R ln(k), the most permissive R5 lower bound
+        melting_point = math.ceil(max(float(engine.periodic_table[el]["properties"]["melting_point"])
+                                      for el in elements))
+        if lowest < -0.55 * melting_point * engine.R * math.log(len(elements)) * 1.04e-2:
+            return "R5 formation enthalpy below its limit"
+
+    # δ² = Σ cᵢ(1 - rᵢ/r̄)² >= min_fraction * Σ (1 - rᵢu)² over u = 1/r̄ in [1/max r, 1/min r], a convex quadratic in u
+    limits = delta_limits(engine, restriction_values)
+    if min_fraction > 0 and limits:
+        radii = [float(engine.periodic_table[el]["properties"]["atomic_radius"]) for el in elements]
+        u = min(max(sum(radii) / sum(r * r for r in radii), 1 / max(radii)), 1 / min(radii))
+        lower_bound = math.sqrt(min_fraction * sum((1 - r * u) ** 2 for r in radii)) * 100
+        for limit, inclusive in limits:
+            if lower_bound > limit or (lower_bound == limit and not inclusive):
+                return f"δ cannot be below {limit:g}%"
+    return None
+
+def screen_system(task):
+    """sweeps one element system, returns its statistics, its best alloy as a [values, alloy_name] row and the
+    message of the engine giving its numba backend up or None.
+
+    task is (elements, start, end, step_size, restriction_values, objective expression, maximize, rule specs), this
+    runs in the worker processes of SubsetScreeningWorker, each with its own Engine. The rule specs are those of
+    the threshold set in use, None for the shipped rules. The lattice of the system is calculated in
+    calculate_batch() blocks of CHUNK_SIZE compositions, the best alloy kept by a TopK of one.
+    """
+    elements, start, end, step_size, restriction_values, expression, maximize, rules = task
+    engine = process_engine(rules)
+    best = TopK(expression, 1, maximize)
+    lattice = CompositionLattice({el: (start, end) for el in elements}, step_size)
+    meeting_criteria = 0
+    for first in range(0, len(lattice), CHUNK_SIZE):
+        at_percents = lattice.unrank_range(first, first + CHUNK_SIZE).astype(float)
+        try:
+            values, meets_criteria = engine.calculate_batch(lattice.elements, at_percents / 100, restriction_values)
+        except ValueError:
+            break  # "Not enough data" for an element of the system, as for every composition of it
+        rows = np.flatnonzero(meets_criteria)
+        meeting_criteria += len(rows)
+        best.push_batch(values, rows, lambda j: (engine.batch_row(values, j),
+                                                 alloy_name(dict(zip(lattice.elements, at_percents[j].tolist())))))
+    best_row = best.results()[0] if best.heap else None
+    return {
+        "system": "".join(elements),
+        "compositions": len(lattice),
+        "meeting_criteria": meeting_criteria,
+        "share": meeting_criteria / len(lattice) if len(lattice) else 0.0,
+        "best_alloy": best_row[1] if best_row else None,
+        "best_score": objective_score(best.objective, best_row[0]) if best_row else None,
+    }, best_row, engine.take_backend_message()
+
+def rank_systems(systems, maximize=True):
+    """sorts system statistics by their share of alloys meeting the criteria, then by their best score."""
+    def key(system):
+        score = system["best_score"]
+        if score is None:
+            score = -math.inf
+        elif not maximize:
+            score = -score
+        return (-system["share"], -score)
+    return sorted(systems, key=key)
\ No newline at end of file
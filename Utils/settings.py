@@ -29,4 +29,18 @@ class Settings:
 
     def set_theme(self, theme):
         self.settings["theme"] = theme
+        self.save_settings()
+
+    def get_profiling(self):
+        return self.settings.get("profiling", "off")
+
+    def set_profiling(self, profiling):
+        self.settings["profiling"] = profiling
+        self.save_settings()
+
+    def get_threshold_set(self):
+        return self.settings.get("threshold_set")
+
+    def set_threshold_set(self, name):
+        self.settings["threshold_set"] = name
         self.save_settings()
\ No newline at end of file
@@ -0,0 +1,199 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/summary.py
+
+import math
+import numpy as np
+
+RULES = {"R1": "model1", "R2": "model2", "R3": "model3", "R4": "model4", "R5": "model6", "R6": "model7"}
+# property -> (first bin edge, last bin edge), omega is binned and correlated as log10 because of its 1e10 sentinel
+HISTOGRAM_RANGES = {"density": (0, 25), "delta": (0, 50), "gamma": (1, 3), "enthalpy_of_mixing": (-100, 50),
+                    "vec": (0, 12), "mixing_entropy": (0, 20), "melting_temp": (0, 4000), "omega": (-2, 4)}
+PROPERTIES = list(HISTOGRAM_RANGES)
+CRYSTAL_STRUCTURES = ["HCP", "FCC", "BCC", "BCC + FCC"]
+BINS = 50
+BLOCK_SIZE = 1000
+
+def verdict(text):
+    """reduces a rule result such as "SS (Tₐₙ: 1200 K)" to its phase prediction."""
+    return text.split(" ")[0] if text else text
+
+class SummaryStatistics:
+    """streaming aggregates of a sweep in fixed memory: rule verdict counts, crystal structure split, rule
+    agreement, descriptor histograms, means and correlations.
+
+    Every calculated alloy is summarized, meeting_criteria counts the ones that pass the filter. Blocks of
+    calculate_batch() are folded from their code arrays and descriptor columns with push_batch(), calculate()
+    values are buffered by push() and folded BLOCK_SIZE at a time. Two summaries of disjoint sweeps, e.g. of the
+    chunks of parallel processes, can be merge()d.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.meeting_criteria = 0
+        self.moment_count = 0  # alloys with every descriptor finite, the ones the moments are taken over
+        self.rule_counts = {rule: {} for rule in RULES}
+        self.cstr_counts = {}
+        self.agreement = np.zeros((len(RULES), len(RULES)), dtype=np.int64)  # alloys on which two rules agree
+        self.all_agree = 0
+        self.histograms = np.zeros((len(PROPERTIES), BINS + 2), dtype=np.int64)  # with underflow and overflow
+        self.mean = np.zeros(len(PROPERTIES))
+        self.comoments = np.zeros((len(PROPERTIES), len(PROPERTIES)))  # sums of products of deviations
+        self.minimum = np.full(len(PROPERTIES), np.inf)
+        self.maximum = np.full(len(PROPERTIES), -np.inf)
+        self.block = []
+
+    def spec(self):
+        return {"kind": "summary"}
+
+    def push(self, values, alloy_name, meets_criteria=True):
+        """offers the calculate() values of one alloy."""
+        self.block.append((values, meets_criteria))
+        if len(self.block) >= BLOCK_SIZE:
+            self.flush()
+        return True
+
+    def push_batch(self, values, meets_criteria, rules):
+        """folds the values and meets_criteria of a calculate_batch() block, rules the registry that made them."""
+        self.merge(self.from_arrays(values, meets_criteria, rules))
+
+    def flush(self):
+        if self.block:
+            self.merge(self.from_block(self.block))
+            self.block = []
+
+    @classmethod
+    def from_block(cls, block):
+        """summarizes a list of (Engine.calculate values, meets criteria) in one vectorized pass."""
+        texts = np.array([[verdict(values[key]) for key in RULES.values()] for values, _ in block], dtype=object)
+        labels, verdicts = np.unique(texts, return_inverse=True)
+        cstr = np.array([values["cstr"] for values, _ in block], dtype=object)
+        data = np.array([[values[p] for p in PROPERTIES] for values, _ in block], dtype=float)
+        meets_criteria = np.array([meets for _, meets in block], dtype=bool)
+        return cls._from_columns(labels.tolist(), verdicts.reshape(texts.shape), cstr, data, meets_criteria)
+
+    @classmethod
+    def from_arrays(cls, values, meets_criteria, rules):
+        """summarizes a calculate_batch() block straight from its verdict codes and descriptor columns."""
+        labels = list(dict.fromkeys(label for key in RULES.values() for label in rules[key].labels))
+        # each rule's codes mapped to indices into labels, so the verdicts of different rules can be compared
+        verdicts = np.column_stack([np.array([labels.index(label) for label in rules[key].labels])[values[key]]
+                                    for key in RULES.values()])
+        data = np.column_stack([np.asarray(values[p], dtype=float) for p in PROPERTIES])
+        return cls._from_columns(labels, verdicts, values["cstr"], data, np.asarray(meets_criteria, dtype=bool))
+
+    @classmethod
+    def _from_columns(cls, labels, verdicts, cstr, data, meets_criteria):
+        """verdicts is an (alloys, RULES) array of indices into labels, data an (alloys, PROPERTIES) array."""
+        summary = cls()
+        summary.count = len(verdicts)
+        summary.meeting_criteria = int(np.count_nonzero(meets_criteria))
+        for i, rule in enumerate(RULES):
+            counts = np.bincount(verdicts[:, i], minlength=len(labels))
+            summary.rule_counts[rule] = {labels[k]: int(n) for k, n in enumerate(counts) if n}
+        for label in CRYSTAL_STRUCTURES:
+            n = int(np.count_nonzero(cstr == label))
+            if n:
+                summary.cstr_counts[label] = n
+        same = verdicts[:, :, None] == verdicts[:, None, :]
+        summary.agreement = same.sum(axis=0)
+        summary.all_agree = int(same.all(axis=(1, 2)).sum())
+
+        omega = PROPERTIES.index("omega")
+        with np.errstate(divide="ignore"):
+            data[:, omega] = np.log10(data[:, omega])
+        for i, (low, high) in enumerate(HISTOGRAM_RANGES.values()):
+            bins = np.floor((data[:, i] - low) / (high - low) * BINS)
+            bins = np.clip(np.nan_to_num(bins, nan=BINS + 1, posinf=BINS + 1, neginf=-1), -1, BINS) + 1
+            summary.histograms[i] = np.bincount(bins.astype(np.int64), minlength=BINS + 2)
+        data = data[np.isfinite(data).all(axis=1)]
+        if len(data):
+            summary.mean = data.mean(axis=0)
+            deviations = data - summary.mean
+            summary.comoments = deviations.T @ deviations
+            summary.minimum = data.min(axis=0)
+            summary.maximum = data.max(axis=0)
+        summary.moment_count = len(data)
+        return summary
+
+    def merge(self, other):
+        """adds the statistics of another, disjoint summary (Chan et al. pairwise update for the moments)."""
+        other.flush()
+        n_a, n_b = self.moment_count, other.moment_count
+        if n_b:
+            delta = other.mean - self.mean
+            total = n_a + n_b
+            self.comoments = self.comoments + other.comoments + np.outer(delta, delta) * n_a * n_b / total
+            self.mean = self.mean + delta * n_b / total
+        self.moment_count = n_a + n_b
+        self.count += other.count
+        self.meeting_criteria += other.meeting_criteria
+        for rule in RULES:
+            for label, n in other.rule_counts[rule].items():
+                self.rule_counts[rule][label] = self.rule_counts[rule].get(label, 0) + n
+        for label, n in other.cstr_counts.items():
+            self.cstr_counts[label] = self.cstr_counts.get(label, 0) + n
+        self.agreement += other.agreement
+        self.all_agree += other.all_agree
+        self.histograms += other.histograms
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+
+    def results(self):
+        """a summary keeps no rows."""
+        return []
+
+    def report(self):
+        """returns the summary as a JSON serializable dict."""
+        self.flush()
+        n = self.moment_count
+        std = np.sqrt(np.diag(self.comoments) / n) if n else np.zeros(len(PROPERTIES))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlations = self.comoments / np.sqrt(np.outer(np.diag(self.comoments), np.diag(self.comoments)))
+        finite = lambda x: x if math.isfinite(x) else None
+        histograms = {}
+        for i, (prop, (low, high)) in enumerate(HISTOGRAM_RANGES.items()):
+            histograms[prop] = {"edges": np.linspace(low, high, BINS + 1).tolist(),
+                                "counts": self.histograms[i, 1:-1].tolist(),
+                                "below": int(self.histograms[i, 0]), "above": int(self.histograms[i, -1])}
+        return {
+            "alloys": self.count,
+            "meeting_criteria": self.meeting_criteria,
+            "rule_counts": self.rule_counts,
+            "crystal_structure_counts": self.cstr_counts,
+            "rule_agreement": {a: {b: int(self.agreement[i, j]) for j, b in enumerate(RULES)}
+                               for i, a in enumerate(RULES)},
+            "all_rules_agree": self.all_agree,
+            "descriptors": {prop: {"mean": finite(float(self.mean[i])) if n else None,
+                                   "std": finite(float(std[i])) if n else None,
+                                   "min": finite(float(self.minimum[i])), "max": finite(float(self.maximum[i]))}
+                            for i, prop in enumerate(PROPERTIES)},
+            "correlations": {a: {b: finite(float(correlations[i, j])) for j, b in enumerate(PROPERTIES)}
+                             for i, a in enumerate(PROPERTIES)},
+            "histograms": histograms,
+            "note": "omega statistics are of log10(omega)",
+        }
+
+    def dump(self):
+        self.flush()
+        return {"count": self.count, "meeting_criteria": self.meeting_criteria, "moment_count": self.moment_count,
+                "rule_counts": self.rule_counts, "cstr_counts": self.cstr_counts,
+                "agreement": self.agreement.tolist(), "all_agree": self.all_agree,
+                "histograms": self.histograms.tolist(), "mean": self.mean.tolist(),
+                "comoments": self.comoments.tolist(),
+                "minimum": [float(x) for x in self.minimum], "maximum": [float(x) for x in self.maximum]}
+
+    def load(self, state):
+        """restores dump() of a checkpoint."""
+        if not state:
+            return
+        self.count, self.moment_count, self.all_agree = state["count"], state["moment_count"], state["all_agree"]
+        self.meeting_criteria = state.get("meeting_criteria", self.count)  # older summaries only kept passing alloys
+        self.rule_counts, self.cstr_counts = state["rule_counts"], state["cstr_counts"]
+        self.agreement = np.array(state["agreement"], dtype=np.int64)
+        self.histograms = np.array(state["histograms"], dtype=np.int64)
+        self.mean, self.comoments = np.array(state["mean"]), np.array(state["comoments"])
+        self.minimum, self.maximum = np.array(state["minimum"]), np.array(state["maximum"])
\ No newline at end of file
@@ -0,0 +1,98 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/uncertainty.py
+
+import numpy as np
+
+from engine import ELEMENT_PROPERTIES
+from Utils.rules import NA
+
+# standard deviation of each data set of Engine.batch_data, "%" of the value or absolute in the data's units
+DEFAULT_ERROR_MODEL = {"atomic_weight": "0%", "atomic_volume": "1%", "atomic_radius": "1%", "nvalence": "0",
+                       "melting_point": "1%", "mixing_enthalpy": "1", "fusion_enthalpy": "2"}
+ERROR_LABELS = {"atomic_weight": "Atomic weight", "atomic_volume": "Atomic volume", "atomic_radius": "Atomic radius",
+                "nvalence": "Valence electrons", "melting_point": "Melting point",
+                "mixing_enthalpy": "ΔHₘᵢₓ of pairs (kJ/mol)", "fusion_enthalpy": "ΔH of formation of pairs"}
+RULES = {"R1": "model1", "R2": "model2", "R3": "model3", "R4": "model4", "R5": "model6", "R6": "model7"}
+DESCRIPTORS = ("density", "delta", "gamma", "enthalpy_of_mixing", "vec", "mixing_entropy", "melting_temp", "omega")
+SOLID_SOLUTIONS = ("SS", "SS+SS", "[SS]")
+ROWS_PER_CALL = 100000  # compositions x samples evaluated by one calculate_batch call
+
+def parse_error(text):
+    """returns (standard deviation, relative) of an error model entry such as "1%" or "0.5"."""
+    text = text.strip()
+    relative = text.endswith("%")
+    sd = float(text[:-1] if relative else text)
+    if not sd >= 0:
+        raise ValueError(f"Invalid standard deviation: {text}")
+    return (sd / 100 if relative else sd), relative
+
+def solid_solution(rule, codes):
+    """True where a rule's verdict codes predict a solid solution, R4's SS+SS and [SS] included."""
+    return np.isin(codes, [rule.code(label) for label in SOLID_SOLUTIONS])
+
+class UncertaintyModel:
+    """Monte Carlo propagation of data errors to the descriptors and rule verdicts of compositions of elements.
+
+    samples perturbed copies of the element and pair data are drawn once, normally distributed around the data
+    with the error model's standard deviations, and every composition is evaluated under all of them, so the
+    probabilities of different compositions are comparable. A block of compositions is repeated once per sample
+    and calculated with one Engine.calculate_batch call, each row with its own copy of the data.
+    """
+
+    def __init__(self, engine, elements, error_model, samples=200, seed=None):
+        self.engine = engine
+        self.elements = list(elements)
+        self.samples = samples
+        rng = np.random.default_rng(seed)
+        self.nominal = engine.batch_data(self.elements)
+        self.data = {}
+        for name, values in self.nominal.items():
+            sd, relative = parse_error(error_model.get(name, "0"))
+            scale = sd * np.abs(values) if relative else np.full(values.shape, sd)
+            perturbed = values + rng.standard_normal((samples,) + values.shape) * scale
+            if name in ELEMENT_PROPERTIES and name != "nvalence":
+                perturbed = np.maximum(perturbed, np.finfo(float).tiny)  # radii, volumes, ... stay positive
+            self.data[name] = perturbed
+
+    def propagate(self, fractions, restriction_values=None, confidence=0.95):
+        """evaluates an (n, elements) array of atomic fractions under the nominal and every perturbed data.
+
+        Returns a dict: "values" and "meets_criteria" of the nominal data as from calculate_batch,
+        "probability" {rule: (n,) share of samples predicting SS, NaN without data} plus "filter" for the share meeting
+        restriction_values, and "mean", "low" and "high" {descriptor: (n,)} bounding the central confidence
+        interval of the samples.
+        """
+        fractions = np.asarray(fractions, dtype=float)
+        values, meets_criteria = self.engine.calculate_batch(self.elements, fractions, restriction_values,
+                                                             self.nominal)
+        n = len(fractions)
+        probability = {rule: np.zeros(n) for rule in RULES}
+        probability["filter"] = np.zeros(n)
+        samples = {descriptor: np.empty((n, self.samples)) for descriptor in DESCRIPTORS}
+
+        block = max(1, ROWS_PER_CALL // self.samples)
+        for start in range(0, n, block):
+            rows = slice(start, min(start + block, n))
+            count = rows.stop - rows.start
+            # row r is composition start + r // samples under sample r % samples
+            repeated = np.repeat(fractions[rows], self.samples, axis=0)
+            data = {name: np.tile(drawn, (count, 1)) for name, drawn in self.data.items()}
+            perturbed, meets = self.engine.calculate_batch(self.elements, repeated, restriction_values, data)
+            for rule, key in RULES.items():
+                ss = np.where(perturbed[key] == NA, np.nan, solid_solution(self.engine.rules[key], perturbed[key]))
+                probability[rule][rows] = ss.reshape(count, self.samples).mean(axis=1)
+            probability["filter"][rows] = meets.reshape(count, self.samples).mean(axis=1)
+            for descriptor in DESCRIPTORS:
+                samples[descriptor][rows] = np.asarray(perturbed[descriptor], dtype=float).reshape(count, self.samples)
+
+        tail = (1 - confidence) / 2 * 100
+        result = {"values": values, "meets_criteria": meets_criteria, "probability": probability,
+                  "mean": {}, "low": {}, "high": {}}
+        for descriptor, drawn in samples.items():
+            result["mean"][descriptor] = drawn.mean(axis=1)
+            result["low"][descriptor], result["high"][descriptor] = np.percentile(drawn, [tail, 100 - tail], axis=1)
+        return result
\ No newline at end of file
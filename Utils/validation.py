@@ -0,0 +1,144 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Utils/validation.py
+
+import os
+import re
+import numpy as np
+import pandas as pd
+from Utils.alloy_names import alloy_name
+from Utils.io_helpers import find_composition_columns, parse_composition_row
+from Utils.result_set import ResultSet
+from Utils.rules import LABEL_ALIASES
+
+CLASSES = ["SS", "IM", "SS+IM"]  # observed phase classes, rows of the confusion matrices
+SS, IM, SS_IM, UNKNOWN = 0, 1, 2, -1
+PHASE_HEADERS = ["PHASE", "MICROSTRUCTURE", "STRUCTURE", "OBSERVED"]
+SOLID_SOLUTIONS = {"SS", "FCC", "BCC", "HCP", "FCC1", "FCC2", "BCC1", "BCC2", "A1", "A2", "A3", "DISORDERED"}
+INTERMETALLICS = {"IM", "B2", "L12", "L21", "D019", "D022", "LAVES", "C14", "C15", "C36", "SIGMA", "MU", "CHI",
+                  "ETA", "HEUSLER", "ORDERED", "INTERMETALLIC"}
+
+def phase_class(text):
+    """the class in CLASSES of a phase description such as "FCC + Laves" or of a verdict such as "[Mixed]",
+    UNKNOWN for amorphous alloys, "N/A" and anything else with a phase it does not know."""
+    text = LABEL_ALIASES.get(str(text).strip("[] "), str(text).strip("[] "))
+    tokens = [token for token in re.split(r"[\s+,;/&()]+|\bAND\b", text.upper()) if token]
+    kinds = {SS if token in SOLID_SOLUTIONS else IM if token in INTERMETALLICS else UNKNOWN for token in tokens}
+    if not kinds or UNKNOWN in kinds:
+        return UNKNOWN
+    return SS_IM if len(kinds) == 2 else kinds.pop()
+
+def find_phase_column(df):
+    """the first column of a DataFrame that holds the observed phases, None if there is none."""
+    for col in df.columns:
+        if any(header.lower() in str(col).lower() for header in PHASE_HEADERS):
+            return col
+    return None
+
+def read_labeled_dataset(file_path):
+    """reads the alloys of an Excel or CSV file with an alloy formula and an observed phase column, returns
+    ([{element: at%}], [phase text]). Rows without a formula are left out."""
+    if os.path.splitext(file_path)[1].lower() == ".csv":
+        df = pd.read_csv(file_path)
+    else:
+        df = pd.read_excel(file_path)
+    composition_columns = find_composition_columns(df)
+    phase_column = find_phase_column(df)
+    if not composition_columns or phase_column is None:
+        raise ValueError("The dataset needs an alloy formula and an observed phase column")
+    compositions, phases = [], []
+    for _, row in df.iterrows():
+        composition = parse_composition_row(row, composition_columns[:1])
+        if composition:
+            compositions.append(composition)
+            phases.append("" if pd.isna(row[phase_column]) else str(row[phase_column]))
+    return compositions, phases
+
+def scoring_classes(rule, observed):
+    """(the class of each label of rule, observed with SS+IM counted as IM if the rule never predicts SS+IM)."""
+    predicted_classes = np.array([phase_class(label) for label in rule.labels], dtype=np.int64)
+    if SS_IM not in predicted_classes:
+        observed = np.where(observed == SS_IM, IM, observed)
+    return predicted_classes, observed
+
+def element_systems(compositions):
+    """groups compositions by their elements. Returns (elements, at%, membership, systems, system_index): the
+    sorted elements of all compositions, the (compositions, elements) at% array, its at% > 0 mask, the distinct
+    rows of the mask and the index into them of every composition."""
+    elements = sorted({el for composition in compositions for el in composition})
+    columns = {el: i for i, el in enumerate(elements)}
+    at_percents = np.zeros((len(compositions), len(elements)))
+    for i, composition in enumerate(compositions):
+        for el, at_p in composition.items():
+            at_percents[i, columns[el]] += at_p
+    membership = at_percents > 0
+    systems, system_index = np.unique(membership, axis=0, return_inverse=True)
+    return elements, at_percents, membership, systems, system_index.reshape(-1)
+
+def validate(engine, compositions, phases):
+    """scores the rules of engine against the observed phases of compositions, returns (report, result_set).
+
+    Alloys are calculated in one calculate_batch() per element system. Verdicts and observations are reduced to
+    CLASSES; rules that never predict SS+IM count an observed SS+IM as IM. A rule's verdict on an alloy is
+    scored when both reduce to a class, its confusion matrix counts every alloy with a known observation against
+    the rule's labels, N/A included. Accuracy is also given over the alloys containing each element and over
+    each element system. result_set holds the calculated alloys, system by system.
+    """
+    n = len(compositions)
+    observed = np.array([phase_class(phase) for phase in phases], dtype=np.int64)
+    elements, at_percents, membership, systems, system_index = element_systems(compositions)
+
+    rules = list(engine.rules)
+    verdicts = {rule.key: np.zeros(n, dtype=np.uint8) for rule in rules}
+    calculated = np.zeros(n, dtype=bool)
+    result_set = ResultSet(rules)
+    for s, system in enumerate(systems):
+        rows = np.flatnonzero(system_index == s)
+        system_elements = [el for el, present in zip(elements, system) if present]
+        block = at_percents[np.ix_(rows, system)]
+        try:
+            values, _ = engine.calculate_batch(system_elements, block / 100)
+        except ValueError:
+            continue  # "Not enough data" for an element or pair of the system
+        for rule in rules:
+            verdicts[rule.key][rows] = values[rule.key]
+        calculated[rows] = True
+        result_set.append_batch(system_elements, block, values)
+
+    names = [alloy_name(composition) for composition in compositions]
+    report = {"alloys": n, "calculated": int(calculated.sum()), "unknown_phase": int((observed == UNKNOWN).sum()),
+              "rules": {}, "misclassified": []}
+    wrong = np.zeros((len(rules), n), dtype=bool)
+    for r, rule in enumerate(rules):
+        predicted_classes, rule_observed = scoring_classes(rule, observed)
+        predicted = predicted_classes[verdicts[rule.key]]
+        known = calculated & (rule_observed != UNKNOWN)
+        scored = known & (predicted != UNKNOWN)
+        correct = scored & (predicted == rule_observed)
+        wrong[r] = scored & ~correct
+        confusion = np.zeros((len(CLASSES), len(rule.labels)), dtype=np.int64)
+        np.add.at(confusion, (rule_observed[known], verdicts[rule.key][known]), 1)
+        element_scored = (membership & scored[:, None]).sum(axis=0)
+        element_correct = (membership & correct[:, None]).sum(axis=0)
+        system_scored = np.bincount(system_index, weights=scored, minlength=len(systems))
+        system_correct = np.bincount(system_index, weights=correct, minlength=len(systems))
+        report["rules"][rule.name] = {
+            "scored": int(scored.sum()),
+            "accuracy": float(correct.sum() / scored.sum()) if scored.any() else None,
+            "confusion": {"observed": CLASSES, "predicted": rule.labels, "counts": confusion.tolist()},
+            "elements": {el: {"scored": int(element_scored[i]), "accuracy": float(element_correct[i] / element_scored[i])}
+                         for i, el in enumerate(elements) if element_scored[i]},
+            "systems": {"".join(el for el, present in zip(elements, system) if present):
+                        {"scored": int(system_scored[s]), "accuracy": float(system_correct[s] / system_scored[s])}
+                        for s, system in enumerate(systems) if system_scored[s]},
+        }
+    for i in np.flatnonzero(wrong.any(axis=0)):
+        report["misclassified"].append({
+            "alloy": names[i], "observed": phases[i],
+            "wrong": [rule.name for r, rule in enumerate(rules) if wrong[r, i]],
+            "verdicts": {rule.name: rule.labels[verdicts[rule.key][i]] for rule in rules},
+        })
+    return report, result_set
\ No newline at end of file
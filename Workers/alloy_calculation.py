@@ -5,54 +5,194 @@
 #
 # Workers/alloy_calculation.py
 
-import tempfile
+import copy
 import time
-import json
+import numpy as np
 from PySide6.QtCore import QThread, Signal
+from Utils.alloy_names import alloy_name
+from Utils.checkpoint import Checkpoint, CHECKPOINT_INTERVAL
+from Utils.lattice import CompositionLattice
+from Utils.profiler import NULL_PROFILER
+from Utils.result_set import ResultSet
+from Utils.rules import SHIPPED_RULES, RuleRegistry
+from Utils.sampling import SampledCompositions
+
+BATCH_SIZE = 500  # compositions calculated with one Engine.calculate_batch call
 
 class AlloyCalculationWorker(QThread):
-    update_progress = Signal(int, int, float)
+    update_progress = Signal(int, int, float, float)
     finished = Signal()
-    all_results_ready = Signal(str, int)
+    all_results_ready = Signal(object, int)
+    paused = Signal(bool)
+    cancelled = Signal()
 
-    def __init__(self, compositions, engine, restriction_values):
+    def __init__(self, compositions, engine, restriction_values, profiler=NULL_PROFILER, checkpoint=None, label="",
+                 sink=None):
         super().__init__()
-        self.compositions = compositions
+        self.compositions = compositions  # a list of {element: at%}, a CompositionLattice or SampledCompositions
         self.engine = engine
         self.restriction_values = restriction_values
+        self.profiler = profiler
+        self.checkpoint = checkpoint
+        self.label = label
+        self.sink = sink  # TopK, ParetoFront or SummaryStatistics, collects the results instead of the result set
+        self.result_set = ResultSet(engine.rules)
+        self.written = 0  # rows of the result set in the checkpoint's results file
+        self.cursor = None  # of the sampled compositions after the ones calculated
         self.stop_requested = False
-        self.temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.json')
+        self.pause_requested = False
+        self.keep_checkpoint = False  # stop, but leave the checkpoint behind to resume later
 
     def run(self):
-        start_time = time.time()
-        results = []
-        count_meeting_criteria = 0
+        if self.checkpoint is None:
+            self.checkpoint = Checkpoint.create(self.compositions, self.restriction_values, self.label, self.sink,
+                                                self.engine.rules)
+        elif self.sink is None:
+            self.sink = self.checkpoint.sink()
+        checkpoint = self.checkpoint
+        sink = self.sink
+        engine = self.engine
+        rules = checkpoint.rules() or RuleRegistry(SHIPPED_RULES)
+        if "rules" in checkpoint.state and rules.specs() != engine.rules.specs():
+            # resumed after switching threshold sets, the sweep goes on with the set its results so far are from
+            self.engine = copy.copy(engine)
+            self.engine.rules = rules
+            self.result_set = ResultSet(rules)
+        results = checkpoint.open_results()
+        if checkpoint.state["results_bytes"]:
+            self.result_set = ResultSet.read_jsonl(checkpoint.results_file, self.engine.rules)
+            self.written = len(self.result_set)
+        result_set = self.result_set
+        first = checkpoint.position
+        count_meeting_criteria = checkpoint.count_meeting_criteria
         total_compositions = len(self.compositions)
+        profiler = self.profiler
+        self.engine.profiler = profiler
+        calculated = first
+        start_time = last_checkpoint = time.time()
+        self.cursor = checkpoint.cursor
 
-        for i, composition in enumerate(self.compositions):
+        i = first
+        for block, cursor in self.blocks(first, self.cursor):
+            if self.pause_requested:
+                self.save_checkpoint(calculated, count_meeting_criteria, results)
+                self.paused.emit(True)
+                pause_start = time.time()
+                while self.pause_requested and not self.stop_requested:
+                    time.sleep(0.05)
+                start_time += time.time() - pause_start
+                self.paused.emit(False)
             if self.stop_requested:
                 break
 
-            alloy_name = "".join(f"{el}{self._to_subscript(str(int(percent)))}" for el, percent in composition.items())
-            composition = {k: v / 100 for k, v in composition.items()}
+            count_meeting_criteria += self.calculate_block(block)
+            i += len(block[1]) if isinstance(block, tuple) else len(block)
+            calculated = i
+            self.cursor = cursor
+
+            now = time.time()
+            elapsed_time = now - start_time
+            done = i - first
+            estimated_time = elapsed_time / done * (total_compositions - i)
+            alloys_per_second = done / elapsed_time if elapsed_time > 0 else 0.0
+            self.update_progress.emit(i, total_compositions, estimated_time, alloys_per_second)
+            if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+                with profiler.stage("checkpointing"):
+                    self.save_checkpoint(calculated, count_meeting_criteria, results)
+                last_checkpoint = now
 
-            values, meets_criteria = self.engine.calculate(composition, self.restriction_values)
-            if meets_criteria:
-                results.append((values, alloy_name))
-                count_meeting_criteria += 1
+        self.engine.profiler = NULL_PROFILER
+        if self.engine is not engine and self.engine.backend_message:
+            engine.backend_message = self.engine.backend_message  # the window shows it
+        profiler.count("alloys calculated", calculated - first)
+        profiler.count("alloys meeting criteria", count_meeting_criteria)
 
-            if (i + 1) % 100 == 0 or i == total_compositions - 1:
-                elapsed_time = time.time() - start_time
-                estimated_time = elapsed_time / (i + 1) * (total_compositions - (i + 1))
-                self.update_progress.emit(i + 1, total_compositions, estimated_time)
+        if self.stop_requested:
+            if self.keep_checkpoint:
+                self.save_checkpoint(calculated, count_meeting_criteria, results)
+                results.close()
+            else:
+                results.close()
+                checkpoint.discard()
+            self.cancelled.emit()
+            self.finished.emit()
+            return
 
-        json.dump(results, self.temp_file)
-        self.temp_file.close()
-        self.all_results_ready.emit(self.temp_file.name, count_meeting_criteria)
+        if sink is not None:
+            # the shortlist replaces the results, best first, so the table and the export need no sorting
+            shortlist = sink.results()
+            with profiler.stage("collection"):
+                result_set.extend(shortlist)
+            count_meeting_criteria = len(shortlist)
+        # the result set is handed over in memory, the results file was only needed to resume
+        results.close()
+        checkpoint.discard()
+        self.all_results_ready.emit(result_set, count_meeting_criteria)
         self.finished.emit()
 
-    @staticmethod
-    def _to_subscript(num_str):
-        """Convert numbers to subscript format."""
-        subscript_map = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
-        return num_str.translate(subscript_map)
\ No newline at end of file
+    def save_checkpoint(self, position, count_meeting_criteria, results):
+        """appends the rows found since the last checkpoint to the results file and saves the checkpoint."""
+        with self.profiler.stage("serialization"):
+            self.result_set.write_jsonl(results, self.written)
+        self.written = len(self.result_set)
+        self.checkpoint.save(position, count_meeting_criteria, results, self.sink, self.cursor)
+
+    def blocks(self, position, cursor=None):
+        """yields (block, cursor) of the compositions after position, BATCH_SIZE at a time: slices of a list, or
+        (elements, at%) blocks of a CompositionLattice or SampledCompositions made as they are needed, with the
+        cursor after them."""
+        if isinstance(self.compositions, (CompositionLattice, SampledCompositions)):
+            yield from self.compositions.blocks(BATCH_SIZE, position, cursor)
+            return
+        for i in range(position, len(self.compositions), BATCH_SIZE):
+            yield self.compositions[i:i + BATCH_SIZE], None
+
+    def calculate_block(self, block):
+        """calculates a block of compositions into the result set, or the sink, and returns how many meet the
+        criteria. One calculate_batch() call for an (elements, at%) block or when the compositions all have the
+        same elements in the same order, as generated sweeps do, whose passing rows go to the result set without
+        a dict per alloy. A summary sink takes every alloy of the block, the others only the passing ones, made into
+        dicts only where their scores over the block may get them into the shortlist."""
+        profiler = self.profiler
+        summary = self.sink is not None and self.sink.spec()["kind"] == "summary"
+        if isinstance(block, tuple):
+            elements, at_percents = block
+        else:
+            elements = list(block[0])
+            at_percents = None
+        if at_percents is not None or all(list(composition) == elements for composition in block):
+            if at_percents is None:
+                at_percents = np.array([[composition[el] for el in elements] for composition in block], dtype=float)
+            with profiler.stage("calculation"):
+                values, meets_criteria = self.engine.calculate_batch(elements, at_percents / 100,
+                                                                     self.restriction_values)
+            if self.sink is None:
+                with profiler.stage("collection"):
+                    self.result_set.append_batch(elements, at_percents, values, meets_criteria)
+            elif summary:
+                with profiler.stage("sink"):
+                    self.sink.push_batch(values, meets_criteria, self.engine.rules)
+            else:
+                with profiler.stage("sink"):
+                    self.sink.push_batch(values, np.flatnonzero(meets_criteria),
+                                         lambda j: (self.engine.batch_row(values, j),
+                                                    alloy_name(dict(zip(elements, at_percents[j].tolist())))))
+            return int(np.count_nonzero(meets_criteria))
+
+        with profiler.stage("calculation"):
+            block_results = [self.engine.calculate({k: v / 100 for k, v in composition.items()},
+                                                   self.restriction_values) for composition in block]
+        passing = [(values, composition) for (values, meets_criteria), composition in zip(block_results, block)
+                   if meets_criteria]
+        if self.sink is None:
+            with profiler.stage("collection"):
+                self.result_set.append_rows(passing)
+        elif summary:
+            with profiler.stage("sink"):
+                for values, meets_criteria in block_results:
+                    self.sink.push(values, None, meets_criteria)
+        else:
+            for values, composition in passing:
+                with profiler.stage("sink"):
+                    self.sink.push(values, alloy_name(composition))
+        return len(passing)
\ No newline at end of file
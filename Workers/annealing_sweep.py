@@ -0,0 +1,96 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/annealing_sweep.py
+
+import json
+import math
+import tempfile
+import time
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from Utils.alloy_names import alloy_name
+from Workers.composition_generation import generate_compositions
+
+BATCH_SIZE = 500
+
+def critical_text(temperature):
+    """the R5/R6 column text of a critical annealing temperature."""
+    if math.isnan(temperature):
+        return "N/A"
+    if temperature == -math.inf:
+        return "SS at any Tₐₙ"
+    if temperature == math.inf:
+        return "IM at any Tₐₙ"
+    return f"SS above {temperature:.1f} K"
+
+class AnnealingSweepWorker(QThread):
+    update_progress = Signal(int, int, float, float)
+    finished = Signal()
+    all_results_ready = Signal(str, int)
+
+    def __init__(self, engine, selected_elements, step_size, temperatures, restriction_values):
+        super().__init__()
+        self.engine = engine
+        self.selected_elements = selected_elements
+        self.step_size = step_size
+        self.temperatures = np.asarray(temperatures, dtype=float)
+        self.restriction_values = restriction_values
+        self.stop_requested = False
+        self.report = None
+
+    def run(self):
+        start_time = time.time()
+        compositions = generate_compositions(self.selected_elements, self.step_size)
+        elements = list(self.selected_elements)
+        total = len(compositions)
+        ss_counts = {rule: np.zeros(len(self.temperatures), dtype=np.int64) for rule in ("R5", "R6")}
+        critical = {rule: [] for rule in ("R5", "R6")}
+        count = 0
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.jsonl')
+        with temp_file:
+            for start in range(0, total, BATCH_SIZE):
+                if self.stop_requested:
+                    break
+                block = compositions[start:start + BATCH_SIZE]
+                fractions = np.array([[composition[el] / 100 for el in elements] for composition in block])
+                values, meets_criteria = self.engine.calculate_batch(elements, fractions, self.restriction_values)
+                sweep = self.engine.annealing_sweep(elements, fractions, self.temperatures, values)
+                for rule in ss_counts:
+                    ss_counts[rule] += sweep[rule][meets_criteria].sum(axis=0)
+                    critical[rule].append(sweep[rule + "_critical"][meets_criteria])
+                for j in np.flatnonzero(meets_criteria):
+                    row = self.engine.batch_row(values, j)
+                    # R5 and R6 show where their verdict flips instead of the verdict at 0.55 Tm and 0.6 Tm
+                    row["model6"] = critical_text(sweep["R5_critical"][j])
+                    row["model7"] = critical_text(sweep["R6_critical"][j])
+                    name = alloy_name(block[j])
+                    temp_file.write(json.dumps([row, name]) + "\n")
+                    count += 1
+
+                done = start + len(block)
+                elapsed_time = time.time() - start_time
+                estimated_time = elapsed_time / done * (total - done)
+                self.update_progress.emit(done, total, estimated_time, done / elapsed_time if elapsed_time > 0 else 0.0)
+
+        if self.stop_requested:
+            self.finished.emit()
+            return
+
+        self.report = {"temperatures": self.temperatures.tolist(), "alloys": count, "rules": {}}
+        for rule in ss_counts:
+            temperatures = np.concatenate(critical[rule]) if critical[rule] else np.empty(0)
+            flipping = temperatures[np.isfinite(temperatures)]
+            self.report["rules"][rule] = {
+                "ss_share": (ss_counts[rule] / count).tolist() if count else [],
+                "ss_at_any_temperature": int((temperatures == -np.inf).sum()),
+                "im_at_any_temperature": int((temperatures == np.inf).sum()),
+                "no_data": int(np.isnan(temperatures).sum()),
+                "critical_temperature": {"min": float(flipping.min()), "median": float(np.median(flipping)),
+                                         "max": float(flipping.max())} if len(flipping) else None,
+            }
+        self.all_results_ready.emit(temp_file.name, count)
+        self.finished.emit()
\ No newline at end of file
@@ -0,0 +1,47 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/calibration.py
+
+from PySide6.QtCore import QThread, Signal
+from Utils.calibration import Calibration
+from Utils.rules import RuleRegistry
+from Utils.validation import read_labeled_dataset
+
+class CalibrationWorker(QThread):
+    update_progress = Signal(str)
+    finished = Signal()
+    calibration_ready = Signal(object, object)
+    failed = Signal(str)
+
+    def __init__(self, engine, file_path, steps, span):
+        super().__init__()
+        self.engine = engine
+        self.file_path = file_path
+        self.steps = steps
+        self.span = span
+
+    def run(self):
+        try:
+            compositions, phases = read_labeled_dataset(self.file_path)
+        except Exception as e:
+            self.failed.emit(f"Error reading the dataset: {e}")
+            self.finished.emit()
+            return
+        self.update_progress.emit(f"Calculating the descriptors of {len(compositions)} alloys...")
+        calibration = Calibration(self.engine, compositions, phases)
+        if not len(calibration):
+            self.failed.emit("None of the alloys could be calculated with a known observed phase")
+            self.finished.emit()
+            return
+        report = {"dataset": self.file_path, "alloys": calibration.alloys, "scored": len(calibration),
+                  "steps": self.steps, "span": self.span, "rules": {}}
+        rules = RuleRegistry()
+        for rule in self.engine.rules:
+            self.update_progress.emit(f"Calibrating {rule.name} on {len(calibration)} alloys...")
+            report["rules"][rule.name], calibrated = calibration.calibrate(rule, self.steps, self.span)
+            rules.register(calibrated)
+        self.calibration_ready.emit(report, rules)
+        self.finished.emit()
\ No newline at end of file
@@ -3,30 +3,33 @@
 # This source code is licensed under the terms described in the LICENSE file in
 # the root directory of this source tree.
 #
-# Workers/alloy_calculation.py
+# Workers/composition_generation.py
 
-import itertools
 from PySide6.QtCore import QThread, Signal
+from Utils.lattice import CompositionLattice
+from Utils.profiler import NULL_PROFILER
 
 class CompositionGenerationWorker(QThread):
-    compositions_ready = Signal(list)
+    compositions_ready = Signal(object)
 
-    def __init__(self, selected_elements, step_size):
+    def __init__(self, selected_elements, step_size, profiler=NULL_PROFILER):
         super().__init__()
         self.selected_elements = selected_elements
         self.step_size = step_size
+        self.profiler = profiler
 
     def run(self):
-        compositions = []
-        keys, ranges = zip(*self.selected_elements.items())
-        ranges = [
-            list(range(int(start), int(end) + 1, int(self.step_size)))
-            for start, end in ranges
-        ]
-        
-        for values in itertools.product(*ranges):
-            composition = dict(zip(keys, values))
-            if sum(composition.values()) == 100:
-                compositions.append(composition)
-        
-        self.compositions_ready.emit(compositions)
\ No newline at end of file
+        with self.profiler.stage("generation"):
+            compositions = self.generate()
+        self.profiler.count("compositions generated", len(compositions))
+        self.compositions_ready.emit(compositions)
+
+    def generate(self):
+        """the CompositionLattice of the sweep, its compositions are unranked block by block as they are calculated."""
+        return CompositionLattice(self.selected_elements, self.step_size)
+
+def generate_compositions(selected_elements, step_size):
+    """returns every {element: at%} on the step_size grid of the (start, end) ranges that sums up to 100."""
+    # the lattice counts instead of testing every combination of the ranges, of which few sum up to 100
+    lattice = CompositionLattice(selected_elements, step_size)
+    return [dict(zip(lattice.elements, at_percents)) for at_percents in lattice.unrank_range().tolist()]
\ No newline at end of file
@@ -0,0 +1,40 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/composition_sampling.py
+
+from PySide6.QtCore import QThread, Signal
+from Utils.profiler import NULL_PROFILER
+from Utils.sampling import SampledCompositions, sample_polytope_compositions
+
+class CompositionSamplingWorker(QThread):
+    compositions_ready = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, selected_elements, count, seed=None, profiler=NULL_PROFILER, engine=None,
+                 restriction_values=None):
+        super().__init__()
+        self.selected_elements = selected_elements
+        self.count = count
+        self.seed = seed
+        self.profiler = profiler
+        self.engine = engine
+        self.restriction_values = restriction_values  # samples only inside its linear ranges when given
+
+    def run(self):
+        try:
+            with self.profiler.stage("sampling"):
+                if self.restriction_values:
+                    compositions = sample_polytope_compositions(self.engine, self.selected_elements,
+                                                                self.restriction_values, self.count, self.seed)
+                else:
+                    # drawn while they are calculated, only checked here
+                    compositions = SampledCompositions(self.selected_elements, self.count, self.seed)
+                    compositions.check()
+        except ValueError as e:
+            self.failed.emit(str(e))
+            return
+        self.profiler.count("compositions sampled", len(compositions))
+        self.compositions_ready.emit(compositions)
\ No newline at end of file
@@ -0,0 +1,65 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/distributed_sweep.py
+
+import time
+from PySide6.QtCore import QThread, Signal
+from Utils.cluster import Coordinator, start_workers
+
+class DistributedSweepWorker(QThread):
+    update_progress = Signal(int, int, float, float)
+    workers_changed = Signal(int)
+    finished = Signal()
+    all_results_ready = Signal(object, int)
+    failed = Signal(str)
+
+    def __init__(self, engine, selected_elements, step_size, restriction_values, port, authkey, local_workers):
+        super().__init__()
+        self.engine = engine
+        self.coordinator = Coordinator(selected_elements, step_size, restriction_values, engine.rules,
+                                       ("0.0.0.0", port), authkey)
+        self.local_workers = local_workers  # worker processes on this machine, started with the coordinator
+        self.stop_requested = False
+
+    def run(self):
+        coordinator = self.coordinator
+        try:
+            coordinator.start()
+        except OSError as e:
+            self.failed.emit(f"Cannot listen on port {coordinator.address[1]}: {e}")
+            self.finished.emit()
+            return
+        host = "127.0.0.1"
+        processes = start_workers((host, coordinator.address[1]), coordinator.authkey, self.local_workers)
+        start_time = time.time()
+        workers = -1
+        while not coordinator.finished.wait(0.2):
+            if self.stop_requested:
+                break
+            calculated, total, connected = coordinator.progress()
+            if connected != workers:
+                workers = connected
+                self.workers_changed.emit(connected)
+            elapsed_time = time.time() - start_time
+            estimated_time = elapsed_time / calculated * (total - calculated) if calculated else 0.0
+            self.update_progress.emit(calculated, total, estimated_time, calculated / elapsed_time)
+        coordinator.stop()
+        for process in processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+
+        if coordinator.backend_message:
+            self.engine.backend_message = coordinator.backend_message
+        if self.stop_requested:
+            self.finished.emit()
+            return
+        if coordinator.error:
+            self.failed.emit(coordinator.error)
+            self.finished.emit()
+            return
+        self.all_results_ready.emit(coordinator.result_set, len(coordinator.result_set))
+        self.finished.emit()
\ No newline at end of file
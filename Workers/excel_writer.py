@@ -5,21 +5,30 @@
 #
 # Workers/excel_writer.py
 
+import time
 import xlsxwriter
 from PySide6.QtCore import QThread, Signal
-from Utils.io_helpers import read_results_in_chunks
+from Utils.profiler import NULL_PROFILER
 
 class ExcelWriterWorker(QThread):
-    progress = Signal(int, int)
+    progress = Signal(int, int, float)
     finished = Signal(str)
 
-    def __init__(self, file_name, file_path, headers):
+    def __init__(self, result_set, file_path, headers, profiler=NULL_PROFILER):
         super().__init__()
-        self.file_name = file_name
+        self.result_set = result_set
         self.file_path = file_path
         self.headers = headers
+        self.profiler = profiler
 
     def run(self):
+        with self.profiler.stage("excel_export"):
+            rows_written = self.write()
+        self.profiler.count("rows exported", rows_written)
+        self.finished.emit(self.file_path)
+
+    def write(self):
+        start_time = time.time()
         workbook = xlsxwriter.Workbook(self.file_path)
         worksheet = workbook.add_worksheet()
 
@@ -28,13 +37,12 @@ class ExcelWriterWorker(QThread):
             worksheet.write(0, col_num, header)
 
         row = 1
-        chunk_size = 100
+        chunk_size = 10000  # rows converted to Python values at a time
         total_processed = 0
-        total_chunks = sum(1 for _ in read_results_in_chunks(self.file_name, chunk_size))
-        total_rows = total_chunks * chunk_size
+        total_rows = len(self.result_set)
 
-        for chunk in read_results_in_chunks(self.file_name, chunk_size):
-            for values, alloy_name in chunk:
+        for start in range(0, total_rows, chunk_size):
+            for values, alloy_name in self.result_set.rows(start, start + chunk_size):
                 row_data = [
                     alloy_name,
                     values["density"],
@@ -56,8 +64,11 @@ class ExcelWriterWorker(QThread):
                 for col_num, data in enumerate(row_data):
                     worksheet.write(row, col_num, data)
                 row += 1
+                total_processed += 1
                 if total_processed % 100 == 0 or total_processed == total_rows:
-                    self.progress.emit(total_processed, total_rows)
+                    elapsed_time = time.time() - start_time
+                    rows_per_second = total_processed / elapsed_time if elapsed_time > 0 else 0.0
+                    self.progress.emit(total_processed, total_rows, rows_per_second)
 
         workbook.close()
-        self.finished.emit(self.file_path)
\ No newline at end of file
+        return total_processed
\ No newline at end of file
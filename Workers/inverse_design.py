@@ -0,0 +1,81 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/inverse_design.py
+
+import json
+import tempfile
+import time
+from PySide6.QtCore import QThread, Signal
+from Utils.alloy_names import alloy_name
+from Utils.inverse_design import InverseDesign, grid_size, round_to_step, within_bounds
+
+class InverseDesignWorker(QThread):
+    update_progress = Signal(int, int, float, float)
+    finished = Signal()
+    all_results_ready = Signal(str, int)
+
+    def __init__(self, engine, elements, lower, upper, restriction_values, count=50, resolution=0.5, **options):
+        super().__init__()
+        self.engine = engine
+        self.elements = elements
+        self.lower = lower
+        self.upper = upper
+        self.restriction_values = restriction_values
+        self.count = count
+        self.resolution = resolution
+        self.options = options
+        self.stop_requested = False
+        self.report = None
+
+    def run(self):
+        start_time = time.time()
+        design = InverseDesign(self.engine, self.elements, self.lower, self.upper, self.restriction_values,
+                               resolution=self.resolution, **self.options)
+
+        def progress(generation):
+            elapsed_time = time.time() - start_time
+            estimated_time = elapsed_time / generation * (design.generations - generation)
+            self.update_progress.emit(generation, design.generations, estimated_time,
+                                      design.evaluations / elapsed_time if elapsed_time > 0 else 0.0)
+
+        design.run(progress, lambda: self.stop_requested)
+        if self.stop_requested:
+            self.finished.emit()
+            return
+
+        # the results are recalculated one by one, so the table shows exactly what calculate() gives for them
+        temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.jsonl')
+        count = 0
+        seen = set()
+        with temp_file:
+            for at_percents in design.diverse_results(self.count):
+                # rounded on the grid of the bounds, so the rounding cannot step outside them
+                at_percents = round_to_step(at_percents, self.resolution, self.lower, self.upper)
+                if at_percents is None or not within_bounds(at_percents, self.lower, self.upper):
+                    continue
+                if tuple(at_percents) in seen:
+                    continue  # two results rounded onto the same composition
+                seen.add(tuple(at_percents))
+                # elements the optimizer brought down to 0 at% are not part of the alloy
+                at_percents = {el: at_p for el, at_p in zip(self.elements, at_percents) if at_p > 0}
+                composition = {el: at_p / 100 for el, at_p in at_percents.items()}
+                try:
+                    values, meets_criteria = self.engine.calculate(composition, self.restriction_values)
+                except ValueError:
+                    continue
+                if meets_criteria:
+                    name = alloy_name(at_percents)
+                    temp_file.write(json.dumps([values, name]) + "\n")
+                    count += 1
+
+        self.report = {
+            "evaluations": design.evaluations,
+            "feasible_found": len(design.archive),
+            "results": count,
+            "grid_size_1_at_percent": grid_size(self.lower, self.upper, 1),
+        }
+        self.all_results_ready.emit(temp_file.name, count)
+        self.finished.emit()
\ No newline at end of file
@@ -0,0 +1,273 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/job_manager.py
+
+import multiprocessing
+import os
+import queue
+import time
+from PySide6.QtCore import QThread, Signal
+from Utils.checkpoint import CHECKPOINT_INTERVAL
+from Utils.jobs import Job, bytes_per_alloy, calculate_chunk, chunk_limit, QUEUED, RUNNING, PAUSED, DONE, CANCELLED, \
+    FAILED
+from Utils.result_set import ResultSet
+
+class JobRun:
+    """the in-flight chunks of a running job, rank ranges of its lattice. Chunks finish in any order, they are kept
+    until the ones before them are done, so the results file and the sink see the alloys in sweep order."""
+
+    def __init__(self, job, engine):
+        self.job = job
+        self.elements = list(job.state["elements"])
+        self.total = job.state["total"]
+        self.chunk_size = job.chunk_size()
+        self.alloy_bytes = None  # the most peak bytes per alloy measured in a chunk of the job
+        # state is only written with the results it is valid for, so the run counts on its own until the next save
+        self.position, self.count_meeting_criteria = job.position, job.count_meeting_criteria
+        self.next_start = job.position  # first composition not handed to the pool yet
+        self.in_flight = 0
+        self.pending = {}  # start -> (size, at%, values) of chunks done ahead of position
+        self.sink = job.sink()
+        self.summary = self.sink is not None and self.sink.spec()["kind"] == "summary"
+        self.results = job.open_results()
+        self.rules = engine.rules
+        self.last_checkpoint = time.time()
+
+    def tasks(self):
+        return self.next_start < self.total
+
+    def chunk_limit(self):
+        """how many chunks of the job may be in flight, so that together they stay within its memory limit."""
+        return chunk_limit(self.job.processes, self.job.memory_mb,
+                           self.chunk_size * (self.alloy_bytes or bytes_per_alloy(len(self.elements))))
+
+    def next_task(self):
+        start = self.next_start
+        self.next_start = min(start + self.chunk_size, self.total)
+        self.in_flight += 1
+        return (self.job.checkpoint_id, start, self.next_start, self.job.state["elements"], self.job.state["step_size"],
+                self.job.restriction_values, self.job.state.get("rules"), self.summary)
+
+    def add(self, start, size, at_percents, values, backend_message=None, peak_bytes=None):
+        """takes a finished chunk, returns True when the position moved or the job has a new message. A chunk that
+        was measured resizes the chunks handed out after it."""
+        self.in_flight -= 1
+        if peak_bytes and size:
+            alloy_bytes = -(-peak_bytes // size)
+            if self.alloy_bytes is None or alloy_bytes > self.alloy_bytes:
+                self.alloy_bytes = alloy_bytes
+                self.chunk_size = self.job.chunk_size(alloy_bytes)
+        self.pending[start] = (size, at_percents, values)
+        moved = False
+        if backend_message:  # a process gave its numba backend up, the job queue shows why
+            self.job.state["message"] = backend_message
+            moved = True
+        while self.position in self.pending:
+            size, at_percents, values = self.pending.pop(self.position)
+            if at_percents is None:  # a chunk the process folded into a summary
+                self.sink.merge(values)
+                self.count_meeting_criteria += values.meeting_criteria
+            else:
+                if len(at_percents):
+                    result_set = ResultSet(self.rules)
+                    result_set.append_batch(self.elements, at_percents, values)
+                    if self.sink is None:
+                        result_set.write_jsonl(self.results)
+                    else:
+                        for row in result_set.rows():
+                            self.sink.push(*row)
+                self.count_meeting_criteria += len(at_percents)
+            self.position += size
+            moved = True
+        return moved
+
+    def done(self):
+        return self.position >= self.total
+
+    def save(self):
+        self.job.save(self.position, self.count_meeting_criteria, self.results, self.sink)
+        self.last_checkpoint = time.time()
+
+    def close(self):
+        self.save()
+        self.results.close()
+
+    def finish(self):
+        """writes the shortlist of the sink as the results, closes the results file."""
+        if self.sink is not None and self.sink.spec()["kind"] != "summary":
+            shortlist = self.sink.results()
+            result_set = ResultSet(self.rules)
+            result_set.extend(shortlist)
+            result_set.write_jsonl(self.results)
+            self.count_meeting_criteria = len(shortlist)
+        self.close()
+
+class JobManager(QThread):
+    """runs the queued jobs on one shared pool of processes, so several sweeps keep every core busy without
+    starting more processes than there are. Jobs are split into chunks; whenever a process is free the runnable
+    job with the highest priority, the earliest added of equal priorities, that has fewer chunks in flight than
+    its processes limit and than fit into its memory limit gets the next one. Chunks are sized by the memory the
+    first ones of the job are measured to take. The state of every job is saved every CHECKPOINT_INTERVAL and the jobs
+    left running are queued again on the next start.
+
+    The UI thread only reads the jobs, changes go through commands run between two chunks.
+    """
+    job_changed = Signal(str)
+    finished = Signal()
+
+    def __init__(self, engine, processes=None):
+        super().__init__()
+        self.engine = engine
+        self.processes = processes or os.cpu_count() or 1
+        self.jobs = {}
+        for job in Job.list_jobs():
+            if job.status == RUNNING:
+                job.set_status(QUEUED)
+            self.jobs[job.checkpoint_id] = job
+        self.runs = {}  # job id -> JobRun
+        self.commands = queue.Queue()
+        self.chunks = queue.Queue()  # finished chunks, put by the pool's result thread
+        self.stop_requested = False
+
+    def add(self, job):
+        self.commands.put(("add", job))
+
+    def pause(self, job_id):
+        self.commands.put(("pause", job_id))
+
+    def resume(self, job_id):
+        self.commands.put(("resume", job_id))
+
+    def cancel(self, job_id):
+        self.commands.put(("cancel", job_id))
+
+    def remove(self, job_id):
+        self.commands.put(("remove", job_id))
+
+    def set_priority(self, job_id, priority):
+        self.commands.put(("priority", job_id, priority))
+
+    def progress(self, job):
+        """(alloys calculated, alloys meeting the criteria) of a job, including what is not saved yet."""
+        run = self.runs.get(job.checkpoint_id)
+        if run is not None:
+            return run.position, run.count_meeting_criteria
+        return job.position, job.count_meeting_criteria
+
+    def in_flight(self):
+        return sum(run.in_flight for run in self.runs.values())
+
+    def run(self):
+        with multiprocessing.Pool(self.processes) as pool:
+            while not self.stop_requested:
+                self.run_commands()
+                self.dispatch(pool)
+                try:
+                    result = self.chunks.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                self.collect(*result)
+                while not self.chunks.empty():
+                    self.collect(*self.chunks.get())
+            pool.terminate()
+        # the chunks in flight are lost, the jobs continue from their last contiguous position
+        for run in self.runs.values():
+            run.close()
+            if run.job.status == RUNNING:
+                run.job.set_status(QUEUED)
+        self.runs = {}
+        self.finished.emit()
+
+    def run_commands(self):
+        while not self.commands.empty():
+            command, job_id, *arguments = self.commands.get()
+            if command == "add":
+                job = job_id
+                self.jobs[job.checkpoint_id] = job
+                self.job_changed.emit(job.checkpoint_id)
+                continue
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            if command == "pause" and job.status in (QUEUED, RUNNING):
+                job.set_status(PAUSED)
+                run = self.runs.get(job_id)
+                if run is not None and run.in_flight == 0:
+                    self.runs.pop(job_id).close()  # otherwise once its chunks in flight are back
+            elif command == "resume" and job.status == PAUSED:
+                job.set_status(QUEUED)
+            elif command == "cancel" and job.status in (QUEUED, RUNNING, PAUSED):
+                # what was saved stays readable, the chunks still in flight are dropped when they come back
+                if job_id in self.runs:
+                    self.runs.pop(job_id).close()
+                job.set_status(CANCELLED)
+            elif command == "remove":
+                if job_id in self.runs:
+                    self.runs.pop(job_id).results.close()
+                del self.jobs[job_id]
+                job.discard()
+            elif command == "priority":
+                job.state["priority"] = arguments[0]
+                job.write_state()
+            self.job_changed.emit(job_id)
+
+    def dispatch(self, pool):
+        free = self.processes - self.in_flight()
+        if free <= 0:
+            return
+        runnable = sorted((job for job in self.jobs.values() if job.status in (QUEUED, RUNNING)),
+                          key=lambda job: (-job.priority, job.checkpoint_id))
+        for job in runnable:
+            run = self.runs.get(job.checkpoint_id)
+            if run is None:
+                try:
+                    run = self.runs[job.checkpoint_id] = JobRun(job, self.engine)
+                except (OSError, ValueError, KeyError) as e:
+                    job.set_status(FAILED, str(e))
+                    self.job_changed.emit(job.checkpoint_id)
+                    continue
+                if run.done():
+                    self.complete(run)
+                    continue
+            if job.status != RUNNING:
+                job.set_status(RUNNING)
+                self.job_changed.emit(job.checkpoint_id)
+            while free > 0 and run.in_flight < run.chunk_limit() and run.tasks():
+                pool.apply_async(calculate_chunk, (run.next_task(),), callback=self.chunks.put,
+                                 error_callback=lambda e, job_id=job.checkpoint_id: self.chunks.put((job_id, e)))
+                free -= 1
+            if free <= 0:
+                break
+
+    def collect(self, job_id, *result):
+        run = self.runs.get(job_id)
+        if run is None:
+            return  # a chunk of a cancelled job
+        if isinstance(result[0], Exception):
+            self.runs.pop(job_id)
+            run.results.close()
+            run.job.set_status(FAILED, str(result[0]))
+            self.job_changed.emit(job_id)
+            return
+        if run.add(*result):
+            self.job_changed.emit(job_id)
+        job = run.job
+        if run.done():
+            self.complete(run)
+        elif job.status == PAUSED and run.in_flight == 0:
+            self.runs.pop(job_id).close()
+        elif time.time() - run.last_checkpoint >= CHECKPOINT_INTERVAL:
+            run.save()
+
+    def complete(self, run):
+        self.runs.pop(run.job.checkpoint_id)
+        run.finish()
+        run.job.set_status(DONE, run.job.state["message"])
+        self.job_changed.emit(run.job.checkpoint_id)
+
+    def result_set(self, job_id):
+        """the results of a finished job, or of what a paused or cancelled job has saved so far."""
+        return ResultSet.read_jsonl(self.jobs[job_id].results_file, self.engine.rules)
\ No newline at end of file
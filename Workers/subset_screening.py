@@ -0,0 +1,100 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/subset_screening.py
+
+import itertools
+import json
+import multiprocessing
+import queue
+import tempfile
+import time
+from PySide6.QtCore import QThread, Signal
+from Utils.screening import prune_reason, rank_systems, screen_system
+
+class SubsetScreeningWorker(QThread):
+    update_progress = Signal(int, int, float, float)
+    finished = Signal()
+    all_results_ready = Signal(str, int)
+
+    def __init__(self, engine, palette, k, start, end, step_size, restriction_values, expression="omega", maximize=True,
+                 processes=None):
+        super().__init__()
+        self.engine = engine
+        self.palette = palette
+        self.k = k
+        self.start_percent, self.end_percent, self.step_size = start, end, step_size
+        self.restriction_values = restriction_values
+        self.expression = expression
+        self.maximize = maximize
+        self.processes = processes
+        self.stop_requested = False
+        self.report = None
+
+    def run(self):
+        start_time = time.time()
+        subsets = list(itertools.combinations(self.palette, self.k))
+        pruned = {}
+        tasks = []
+        rules = self.engine.rules.specs()  # the threshold set in use, rebuilt in the worker processes
+        for elements in subsets:
+            reason = prune_reason(self.engine, elements, self.start_percent / 100, self.restriction_values)
+            if reason:
+                pruned[reason] = pruned.get(reason, 0) + 1
+            else:
+                tasks.append((elements, self.start_percent, self.end_percent, self.step_size, self.restriction_values,
+                              self.expression, self.maximize, rules))
+
+        systems = []
+        best_rows = {}
+        total = len(tasks)
+        screened = queue.Queue()  # finished systems, put by the pool's result thread
+        with multiprocessing.Pool(self.processes) as pool:
+            for task in tasks:
+                pool.apply_async(screen_system, (task,), callback=screened.put, error_callback=screened.put)
+            done = 0
+            while done < total:
+                try:
+                    result = screened.get(timeout=0.1)  # so that Stop does not wait for a system to finish
+                except queue.Empty:
+                    result = None
+                if self.stop_requested:
+                    pool.terminate()
+                    break
+                if result is None:
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                system, best_row, backend_message = result
+                done += 1
+                if backend_message:
+                    self.engine.backend_message = backend_message
+                systems.append(system)
+                if best_row:
+                    best_rows[system["system"]] = best_row
+                elapsed_time = time.time() - start_time
+                estimated_time = elapsed_time / done * (total - done)
+                self.update_progress.emit(done, total, estimated_time, done / elapsed_time if elapsed_time > 0 else 0.0)
+
+        if self.stop_requested:
+            self.finished.emit()
+            return
+
+        systems = rank_systems(systems, self.maximize)
+        self.report = {
+            "palette": list(self.palette), "k": self.k, "range": [self.start_percent, self.end_percent],
+            "step_size": self.step_size, "objective": self.expression, "maximize": self.maximize,
+            "subsets": len(subsets), "pruned": pruned, "screened": len(systems), "systems": systems,
+        }
+        # the best alloy of every system, in the order of the systems' rank, for the results table and the export
+        temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.jsonl')
+        with temp_file:
+            count = 0
+            for system in systems:
+                if system["system"] in best_rows:
+                    temp_file.write(json.dumps(best_rows[system["system"]]) + "\n")
+                    count += 1
+        self.all_results_ready.emit(temp_file.name, count)
+        self.finished.emit()
\ No newline at end of file
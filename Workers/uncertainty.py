@@ -0,0 +1,110 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/uncertainty.py
+
+import json
+import math
+import tempfile
+import time
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from Utils.alloy_names import alloy_name
+from Utils.phase_map import verdict
+from Utils.uncertainty import UncertaintyModel, RULES, DESCRIPTORS
+from Workers.composition_generation import generate_compositions
+
+BATCH_SIZE = 500
+CONFIDENT = 0.95  # an SS probability at least this far from 0.5 counts as a confident verdict
+
+def probability_text(text, probability):
+    """the rule column text of a nominal verdict and its SS probability."""
+    if math.isnan(probability):
+        return "N/A"
+    return f"{verdict(text)} (P(SS) {probability:.2f})"
+
+class UncertaintyWorker(QThread):
+    update_progress = Signal(int, int, float, float)
+    finished = Signal()
+    all_results_ready = Signal(str, int)
+
+    def __init__(self, engine, selected_elements, step_size, error_model, samples, restriction_values,
+                 confidence=0.95, seed=None):
+        super().__init__()
+        self.engine = engine
+        self.selected_elements = selected_elements
+        self.step_size = step_size
+        self.error_model = error_model
+        self.samples = samples
+        self.restriction_values = restriction_values
+        self.confidence = confidence
+        self.seed = seed
+        self.stop_requested = False
+        self.report = None
+
+    def run(self):
+        start_time = time.time()
+        compositions = generate_compositions(self.selected_elements, self.step_size)
+        elements = list(self.selected_elements)
+        model = UncertaintyModel(self.engine, elements, self.error_model, self.samples, self.seed)
+        total = len(compositions)
+        alloys = []
+        count = 0
+
+        temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.jsonl')
+        with temp_file:
+            for start in range(0, total, BATCH_SIZE):
+                if self.stop_requested:
+                    break
+                block = compositions[start:start + BATCH_SIZE]
+                fractions = np.array([[composition[el] / 100 for el in elements] for composition in block])
+                result = model.propagate(fractions, self.restriction_values, self.confidence)
+                # the table shows the nominal values, the rules with the share of the samples predicting SS
+                for j in np.flatnonzero(result["meets_criteria"]):
+                    row = self.engine.batch_row(result["values"], j)
+                    for rule, key in RULES.items():
+                        row[key] = probability_text(row[key], result["probability"][rule][j])
+                    name = alloy_name(block[j])
+                    temp_file.write(json.dumps([row, name]) + "\n")
+                    alloys.append({
+                        "alloy": name,
+                        "probability": {rule: self._number(p[j]) for rule, p in result["probability"].items()},
+                        "intervals": {descriptor: {bound: float(result[bound][descriptor][j])
+                                                   for bound in ("low", "mean", "high")}
+                                      for descriptor in DESCRIPTORS},
+                    })
+                    count += 1
+
+                done = start + len(block)
+                elapsed_time = time.time() - start_time
+                estimated_time = elapsed_time / done * (total - done)
+                self.update_progress.emit(done, total, estimated_time, done / elapsed_time if elapsed_time > 0 else 0.0)
+
+        if self.stop_requested:
+            self.finished.emit()
+            return
+
+        self.report = {"samples": self.samples, "error_model": self.error_model, "confidence": self.confidence,
+                       "alloys": count, "rules": {}, "results": alloys}
+        for rule in RULES:
+            probabilities = np.array([alloy["probability"][rule] for alloy in alloys], dtype=float)
+            known = probabilities[~np.isnan(probabilities)]
+            self.report["rules"][rule] = {
+                "mean_probability": float(known.mean()) if len(known) else None,
+                "confident_ss": int((known >= CONFIDENT).sum()),
+                "confident_im": int((known <= 1 - CONFIDENT).sum()),
+                "uncertain": int(((known > 1 - CONFIDENT) & (known < CONFIDENT)).sum()),
+                "no_data": int(len(probabilities) - len(known)),
+            }
+        meets = np.array([alloy["probability"]["filter"] for alloy in alloys], dtype=float)
+        self.report["filter"] = {"mean_probability": float(meets.mean()) if count else None,
+                                 "confident": int((meets >= CONFIDENT).sum())}
+        self.all_results_ready.emit(temp_file.name, count)
+        self.finished.emit()
+
+    @staticmethod
+    def _number(value):
+        # NaN is not valid JSON
+        return None if math.isnan(value) else float(value)
\ No newline at end of file
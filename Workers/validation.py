@@ -0,0 +1,32 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/validation.py
+
+from PySide6.QtCore import QThread, Signal
+from Utils.validation import read_labeled_dataset, validate
+
+class ValidationWorker(QThread):
+    finished = Signal()
+    all_results_ready = Signal(object, int)
+    failed = Signal(str)
+
+    def __init__(self, engine, file_path):
+        super().__init__()
+        self.engine = engine
+        self.file_path = file_path
+        self.report = None
+
+    def run(self):
+        try:
+            compositions, phases = read_labeled_dataset(self.file_path)
+        except Exception as e:
+            self.failed.emit(f"Error reading the dataset: {e}")
+            self.finished.emit()
+            return
+        self.report, result_set = validate(self.engine, compositions, phases)
+        self.report["dataset"] = self.file_path
+        self.all_results_ready.emit(result_set, len(result_set))
+        self.finished.emit()
\ No newline at end of file
@@ -0,0 +1,86 @@
+# Copyright (c) Ali Fethi Erdem.
+#
+# This source code is licensed under the terms described in the LICENSE file in
+# the root directory of this source tree.
+#
+# Workers/weight_sweep.py
+
+import time
+import numpy as np
+import xlsxwriter
+from PySide6.QtCore import QThread, Signal
+from Utils.composition_model import weight_to_atomic_percent
+from Utils.lattice import CompositionLattice
+from Utils.result_set import ResultSet
+
+BATCH_SIZE = 5000
+
+def weight_key(element):
+    """the results key of the wt% of an element."""
+    return f"{element} wt%"
+
+class WeightSweepWorker(QThread):
+    """a grid sweep over wt% ranges. Blocks of the wt% lattice are converted to at% in one step with the atomic
+    weights and calculated as any other sweep; the alloys meeting the criteria keep their wt% as extra result
+    columns and are written to a weighing sheet, the mass of every element in a batch of batch_mass grams, in the
+    same pass."""
+    update_progress = Signal(int, int, float, float)
+    finished = Signal()
+    all_results_ready = Signal(object, int)
+    failed = Signal(str)
+
+    def __init__(self, engine, selected_elements, step_size, restriction_values, batch_mass, sheet_path):
+        super().__init__()
+        self.engine = engine
+        self.selected_elements = selected_elements  # {element: (start, end)} in wt%
+        self.step_size = step_size
+        self.restriction_values = restriction_values
+        self.batch_mass = batch_mass
+        self.sheet_path = sheet_path
+        self.stop_requested = False
+
+    def run(self):
+        start_time = time.time()
+        elements = list(self.selected_elements)
+        lattice = CompositionLattice(self.selected_elements, self.step_size)
+        total = len(lattice)
+        try:
+            data = self.engine.batch_data(elements)
+        except ValueError as e:
+            self.failed.emit(str(e))
+            self.finished.emit()
+            return
+        result_set = ResultSet(self.engine.rules)
+
+        workbook = xlsxwriter.Workbook(self.sheet_path, {"constant_memory": True})
+        worksheet = workbook.add_worksheet("Weighing")
+        worksheet.write_row(0, 0, ["Alloy"] + [f"{el} wt%" for el in elements] + [f"{el} at%" for el in elements] +
+                            [f"{el} (g)" for el in elements])
+        worksheet.write(0, 3 * len(elements) + 1, f"Batch of {self.batch_mass:g} g")
+        for start in range(0, total, BATCH_SIZE):
+            if self.stop_requested:
+                break
+            weight_percents = lattice.unrank_range(start, start + BATCH_SIZE).astype(float)
+            at_percents = weight_to_atomic_percent(weight_percents, data["atomic_weight"])
+            values, meets_criteria = self.engine.calculate_batch(elements, at_percents / 100, self.restriction_values,
+                                                                 data)
+            for i, el in enumerate(elements):
+                values[weight_key(el)] = weight_percents[:, i]
+            first = len(result_set)
+            result_set.append_batch(elements, at_percents, values, meets_criteria)
+            masses = weight_percents * (self.batch_mass / 100)
+            for row, j in enumerate(np.flatnonzero(meets_criteria), first + 1):
+                worksheet.write_row(row, 0, [result_set.name(row - 1)] + weight_percents[j].tolist() +
+                                    np.round(at_percents[j], 4).tolist() + np.round(masses[j], 4).tolist())
+
+            done = min(start + BATCH_SIZE, total)
+            elapsed_time = time.time() - start_time
+            estimated_time = elapsed_time / done * (total - done)
+            self.update_progress.emit(done, total, estimated_time, done / elapsed_time if elapsed_time > 0 else 0.0)
+        workbook.close()
+
+        if self.stop_requested:
+            self.finished.emit()
+            return
+        self.all_results_ready.emit(result_set, len(result_set))
+        self.finished.emit()
\ No newline at end of file
@@ -1,16 +1,42 @@
 import itertools
 import json
 import math
+import os
 
 import numpy as np
 
+from Utils import kernels
+from Utils.profiler import NULL_PROFILER
+from Utils.rules import DESCRIPTORS, SHIPPED_RULES, RuleRegistry
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data")  # wherever HEAPP is started from
+ELEMENT_PROPERTIES = ("atomic_weight", "atomic_volume", "atomic_radius", "nvalence", "melting_point")
+
+def ordered_sum(terms):
+    """adds arrays one by one in order, so the rounding matches the scalar sums of calculate()."""
+    total = 0
+    for term in terms:
+        total = total + term
+    return total
+
+def square(x):
+    """x * x. Python's x ** 2 calls pow(), which rounds about one float in a thousand differently from the
+    product numpy's x ** 2 takes, so both paths square with this."""
+    return x * x
 
 class Engine:
     def __init__(self):
         self.R = 8.314462618  # J/(mol·K), universal gas constant
-        self.mixing_enthalpy_data = self._read("data/mixing_enthalpy_data.json")
-        self.fusion_enthalpy_data = self._read("data/fusion_enthalpy_data.json")
-        self.periodic_table = self._read("data/periodic_table.json")
+        self.mixing_enthalpy_data = self._read(os.path.join(DATA_DIR, "mixing_enthalpy_data.json"))
+        self.fusion_enthalpy_data = self._read(os.path.join(DATA_DIR, "fusion_enthalpy_data.json"))
+        self.periodic_table = self._read(os.path.join(DATA_DIR, "periodic_table.json"))
+        self.profiler = NULL_PROFILER
+        self.rules = RuleRegistry(SHIPPED_RULES)
+        self.fusion_pairs_cache = {}  # element tuple -> _fusion_pairs()
+        self.backend = kernels.backend()  # "numba" runs calculate() and calculate_batch() in compiled kernels
+        self.backend_message = None  # why the numba backend was given up, until the window has shown it
+        self.kernel_checked = set()  # (element system, Pipeline, kind) found identical to the numpy path
+        self.kernel_arguments = {}  # (element system, Pipeline) -> its Pipeline.arguments()
 
     def _read(self, file_name: str):
         with open(file_name, "r") as f:
@@ -29,7 +55,7 @@ class Engine:
         _delta = 0
         for element, atomic_percent in selected_elements.items():
             atomic_radius = float(self.periodic_table[element]["properties"]["atomic_radius"])
-            _delta += atomic_percent * (1 - (atomic_radius / average_atomic_radius))**2
+            _delta += atomic_percent * square(1 - (atomic_radius / average_atomic_radius))
 
         self.delta = math.sqrt(_delta) * 100
         return self.delta
@@ -38,15 +64,16 @@ class Engine:
         average_atomic_radius = sum(at_p * float(self.periodic_table[el]["properties"]["atomic_radius"]) for el, at_p in selected_elements.items())
         atomic_radius_list = [float(self.periodic_table[element]["properties"]["atomic_radius"]) for element in selected_elements.keys()]
 
-        smallest_solid_angle = (1 - math.sqrt((((min(atomic_radius_list) + average_atomic_radius) ** 2) - (average_atomic_radius ** 2)) /
-                                            ((min(atomic_radius_list) + average_atomic_radius) ** 2)))
-        largest_solid_angle = (1 - math.sqrt((((max(atomic_radius_list) + average_atomic_radius) ** 2) - (average_atomic_radius ** 2)) /
-                                           ((max(atomic_radius_list) + average_atomic_radius) ** 2)))
+        smallest_solid_angle = (1 - math.sqrt((square(min(atomic_radius_list) + average_atomic_radius) - square(average_atomic_radius)) /
+                                            square(min(atomic_radius_list) + average_atomic_radius)))
+        largest_solid_angle = (1 - math.sqrt((square(max(atomic_radius_list) + average_atomic_radius) - square(average_atomic_radius)) /
+                                           square(max(atomic_radius_list) + average_atomic_radius)))
         
         self.gamma = smallest_solid_angle / largest_solid_angle
         return self.gamma
     
     def _enthalpy_of_mixing(self, selected_elements):
+        self.profiler.count("enthalpy_of_mixing calls")
         self.pair_list = list(itertools.combinations(selected_elements.keys(), 2))
         pair_enthalpy = [self.mixing_enthalpy_data.get(pair[0], {}).get(pair[1]) or
                          self.mixing_enthalpy_data.get(pair[1], {}).get(pair[0], "NaN")
@@ -81,149 +108,394 @@ class Engine:
         return model6
 
     def calculate(self, selected_elements, restriction_values):
+        if self.backend == "numba":
+            result = self._kernel_calculate(selected_elements, restriction_values)
+            if result is not None:
+                return result
+        profiler = self.profiler
         try:
-            values = dict()
-            values["density"] = self._density(selected_elements)
-            values["delta"] = self._delta(selected_elements)
-            values["gamma"] = self._gamma(selected_elements)
-            values["enthalpy_of_mixing"] = self._enthalpy_of_mixing(selected_elements)
-
-            vec = sum(at_p * float(self.periodic_table[el]["properties"]["nvalence"]) for el, at_p in selected_elements.items())
-            mixing_entropy = -self.R * sum(frac * (0 if frac == 0 else np.log(frac)) for frac in selected_elements.values())
-            melting_temperature = math.ceil(sum(frac * float(self.periodic_table[el]["properties"]["melting_point"]) 
-                                                    for el, frac in selected_elements.items()))
-            omega = ((melting_temperature * mixing_entropy) / (abs(self.mixing_enthalpy) * 1000) if self.mixing_enthalpy != 0 else 10 ** 10)
-
-            values["vec"] = vec
-            values["mixing_entropy"] = mixing_entropy
-            values["melting_temp"] = melting_temperature
-            values["omega"] = omega
-
-            ########## Crystal Str. ##########
-            if 2.5 <= vec <= 3.5:
-                microstructure = "HCP"
-            elif vec >= 8.0:
-                microstructure = "FCC"
-            elif vec <= 6.87:
-                microstructure = "BCC"
-            else:
-                microstructure = "BCC + FCC"
+            with profiler.stage("descriptors"):
+                values = dict()
+                values["density"] = self._density(selected_elements)
+                values["delta"] = self._delta(selected_elements)
+                values["gamma"] = self._gamma(selected_elements)
+                values["enthalpy_of_mixing"] = self._enthalpy_of_mixing(selected_elements)
+
+                vec = sum(at_p * float(self.periodic_table[el]["properties"]["nvalence"]) for el, at_p in selected_elements.items())
+                mixing_entropy = -self.R * sum(frac * (0 if frac == 0 else np.log(frac)) for frac in selected_elements.values())
+                melting_temperature = math.ceil(sum(frac * float(self.periodic_table[el]["properties"]["melting_point"]) 
+                                                        for el, frac in selected_elements.items()))
+                omega = ((melting_temperature * mixing_entropy) / (abs(self.mixing_enthalpy) * 1000) if self.mixing_enthalpy != 0 else 10 ** 10)
+
+                values["vec"] = vec
+                values["mixing_entropy"] = mixing_entropy
+                values["melting_temp"] = melting_temperature
+                values["omega"] = omega
+
+                ########## Crystal Str. ##########
+                if 2.5 <= vec <= 3.5:
+                    microstructure = "HCP"
+                elif vec >= 8.0:
+                    microstructure = "FCC"
+                elif vec <= 6.87:
+                    microstructure = "BCC"
+                else:
+                    microstructure = "BCC + FCC"
 
-            values["cstr"] = microstructure
+                values["cstr"] = microstructure
         except:
             raise ValueError("Not enough data")
 
-        ############### MODEL 1 ###############
-        try:
-            values["model1"] = "SS" if omega >= 1.1 and 0 < self.delta < 6.6 \
-                else "IM"
-        except:
-            values["model1"] = "N/A"
+        descriptors = Descriptors(self, list(selected_elements), list(selected_elements.values()), values)
+        codes = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for rule in self.rules:
+                with profiler.stage("rule." + rule.name):
+                    code = codes[rule.key] = rule.evaluate(descriptors)
+                    if rule.fields:
+                        fields = [descriptors[name] for name in rule.fields]
+                        values[rule.key] = rule.text(code, *fields)
+                        values.update(zip(rule.fields, fields))
+                    else:
+                        values[rule.key] = rule.labels[code]
 
-        ############### MODEL 2 ###############
-        try:
-            values["model2"] = "SS" if 0 < self.delta < 6.6 and 3.2 > self.mixing_enthalpy > -11.6 \
-                else "IM"
-        except:
-            values["model2"] = "N/A"
+        with profiler.stage("filtering"):
+            meets_criteria = self._meets_criteria(values, codes, restriction_values)
 
+        return values, meets_criteria
 
-        ############### MODEL 3 ###############
+    def _meets_criteria(self, values, codes, restriction_values):
+        if restriction_values:
+            for property, restriction in self.encode_restrictions(restriction_values).items():
+                if isinstance(restriction, dict):
+                    min_value = float(restriction.get('min', None))
+                    max_value = float(restriction.get('max', None))
+                    if not (min_value <= float(values[property]) <= max_value):
+                        return False
+                else:
+                    if restriction != codes.get(property, values[property]):
+                        return False
+        return True
+
+    def _kernel_calculate(self, selected_elements, restriction_values):
+        """calculate() in the scalar kernel of Utils.kernels, None where the numba backend is given up. The first
+        composition of every element system is also calculated on the Python path and has to match it."""
+        elements = tuple(selected_elements)
         try:
-            values["model3"] = "SS" if self.gamma < 1.175 and 3.2 > self.mixing_enthalpy > -11.6 \
-                else "IM"
-        except:
-            values["model3"] = "N/A"
-
-
-            ############### MODEL 4 ###############
+            pipeline = kernels.pipeline(tuple(self.rules))
+        except Exception as e:
+            self.fall_back(f"The numba backend failed, calculating with numpy: {e}")
+            return None
+        arguments = self._kernel_arguments(elements, pipeline)  # raises "Not enough data" as calculate() does
         try:
+            with self.profiler.stage("kernel"):
+                fractions = np.array(list(selected_elements.values()), dtype=float)
+                descriptors, codes, fields = pipeline.scalar(fractions, arguments)
+        except Exception as e:
+            self.fall_back(f"The numba backend failed, calculating with numpy: {e}")
+            return None
+        values = dict(zip(kernels.SCALAR_KEYS, descriptors))
+        values["cstr"] = kernels.CRYSTAL_STRUCTURES[values["cstr"]]
+        fields = dict(zip(pipeline.fields, fields))
+        for rule, code in zip(pipeline.rules, codes):
+            if rule.fields:
+                values[rule.key] = rule.text(code, *(fields[name] for name in rule.fields))
+                values.update((name, fields[name]) for name in rule.fields)
+            else:
+                values[rule.key] = rule.labels[code]
+        meets_criteria = self._meets_criteria(values, dict(zip((rule.key for rule in pipeline.rules), codes)),
+                                              restriction_values)
+        key = (elements, pipeline, "scalar")
+        if key not in self.kernel_checked:
+            self.backend = "numpy"
             try:
-                _lambda = mixing_entropy / (self.delta ** 2)
-
-                if _lambda < 0.24 and self._enthalpy_of_mixing(selected_elements) < -15:
-                    model4 = "IM"
-                elif 0.24 <= _lambda <= 0.96 and -15<= self._enthalpy_of_mixing(selected_elements) <= -5:
-                    model4 = "SS+IM"
-                elif 0.96 <= _lambda and -5<= self._enthalpy_of_mixing(selected_elements) <= 0:
-                    model4 = "SS"
-                elif 0.96 <= _lambda and 0< self._enthalpy_of_mixing(selected_elements):
-                    model4 = "SS+SS"
-                
-                values["model4"] = model4
-            except:
-                _lambda = mixing_entropy / (self.delta ** 2)
-                if _lambda < 0.24:
-                    model4 = "[IM]"
-                elif 0.96 < _lambda:
-                    model4 = "[SS]"
-                else:
-                    model4 = "[Mixed]"
-                
-                values["model4"] = model4
-        except:
-            values["model4"] = "N/A"
-
-
-            ############### MODEL 6 ###############
-        try:
-            delta_Hf_alloy = []
-            for pair in self.pair_list:
-                if pair[0] in self.fusion_enthalpy_data and pair[1] in self.fusion_enthalpy_data[pair[0]]:
-                    delta_Hf_alloy.append(self.fusion_enthalpy_data[pair[0]][pair[1]])
-
-            annealing_temperature = melting_temperature * 0.55
-            values["model6"] = "SS" if -1 * annealing_temperature * mixing_entropy * 1.04 * 10 ** -2 <= min(delta_Hf_alloy) \
-                                    and min(delta_Hf_alloy) <= 37 else "IM"
-        except:
-            values["model6"] = "N/A"
-
+                reference = self.calculate(selected_elements, restriction_values)
+            finally:
+                self.backend = "numba"
+            if not kernels.same_row((values, meets_criteria), reference):
+                self.fall_back(f"The numba backend differs from the numpy path for {''.join(elements)}, "
+                               f"calculating with numpy")
+                return reference
+            self.kernel_checked.add(key)
+        return values, meets_criteria
 
-            ############### MODEL 7 ###############
+    def _kernel_arguments(self, elements, pipeline):
+        if (elements, pipeline) not in self.kernel_arguments:
+            self.kernel_arguments[(elements, pipeline)] = pipeline.arguments(self.batch_data(elements),
+                                                                             self._fusion_pairs(elements), self.R)
+        return self.kernel_arguments[(elements, pipeline)]
+
+    def fall_back(self, message):
+        """gives the numba backend up for good, message is shown in the status bar or the job queue."""
+        self.backend = "numpy"
+        self.backend_message = message
+
+    def take_backend_message(self):
+        """the backend_message, once."""
+        message, self.backend_message = self.backend_message, None
+        return message
+
+    def batch_data(self, elements):
+        """the element and pair data calculate_batch() uses, as arrays: one value per element for the
+        ELEMENT_PROPERTIES, per element pair for "mixing_enthalpy" and per pair with formation enthalpy data
+        (see _fusion_pairs) for "fusion_enthalpy"."""
         try:
-            delta_Hf_IM = []
-
-            for pair in self.pair_list:
-                pair_fraction = 0
-                if pair[0] in self.fusion_enthalpy_data and pair[1] in self.fusion_enthalpy_data[pair[0]]:
-                    if (pair[0], pair[1]) in self.pair_list:
-                        pair_fraction = selected_elements[pair[0]] * selected_elements[pair[1]]
-                    else:
-                        pair_fraction = selected_elements[pair[1]] * selected_elements[pair[0]]
-                    delta_Hf_IM.append((self.fusion_enthalpy_data[pair[0]][pair[1]], pair_fraction))
-
-            delta_H_IM = 4 * sum((entry[0] * entry[1]) for entry in delta_Hf_IM) * 0.09648
-
-            K2 = 0.6
-            T_an = melting_temperature * 0.6
-
-            omega_T = ((T_an * mixing_entropy) / (abs(self.mixing_enthalpy) * 1000) if self.mixing_enthalpy != 0 else 10 ** 10)
-            K1_cr_T = ((omega_T) * (1 - K2)) + 1
-
-
-            values["model7"] = "SS (Tₐₙ: " + str("%.1f" % T_an) + " K)" \
-                                if K1_cr_T > ((delta_H_IM / self.mixing_enthalpy) if self.mixing_enthalpy != 0 else 10 ** 10) \
-                                    else "IM  (Tₐₙ: " + str( "%.1f" % T_an) + " K)"
-        except:
-            values["model7"] = "N/A"
-
-        meets_criteria = True
+            properties = [self.periodic_table[el]["properties"] for el in elements]
+            data = {name: np.array([float(p[name]) for p in properties]) for name in ELEMENT_PROPERTIES}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Not enough data")
+        pair_enthalpy = []
+        for i, j in itertools.combinations(range(len(elements)), 2):
+            enthalpy = (self.mixing_enthalpy_data.get(elements[i], {}).get(elements[j]) or
+                        self.mixing_enthalpy_data.get(elements[j], {}).get(elements[i], "NaN"))
+            pair_enthalpy.append(float(enthalpy) if enthalpy != "NaN" else 0.0)
+        data["mixing_enthalpy"] = np.array(pair_enthalpy)
+        data["fusion_enthalpy"] = np.array([enthalpy for _, _, enthalpy in self._fusion_pairs(elements)], dtype=float)
+        return data
+
+    def calculate_batch(self, elements, fractions, restriction_values=None, data=None):
+        """vectorized calculate() of many compositions of the same elements.
+
+        fractions is an (n, len(elements)) array of atomic fractions. Returns (values, meets_criteria), values
+        holding one numpy array per key of calculate(), the verdicts of the rules as uint8 codes into their
+        labels (batch_row() makes the texts), and meets_criteria a boolean array. Sums run element by element in
+        the same order as calculate() and squares are products in both, see square(), so the results are bit for
+        bit those of calculate() and every rule threshold falls the same way.
+
+        data replaces batch_data(elements), each of its arrays may have a leading axis of n to give every
+        composition its own data, as uncertainty propagation does.
+
+        With the numba backend the descriptors and rules are calculated alloy by alloy in the fused kernel of
+        Utils.kernels, bit for bit the same as the numpy path, which calls passing their own data still take.
+        """
+        fractions = np.asarray(fractions, dtype=float)
+        columns = [fractions[:, i] for i in range(len(elements))]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.backend == "numba" and data is None:
+                values = self._kernel_values(elements, fractions, columns)
+            else:
+                values = self._batch_values(elements, fractions, columns,
+                                            self.batch_data(elements) if data is None else data)
 
+        meets_criteria = np.ones(len(fractions), dtype=bool)
         if restriction_values:
-            for property, restriction in restriction_values.items():
+            for property, restriction in self.encode_restrictions(restriction_values).items():
                 if isinstance(restriction, dict):
                     min_value = float(restriction.get('min', None))
                     max_value = float(restriction.get('max', None))
-                    if not (min_value <= float(values[property]) <= max_value):
-                        meets_criteria = False
-                        break
+                    meets_criteria &= (min_value <= values[property]) & (values[property] <= max_value)
                 else:
-                    if restriction_values[property] != values[property]:
-                        meets_criteria = False
-                        break
-            
+                    meets_criteria &= values[property] == restriction
+
         return values, meets_criteria
 
+    def _kernel_values(self, elements, fractions, columns):
+        """the values of a block from the batch kernel of Utils.kernels. The first CHECK_ROWS compositions of the
+        first block of every element system are also calculated on the numpy path, the kernel is given up for good
+        if it differs in a single bit."""
+        elements = tuple(elements)
+        try:
+            pipeline = kernels.pipeline(tuple(self.rules))
+        except Exception as e:
+            self.fall_back(f"The numba backend failed, calculating with numpy: {e}")
+            return self._batch_values(elements, fractions, columns, self.batch_data(elements))
+        arguments = self._kernel_arguments(elements, pipeline)
+        try:
+            values = pipeline.batch(fractions, columns, arguments)
+        except Exception as e:
+            self.fall_back(f"The numba backend failed, calculating with numpy: {e}")
+            return self._batch_values(elements, fractions, columns, self.batch_data(elements))
+        key = (elements, pipeline, "batch")
+        if key not in self.kernel_checked:
+            sample = fractions[:kernels.CHECK_ROWS]
+            reference = self._batch_values(elements, sample, [c[:kernels.CHECK_ROWS] for c in columns],
+                                           self.batch_data(elements))
+            if not kernels.identical({name: array[:kernels.CHECK_ROWS] for name, array in values.items()},
+                                     reference):
+                self.fall_back(f"The numba backend differs from the numpy path for {''.join(elements)}, "
+                               f"calculating with numpy")
+                return self._batch_values(elements, fractions, columns, self.batch_data(elements))
+            self.kernel_checked.add(key)
+        return values
+
+    def _batch_values(self, elements, fractions, columns, data):
+        """the values of a block with numpy, the reference path."""
+        values = self._batch_descriptors(elements, fractions, columns, data)
+        descriptors = Descriptors(self, elements, columns, values, data)
+        for rule in self.rules:
+            values[rule.key] = rule.evaluate_batch(descriptors, len(fractions))
+            for name in rule.fields:
+                values[name] = np.broadcast_to(descriptors[name], (len(fractions),)).astype(float)
+        return values
+
+    def _batch_descriptors(self, elements, fractions, columns, data):
+        """the descriptors of a block before the rules, with numpy, the reference path."""
+        weight, volume, radius, nvalence, melting_point = (
+            [data[name][..., i] for i in range(len(elements))] for name in ELEMENT_PROPERTIES)
+        pair_list = list(itertools.combinations(range(len(elements)), 2))
+        values = {}
+        values["density"] = ordered_sum(c * w for c, w in zip(columns, weight)) / \
+                            ordered_sum(c * v for c, v in zip(columns, volume))
+
+        average_atomic_radius = ordered_sum(c * r for c, r in zip(columns, radius))
+        delta = np.sqrt(ordered_sum(c * square(1 - (r / average_atomic_radius)) for c, r in zip(columns, radius))) * 100
+        values["delta"] = delta
+
+        min_radius = np.min(data["atomic_radius"], axis=-1)
+        max_radius = np.max(data["atomic_radius"], axis=-1)
+        smallest = (1 - np.sqrt((square(min_radius + average_atomic_radius) - square(average_atomic_radius)) /
+                                square(min_radius + average_atomic_radius)))
+        largest = (1 - np.sqrt((square(max_radius + average_atomic_radius) - square(average_atomic_radius)) /
+                               square(max_radius + average_atomic_radius)))
+        gamma = smallest / largest
+        values["gamma"] = gamma
+
+        mixing_enthalpy = 4 * ordered_sum((columns[i] * columns[j]) * data["mixing_enthalpy"][..., p]
+                                          for p, (i, j) in enumerate(pair_list))
+        mixing_enthalpy = np.broadcast_to(mixing_enthalpy, (len(fractions),)).astype(float)
+        values["enthalpy_of_mixing"] = mixing_enthalpy
+
+        vec = ordered_sum(c * n for c, n in zip(columns, nvalence))
+        mixing_entropy = -self.R * ordered_sum(np.where(c == 0, 0.0, c * np.log(c)) for c in columns)
+        melting_temperature = np.ceil(ordered_sum(c * t for c, t in zip(columns, melting_point))).astype(np.int64)
+        nonzero = mixing_enthalpy != 0
+        omega = np.where(nonzero, (melting_temperature * mixing_entropy) / (np.abs(mixing_enthalpy) * 1000), 10 ** 10)
+        values["vec"] = vec
+        values["mixing_entropy"] = mixing_entropy
+        values["melting_temp"] = melting_temperature
+        values["omega"] = omega
+
+        values["cstr"] = np.select([(2.5 <= vec) & (vec <= 3.5), vec >= 8.0, vec <= 6.87],
+                                   ["HCP", "FCC", "BCC"], "BCC + FCC").astype(object)
+        return values
+
+    def _fusion_pairs(self, elements):
+        """(i, j, formation enthalpy) of the element pairs with data, looked up in the one order R5 and R6 use."""
+        elements = tuple(elements)
+        if elements not in self.fusion_pairs_cache:
+            self.fusion_pairs_cache[elements] = [
+                (i, j, self.fusion_enthalpy_data[elements[i]][elements[j]])
+                for i, j in itertools.combinations(range(len(elements)), 2)
+                if elements[i] in self.fusion_enthalpy_data and elements[j] in self.fusion_enthalpy_data[elements[i]]]
+        return self.fusion_pairs_cache[elements]
+
+    def annealing_sweep(self, elements, fractions, temperatures, values=None):
+        """R5 and R6 of many compositions over annealing temperatures, instead of at 0.55 Tm and 0.6 Tm.
+
+        ΔSmix, ΔHmix, ΔH_IM and the lowest formation enthalpy are calculated once per composition, only the
+        comparisons with T are vectorized over temperatures. Returns "R5" and "R6", (compositions, temperatures)
+        boolean arrays that are True for SS, and "R5_critical" and "R6_critical", the temperature above which
+        each composition is SS: -inf if it is SS at any temperature, inf if at none, NaN for R5 without
+        formation enthalpy data. values of calculate_batch() for the same compositions are reused when given.
+        """
+        fractions = np.asarray(fractions, dtype=float)
+        temperatures = np.asarray(temperatures, dtype=float)[None, :]
+        if values is None:
+            values, _ = self.calculate_batch(elements, fractions)
+        mixing_entropy = values["mixing_entropy"][:, None]
+        mixing_enthalpy = values["enthalpy_of_mixing"][:, None]
+        fusion_pairs = self._fusion_pairs(elements)
+        columns = [fractions[:, i] for i in range(len(elements))]
+        sweep = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if fusion_pairs:
+                lowest = min(enthalpy for _, _, enthalpy in fusion_pairs)
+                sweep["R5"] = (-temperatures * mixing_entropy * 1.04e-2 <= lowest) & (lowest <= 37)
+                critical = np.where(mixing_entropy[:, 0] > 0, -lowest / (mixing_entropy[:, 0] * 1.04e-2),
+                                    -np.inf if lowest >= 0 else np.inf)  # pure elements, ΔSmix = 0
+                critical = np.where(lowest > 37, np.inf, critical)
+            else:
+                sweep["R5"] = np.zeros((len(fractions), temperatures.shape[1]), dtype=bool)
+                critical = np.full(len(fractions), np.nan)
+            sweep["R5_critical"] = np.where(critical <= 0, -np.inf, critical)
+
+            # K1cr(T) = Ω(T)(1 - K2) + 1 against ΔH_IM / ΔHmix, Ω(T) rises linearly with T
+            K2 = 0.6
+            delta_H_IM = 4 * ordered_sum(enthalpy * (columns[i] * columns[j]) for i, j, enthalpy in fusion_pairs) * 0.09648
+            delta_H_IM = np.broadcast_to(delta_H_IM, (len(fractions),))[:, None]
+            nonzero = mixing_enthalpy != 0
+            omega_T = np.where(nonzero, (temperatures * mixing_entropy) / (np.abs(mixing_enthalpy) * 1000), 10 ** 10)
+            ratio = np.where(nonzero, delta_H_IM / mixing_enthalpy, 10 ** 10)
+            sweep["R6"] = omega_T * (1 - K2) + 1 > ratio
+            critical = np.where(mixing_entropy[:, 0] > 0, (ratio[:, 0] - 1) * np.abs(mixing_enthalpy[:, 0]) * 1000 /
+                                ((1 - K2) * mixing_entropy[:, 0]), np.where(ratio[:, 0] < 1, -np.inf, np.inf))
+            critical = np.where(nonzero[:, 0], critical, np.inf)
+            sweep["R6_critical"] = np.where(critical < 0, -np.inf, critical)
+        return sweep
+
+    def batch_row(self, values, index):
+        """returns the values of one composition of calculate_batch() as a calculate() values dict."""
+        row = {key: array[index].item() if isinstance(array[index], np.generic) else array[index]
+               for key, array in values.items()}
+        for rule in self.rules:
+            if rule.key in row:
+                row[rule.key] = rule.text(row[rule.key], *(row[name] for name in rule.fields))
+        return row
+
+    def encode_restrictions(self, restriction_values):
+        """restriction_values with the verdicts the filter asks of rules as their codes."""
+        return {property: self.rules[property].code(restriction)
+                if property in self.rules and not isinstance(restriction, dict) else restriction
+                for property, restriction in (restriction_values or {}).items()}
         
     def get_atomic_weight(self, element: str) -> float:
-        return self.periodic_table[element]["properties"]["atomic_weight"]
\ No newline at end of file
+        return self.periodic_table[element]["properties"]["atomic_weight"]
+
+class Descriptors(dict):
+    """the descriptors of Utils.rules.DESCRIPTORS for one composition or a block, a dict that calculates each of
+    them on first use, so rules only cost the descriptors they reference.
+
+    columns are the atomic fractions of the elements, floats of one composition or arrays of a block, values
+    what calculate() or calculate_batch() already has and data the batch_data() of a block. Calculate under
+    np.errstate, Λ of pure elements is 0 / 0.
+    """
+
+    def __init__(self, engine, elements, columns, values, data=None):
+        super().__init__(values)
+        self.engine = engine
+        self.elements = elements
+        self.columns = columns
+        self.data = data
+
+    def __missing__(self, name):
+        if name not in DESCRIPTORS:
+            raise KeyError(name)
+        value = self[name] = getattr(self, "_" + name)()
+        return value
+
+    def fusion_pairs(self):
+        pairs = self.engine._fusion_pairs(self.elements)
+        if self.data is None:
+            return pairs
+        return [(i, j, self.data["fusion_enthalpy"][..., q]) for q, (i, j, _) in enumerate(pairs)]
+
+    def _lambda_(self):
+        return self["mixing_entropy"] / square(self["delta"])
+
+    def _lowest_formation_enthalpy(self):
+        if self.data is not None:
+            fusion_enthalpy = self.data["fusion_enthalpy"]
+            return np.min(fusion_enthalpy, axis=-1) if fusion_enthalpy.shape[-1] else np.nan
+        return min((enthalpy for _, _, enthalpy in self.fusion_pairs()), default=np.nan)
+
+    def _im_enthalpy(self):
+        return 4 * ordered_sum(enthalpy * (self.columns[i] * self.columns[j])
+                               for i, j, enthalpy in self.fusion_pairs()) * 0.09648
+
+    def _annealing_temperature(self):
+        return self["melting_temp"] * 0.6
+
+    def _omega_an(self):
+        mixing_enthalpy = self["enthalpy_of_mixing"]
+        if isinstance(mixing_enthalpy, np.ndarray):
+            return np.where(mixing_enthalpy != 0, (self["annealing_temperature"] * self["mixing_entropy"]) /
+                            (np.abs(mixing_enthalpy) * 1000), 10 ** 10)
+        return ((self["annealing_temperature"] * self["mixing_entropy"]) / (abs(mixing_enthalpy) * 1000)
+                if mixing_enthalpy != 0 else 10 ** 10)
+
+    def _im_ratio(self):
+        mixing_enthalpy = self["enthalpy_of_mixing"]
+        if isinstance(mixing_enthalpy, np.ndarray):
+            return np.where(mixing_enthalpy != 0, self["im_enthalpy"] / mixing_enthalpy, 10 ** 10)
+        return self["im_enthalpy"] / mixing_enthalpy if mixing_enthalpy != 0 else 10 ** 10
\ No newline at end of file
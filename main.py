@@ -46,12 +46,15 @@ __credits__ = "Original version developed by Doguhan Sariturk under the name of
 
 import json
 import os
-import re
+import secrets
+import socket
 import sys
+import tempfile
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from PySide6.QtCore import (Qt, QTimer)
-from PySide6.QtGui import (QIcon, QFont, QAction)
+from PySide6.QtGui import (QIcon, QFont, QAction, QActionGroup)
 from PySide6.QtWidgets import (
     QApplication, QCheckBox, QFileDialog,
     QGridLayout, QHBoxLayout, QLabel,
@@ -59,17 +62,42 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QVBoxLayout,
     QWidget, QSpacerItem, QSizePolicy,
     QRadioButton, QScrollArea, QProgressBar,
-    QDialog, QComboBox, QButtonGroup)
+    QDialog, QComboBox, QButtonGroup, QInputDialog, QLineEdit)
 
 from engine import Engine
 from Utils.settings import Settings
+from Utils.alloy_names import to_subscript
+from Utils.checkpoint import Checkpoint
+from Utils.cluster import DEFAULT_PORT
+from Utils.calibration import list_threshold_sets, load_threshold_set, save_threshold_set
+from Utils.composition_model import CompositionModel
+from Utils.jobs import Job
+from Utils.profiler import NULL_PROFILER, Profiler
+from Utils.ranking import OBJECTIVE_PROPERTIES, compile_objective, from_spec
+from Utils.phase_map import PhaseMapData
+from Utils.result_set import ResultSet
+from Utils.rules import SHIPPED_RULES, RuleRegistry
+from Utils.sampling import linear_constraints
+from Utils.uncertainty import DEFAULT_ERROR_MODEL, ERROR_LABELS, parse_error
 from Workers.alloy_calculation import AlloyCalculationWorker
+from Workers.annealing_sweep import AnnealingSweepWorker
+from Workers.calibration import CalibrationWorker
 from Workers.composition_generation import CompositionGenerationWorker
+from Workers.composition_sampling import CompositionSamplingWorker
+from Workers.distributed_sweep import DistributedSweepWorker
 from Workers.excel_writer import ExcelWriterWorker
-from Utils.io_helpers import read_json
+from Workers.inverse_design import InverseDesignWorker
+from Workers.job_manager import JobManager
+from Workers.subset_screening import SubsetScreeningWorker
+from Workers.uncertainty import UncertaintyWorker
+from Workers.validation import ValidationWorker
+from Workers.weight_sweep import WeightSweepWorker
+from Utils.io_helpers import read_json, read_compositions_from_excel
 from Utils.ui_helpers import default_line_edit
 from Components.periodic_table import PeriodicTable
 from Components.about_dialog import AboutDialog
+from Components.phase_map import PhaseMapDialog
+from Components.job_queue import JobQueueDialog
 
 class MDLHEAPP(QMainWindow):
     def __init__(self):
@@ -89,6 +117,67 @@ class MDLHEAPP(QMainWindow):
         open_action.triggered.connect(self.load_compositions_from_excel)
         file_menu.addAction(open_action)
 
+        validation_action = QAction("Validate Rules Against a Dataset", self)
+        validation_action.triggered.connect(self.validate_rules)
+        file_menu.addAction(validation_action)
+
+        calibration_action = QAction("Calibrate Thresholds", self)
+        calibration_action.triggered.connect(self.calibrate_thresholds)
+        file_menu.addAction(calibration_action)
+
+        self.threshold_menu = file_menu.addMenu("Threshold Set")
+        self.threshold_menu.aboutToShow.connect(self.update_threshold_menu)
+
+        resume_action = QAction("Resume Interrupted Calculation", self)
+        resume_action.triggered.connect(self.resume_calculation)
+        file_menu.addAction(resume_action)
+
+        sampling_action = QAction("Sample Compositions", self)
+        sampling_action.triggered.connect(self.sample_alloy_compositions)
+        file_menu.addAction(sampling_action)
+
+        screening_action = QAction("Screen Element Subsets", self)
+        screening_action.triggered.connect(self.screen_element_subsets)
+        file_menu.addAction(screening_action)
+
+        inverse_design_action = QAction("Inverse Design", self)
+        inverse_design_action.triggered.connect(self.inverse_design)
+        file_menu.addAction(inverse_design_action)
+
+        annealing_action = QAction("Annealing Temperature Sweep", self)
+        annealing_action.triggered.connect(self.annealing_sweep)
+        file_menu.addAction(annealing_action)
+
+        weight_sweep_action = QAction("Weight Percent Sweep", self)
+        weight_sweep_action.triggered.connect(self.weight_sweep)
+        file_menu.addAction(weight_sweep_action)
+
+        uncertainty_action = QAction("Uncertainty Analysis", self)
+        uncertainty_action.triggered.connect(self.uncertainty_analysis)
+        file_menu.addAction(uncertainty_action)
+
+        distributed_action = QAction("Distributed Sweep", self)
+        distributed_action.triggered.connect(self.distributed_sweep)
+        file_menu.addAction(distributed_action)
+
+        job_queue_action = QAction("Job Queue", self)
+        job_queue_action.triggered.connect(self.show_job_queue)
+        file_menu.addAction(job_queue_action)
+
+        phase_map_action = QAction("Phase Map", self)
+        phase_map_action.triggered.connect(self.show_phase_map)
+        file_menu.addAction(phase_map_action)
+
+        profiling_menu = file_menu.addMenu("Profile Calculations")
+        profiling_group = QActionGroup(self)
+        for mode, label in (("off", "Off"), ("timing", "Stage timings"), ("memory", "Stage timings and memory")):
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(self.settings.get_profiling() == mode)
+            action.triggered.connect(lambda _, mode=mode: self.settings.set_profiling(mode))
+            profiling_group.addAction(action)
+            profiling_menu.addAction(action)
+
         self.switch_theme_action = QAction("Dark mode", self)
         self.switch_theme_action.triggered.connect(self.switch_theme)
         about_action = QAction("About", self)
@@ -98,9 +187,32 @@ class MDLHEAPP(QMainWindow):
 
         self.composition_worker = None
         self.calculation_worker = None
+        self.screening_worker = None
+        self.inverse_design_worker = None
+        self.annealing_worker = None
+        self.uncertainty_worker = None
+        self.weight_sweep_worker = None
+        self.validation_worker = None
+        self.calibration_worker = None
+        self.distributed_worker = None
+        self.job_manager = None  # started with the first look at the job queue
+        self.job_queue_dialog = None
+        self.error_model = dict(DEFAULT_ERROR_MODEL)
+        self.uncertainty_samples = 200
+        self.phase_map_data = None  # columns of the last results, kept for the phase map
+        self.result_set = None  # the last results, shared by the table, the phase map and the export
         self.dialog = None
+        self.profiler = NULL_PROFILER
+        self.theme_stylesheets = {}
+
+        self.composition = CompositionModel()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(30)
+        self.refresh_timer.timeout.connect(self.push_composition)
 
         self.engine = Engine()
+        self.apply_threshold_set(self.settings.get_threshold_set())
 
         self.setWindowIcon(QIcon("ui/icons/MDLHEAPP_logo.ico"))
 
@@ -128,6 +240,7 @@ class MDLHEAPP(QMainWindow):
         self.total_atomic_label = QLabel("")
         self.total_weight_percent_label = QLabel("")
         self.total_weight_edit = default_line_edit("0")
+        self.total_weight_edit.textChanged.connect(self.update_total_weight)
         self.step_size_edit = default_line_edit("5")
         self.step_size_edit.setPlaceholderText("step size")
         self.step_size_edit.setFixedWidth(66)
@@ -141,12 +254,10 @@ class MDLHEAPP(QMainWindow):
         self.to_at_edit.setFixedWidth(90)
 
         self.restriction_values = {}
+        self.ranking_spec = None  # spec() of the TopK, ParetoFront or SummaryStatistics collecting the results
 
         self.initUI()
-
-    def _to_subscript(num_str):
-        subscript_map = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
-        return num_str.translate(subscript_map)
+        QTimer.singleShot(0, self.offer_resume)
 
     def initUI(self):
         current_theme = self.settings.get_theme()
@@ -331,12 +442,18 @@ class MDLHEAPP(QMainWindow):
         self.filter_button.setFixedSize(76, 40)
         self.filter_button.clicked.connect(self.show_restrictions_window)
 
+        self.rank_button = QPushButton("Rank")
+        self.rank_button.setProperty("class", "ghost_button")
+        self.rank_button.setFixedSize(76, 40)
+        self.rank_button.clicked.connect(self.show_ranking_window)
+
         selected_button_container = QWidget()
         selected_button_container.setFixedWidth(509)
         selected_button_layout = QHBoxLayout(selected_button_container)
         selected_button_layout.setSpacing(0)
         selected_button_layout.setContentsMargins(0, 0, 0, 0)
         selected_button_layout.addWidget(self.filter_button)
+        selected_button_layout.addWidget(self.rank_button)
         selected_button_layout.addStretch(1)
         selected_button_layout.addWidget(clear_selected_button)
         selected_button_layout.addWidget(self.calculate_button)
@@ -358,18 +475,7 @@ class MDLHEAPP(QMainWindow):
 
         self.old_pos = None
         
-        if current_theme == "dark":
-            with open("ui/styles/styleSheet_dark.qss", "r") as f:
-                self.dark_stylesheet = f.read()
-            self.setStyleSheet(self.dark_stylesheet)
-            self.switch_theme_action.setText("Light mode")
-            self.switch_theme_action.setToolTip("Switch to light mode")
-        elif current_theme == "light":
-            with open("ui/styles/styleSheet_light.qss", "r") as f:
-                self.light_stylesheet = f.read()
-            self.setStyleSheet(self.light_stylesheet)
-            self.switch_theme_action.setText("Dark mode")
-            self.switch_theme_action.setToolTip("Switch to dark mode")
+        self.apply_theme(current_theme)
 
         top_container.addWidget(parent_top_widget)
         main_layout.addLayout(top_container)
@@ -449,58 +555,20 @@ class MDLHEAPP(QMainWindow):
         current_theme = self.settings.get_theme()
         new_theme = "light" if current_theme == "dark" else "dark"
         self.settings.set_theme(new_theme)
-        if new_theme == "dark":
-            for element, button in self.periodic_table.buttons.items():
-                group = self.engine.periodic_table[element]["position"][2]
-                color = self.element_colors.get(group, {"normal": "#333333", "hover": "#444444"})
-                button.setStyleSheet(
-                    f"""
-                    QPushButton {{
-                        background-color: {color["normal"]}; 
-                        color: #f4f4f4; 
-                        font-size: 11pt;
-                        text-align: center;
-                        padding: 2px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: {color["hover"]};
-                    }}
-                    QPushButton:checked {{
-                        background-color: {color["hover"]};
-                    }}""")
-            with open("ui/styles/styleSheet_dark.qss", "r") as f:
-                self.dark_stylesheet = f.read()
-            self.setStyleSheet(self.dark_stylesheet)
+        self.apply_theme(new_theme)
+
+    def apply_theme(self, theme):
+        # one window-level stylesheet (theme + periodic table rules), so Qt polishes the widgets only once
+        if theme not in self.theme_stylesheets:
+            with open(f"ui/styles/styleSheet_{theme}.qss", "r") as f:
+                self.theme_stylesheets[theme] = f.read() + self.periodic_table.stylesheet(theme)
+        self.setStyleSheet(self.theme_stylesheets[theme])
+        if theme == "dark":
             self.switch_theme_action.setText("Light mode")
-            self.switch_theme_action.setToolTip("Switch to Light mode")
-        elif new_theme == "light":
-            for element, button in self.periodic_table.buttons.items():
-                group = self.engine.periodic_table[element]["position"][2]
-                color = self.element_colors.get(group, {"normal": "#333333", "hover": "#444444"})
-                button.setStyleSheet(
-                    f"""
-                    QPushButton {{
-                        background-color: {color["normal"]}; 
-                        color: {color["normal_font"]}; 
-                        border-radius: 0px;
-                        font-size: 11pt;
-                        text-align: center;
-                        padding: 2px;
-                    }}
-                    QPushButton:hover {{
-                        background-color: {color["hover"]};
-                        color: {color["hover_font"]};
-                    }}
-                    QPushButton:checked {{
-                        background-color: #ffffff;
-                        border: 3px solid {color["hover"]};
-                        color: {color["hover"]};
-                    }}""")
-            with open("ui/styles/styleSheet_light.qss", "r") as f:
-                self.dark_stylesheet = f.read()
-            self.setStyleSheet(self.dark_stylesheet)
+            self.switch_theme_action.setToolTip("Switch to light mode")
+        elif theme == "light":
             self.switch_theme_action.setText("Dark mode")
-            self.switch_theme_action.setToolTip("Switch to Dark mode")
+            self.switch_theme_action.setToolTip("Switch to dark mode")
 
     def update_label(self, row, column):
         item = self.alloy_table.item(row, column)
@@ -537,11 +605,11 @@ class MDLHEAPP(QMainWindow):
             "to": to_label
         }
 
-        atomic_percent_edit.textChanged.connect(lambda: self.update_ar_wp_w(element))
-        atomic_ratio_edit.textChanged.connect(lambda: self.update_ap_wp_w(element))
-        weight_percent_edit.textChanged.connect(lambda: self.update_ap_ar_w(element))
-        weight_edit.textChanged.connect(lambda: self.update_ap_ar_wp(element))
-        self.total_weight_edit.textChanged.connect(lambda: self.update_weight(element))
+        self.composition.add_element(element, self.engine.get_atomic_weight(element))
+        atomic_percent_edit.textChanged.connect(lambda text: self.on_composition_edited(element, "atomic_percent", text))
+        atomic_ratio_edit.textChanged.connect(lambda text: self.on_composition_edited(element, "atomic_ratio", text))
+        weight_percent_edit.textChanged.connect(lambda text: self.on_composition_edited(element, "weight_percent", text))
+        weight_edit.textChanged.connect(lambda text: self.on_composition_edited(element, "weight", text))
 
         layout.addWidget(label, Qt.AlignmentFlag.AlignLeft)
         layout.addWidget(atomic_ratio_edit, Qt.AlignmentFlag.AlignLeft)
@@ -576,229 +644,69 @@ class MDLHEAPP(QMainWindow):
                     edits["atomic_ratio"].blockSignals(True)
                     edits["atomic_ratio"].setText("1.00")
                     edits["atomic_ratio"].blockSignals(False)
-                    self.update_all_percentages()
         self.update_all_percentages()
 
         self.toggle_input_mode()
 
-    def update_all_percentages(self):
-        if self.at_percent_radio.isChecked():
-            max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-            for element, edits in self.selected_elements.items():
-                total_weight = float(self.total_weight_edit.text() or 0)
-                atomic_percent = float(edits["atomic_percent"].text() or 0)
-                atomic_ratio = (atomic_percent / max_percent) if max_percent != 0 else 0
-                edits["atomic_ratio"].blockSignals(True)
-                edits["atomic_ratio"].setText(f"{atomic_ratio:.4f}")
-                edits["atomic_ratio"].blockSignals(False)
-                weight_percent = self.atomic_to_weight_percent(element, atomic_percent)
-                edits["weight_percent"].blockSignals(True)
-                edits["weight_percent"].setText(f"{weight_percent:.4f}")
-                edits["weight_percent"].blockSignals(False)
-                weight = total_weight * (weight_percent / 100)
-                edits["weight"].blockSignals(True)
-                edits["weight"].setText(f"{weight:.5f}")
-                edits["weight"].blockSignals(False)
-        elif self.at_ratio_radio.isChecked():
-            total_atomic_ratio = sum(float(edit["atomic_ratio"].text() or 0) for edit in self.selected_elements.values())
-            for element, edits in self.selected_elements.items():
-                total_weight = float(self.total_weight_edit.text() or 0)
-                atomic_ratio = float(edits["atomic_ratio"].text() or 0)
-                atomic_percent = (atomic_ratio / total_atomic_ratio * 100) if total_atomic_ratio != 0 else 0
-                weight_percent = self.atomic_to_weight_percent(element, atomic_percent)
-                weight = total_weight * (weight_percent / 100)
-                edits["atomic_percent"].blockSignals(True)
-                edits["atomic_percent"].setText(f"{atomic_percent:.4f}")
-                edits["atomic_percent"].blockSignals(False)
-                edits["weight_percent"].blockSignals(True)
-                edits["weight_percent"].setText(f"{weight_percent:.4f}")
-                edits["weight_percent"].blockSignals(False)
-                edits["weight"].blockSignals(True)
-                edits["weight"].setText(f"{weight:.5f}")
-                edits["weight"].blockSignals(False)
+    def input_field(self):
+        if self.at_ratio_radio.isChecked():
+            return "atomic_ratio"
         elif self.wt_percent_radio.isChecked():
-            max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-            for element, edits in self.selected_elements.items():
-                total_weight = float(self.total_weight_edit.text() or 0)
-                weight_percent = float(edits["weight_percent"].text() or 0)
-                atomic_percent = self.weight_to_atomic_percent(element, weight_percent)
-                atomic_ratio = (atomic_percent / max_percent) if max_percent != 0 else 0
-                edits["atomic_ratio"].blockSignals(True)
-                edits["atomic_ratio"].setText(f"{atomic_ratio:.4f}")
-                edits["atomic_ratio"].blockSignals(False)
-                edits["atomic_percent"].blockSignals(True)
-                edits["atomic_percent"].setText(f"{atomic_percent:.4f}")
-                edits["atomic_percent"].blockSignals(False)
-                weight = total_weight * (weight_percent / 100)
-                edits["weight"].blockSignals(True)
-                edits["weight"].setText(f"{weight:.5f}")
-                edits["weight"].blockSignals(False)
+            return "weight_percent"
         elif self.weight_radio.isChecked():
-            max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-            total_weight = sum(float(edit["weight"].text() or 0) for edit in self.selected_elements.values())
-            for element, edits in self.selected_elements.items():
-                weight = float(edits["weight"].text() or 0)
-                weight_percent = (weight / total_weight * 100) if total_weight != 0 else 0
-                atomic_percent = self.weight_to_atomic_percent(element, weight_percent)
-                atomic_ratio = (atomic_percent / max_percent) if max_percent != 0 else 0
-                edits["atomic_ratio"].blockSignals(True)
-                edits["atomic_ratio"].setText(f"{atomic_ratio:.4f}")
-                edits["atomic_ratio"].blockSignals(False)
-                self.total_weight_edit.blockSignals(True)
-                self.total_weight_edit.setText(f"{total_weight:.5f}")
-                self.total_weight_edit.blockSignals(False)
-                edits["weight_percent"].blockSignals(True)
-                edits["weight_percent"].setText(f"{weight_percent:.4f}")
-                edits["weight_percent"].blockSignals(False)
-                edits["atomic_percent"].blockSignals(True)
-                edits["atomic_percent"].setText(f"{atomic_percent:.4f}")
-                edits["atomic_percent"].blockSignals(False)
-
-        max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-        total_weight = sum(float(edit["weight"].text() or 0) for edit in self.selected_elements.values())
-        total_atomic_ratio = sum(float(edit["atomic_ratio"].text() or 0) for edit in self.selected_elements.values())
-
-        total_atomic_percent = sum(float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values())
-        total_weight_percent = sum(float(edit["weight_percent"].text() or 0) for edit in self.selected_elements.values())
-
-        self.total_atomic_label.setText(f"{total_atomic_percent:.0f}%")
-        self.total_weight_percent_label.setText(f"{total_weight_percent:.0f}%")
+            return "weight"
+        return "atomic_percent"
 
-    def update_ar_wp_w(self, element): # Updates At. Ratio, Wt. %, Weight (g)
-        self.update_all_percentages()
-        if not self.at_percent_radio.isChecked():
-            return  # Do not update if At. % mode is not selected
+    def update_all_percentages(self):
+        # re-reads the input column once (element added/removed) and refreshes the other columns right away
+        field = self.input_field()
+        values = {}
+        for element, edits in self.selected_elements.items():
+            try:
+                values[element] = float(edits[field].text() or 0)
+            except ValueError:
+                continue
+        self.composition.set_values(field, values)
+        self.refresh_timer.stop()
+        self.push_composition()
+
+    def on_composition_edited(self, element, field, text):
+        if field != self.input_field() or element not in self.selected_elements:
+            return  # Only the edits of the selected input mode drive the composition
         try:
-            atomic_percent = float(self.selected_elements[element]["atomic_percent"].text() or 0)
-            weight_percent = self.atomic_to_weight_percent(element, atomic_percent)
-            total_weight = float(self.total_weight_edit.text() or 0)
-            max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-            atomic_ratio = (atomic_percent / max_percent) if max_percent != 0 else 0
-            self.selected_elements[element]["atomic_ratio"].blockSignals(True)
-            self.selected_elements[element]["atomic_ratio"].setText(f"{atomic_ratio:.4f}")
-            self.selected_elements[element]["atomic_ratio"].blockSignals(False)
-            self.selected_elements[element]["weight_percent"].blockSignals(True)
-            self.selected_elements[element]["weight_percent"].setText(f"{weight_percent:.4f}")
-            self.selected_elements[element]["weight_percent"].blockSignals(False)
-            weight = total_weight * (weight_percent / 100)
-            self.selected_elements[element]["weight"].blockSignals(True)
-            self.selected_elements[element]["weight"].setText(f"{weight:.5f}")
-            self.selected_elements[element]["weight"].blockSignals(False)
+            value = float(text or 0)
         except ValueError:
-            return 0
-        self.update_all_percentages()
+            return  # Intermediate input such as "-" or "."
+        self.composition.set_value(element, field, value)
+        self.refresh_timer.start()
 
-    def update_ap_wp_w(self, element): # Updates At. %, Wt. %, Weight (g)
-        self.update_all_percentages()
-        if not self.at_ratio_radio.isChecked():
-            return
+    def update_total_weight(self, text):
         try:
-            atomic_ratio = float(self.selected_elements[element]["atomic_ratio"].text() or 0)
-            total_atomic_ratio = sum(float(self.selected_elements[el]["atomic_ratio"].text() or 0) for el in self.selected_elements)
-            total_weight = float(self.total_weight_edit.text() or 0)
-            atomic_percent = (atomic_ratio / total_atomic_ratio * 100) if total_atomic_ratio != 0 else 0
-            self.selected_elements[element]["atomic_percent"].blockSignals(True)
-            self.selected_elements[element]["atomic_percent"].setText(f"{atomic_percent:.4f}")
-            self.selected_elements[element]["atomic_percent"].blockSignals(False)
-            weight_percent = self.atomic_to_weight_percent(element, atomic_percent)
-            self.selected_elements[element]["weight_percent"].blockSignals(True)
-            self.selected_elements[element]["weight_percent"].setText(f"{weight_percent:.4f}")
-            self.selected_elements[element]["weight_percent"].blockSignals(False)
-            weight = total_weight * (weight_percent / 100)
-            self.selected_elements[element]["weight"].blockSignals(True)
-            self.selected_elements[element]["weight"].setText(f"{weight:.5f}")
-            self.selected_elements[element]["weight"].blockSignals(False)
+            total_weight = float(text or 0)
         except ValueError:
-            return 0
-        self.update_all_percentages()
-
-    def update_ap_ar_w(self, element):
-        self.update_all_percentages()
-        if not self.wt_percent_radio.isChecked():
-            return  # Do not update if Wt. % mode is not selected
-        try:
-            weight_percent = float(self.selected_elements[element]["weight_percent"].text() or 0)
-            atomic_percent = self.weight_to_atomic_percent(element, weight_percent)
-            total_weight = float(self.total_weight_edit.text() or 0)
-            max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-            self.selected_elements[element]["atomic_percent"].blockSignals(True)
-            self.selected_elements[element]["atomic_percent"].setText(f"{atomic_percent:.4f}")
-            self.selected_elements[element]["atomic_percent"].blockSignals(False)
-            atomic_ratio = (atomic_percent / max_percent) if max_percent != 0 else 0
-            self.selected_elements[element]["atomic_ratio"].blockSignals(True)
-            self.selected_elements[element]["atomic_ratio"].setText(f"{atomic_ratio:.4f}")
-            self.selected_elements[element]["atomic_ratio"].blockSignals(False)
-            weight = total_weight * (weight_percent / 100)
-            self.selected_elements[element]["weight"].blockSignals(True)
-            self.selected_elements[element]["weight"].setText(f"{weight:.5f}")
-            self.selected_elements[element]["weight"].blockSignals(False)
-        except ValueError:
-            return 0
-        self.update_all_percentages()
-
-    def update_ap_ar_wp(self, element):
-        self.update_all_percentages()
-        if not self.weight_radio.isChecked():
-            return  # Do not update if weight mode is not selected
-        try:
-            total_weight = sum(float(edit["weight"].text() or 0) for edit in self.selected_elements.values())
-            max_percent = max((float(edit["atomic_percent"].text() or 0) for edit in self.selected_elements.values()), default=0)
-
-            if total_weight == 0:
-                weight_percent = 0
-            else:
-                weight_percent = float(self.selected_elements[element]["weight"].text()) / total_weight * 100
-
-            atomic_percent = self.weight_to_atomic_percent(element, weight_percent)
-            atomic_ratio = (atomic_percent / max_percent) if max_percent != 0 else 0
-            self.selected_elements[element]["atomic_percent"].blockSignals(True)
-            self.selected_elements[element]["atomic_percent"].setText(f"{atomic_percent:.4f}")
-            self.selected_elements[element]["atomic_percent"].blockSignals(False)
-            self.selected_elements[element]["atomic_ratio"].blockSignals(True)
-            self.selected_elements[element]["atomic_ratio"].setText(f"{atomic_ratio:.4f}")
-            self.selected_elements[element]["atomic_ratio"].blockSignals(False)
-            self.selected_elements[element]["weight_percent"].blockSignals(True)
-            self.selected_elements[element]["weight_percent"].setText(f"{weight_percent:.4f}")
-            self.selected_elements[element]["weight_percent"].blockSignals(False)
+            self.show_warning("Invalid input", "Please enter a valid number.")
+            return
+        self.composition.set_total_weight(total_weight)
+        self.refresh_timer.start()
+
+    def push_composition(self):
+        # writes only the line edits whose text actually changed
+        field = self.input_field()
+        for element, changed_field, text in self.composition.changed_texts(skip_field=field):
+            edit = self.selected_elements[element][changed_field]
+            edit.blockSignals(True)
+            edit.setText(text)
+            edit.blockSignals(False)
+
+        if field == "weight":
             self.total_weight_edit.blockSignals(True)
-            self.total_weight_edit.setText(f"{total_weight:.5f}")
+            self.total_weight_edit.setText(f"{self.composition.total_weight:.5f}")
             self.total_weight_edit.blockSignals(False)
-        except ValueError:
-            self.show_warning("Invalid input", "Please enter a valid number.")
-            return 0
-        self.update_all_percentages()
-    
-    def update_weight(self, element):
-        self.update_all_percentages()
-        try:
-            if element in self.selected_elements:
-                weight_percent = float(self.selected_elements[element]["weight_percent"].text() or 0)
-                total_weight = float(self.total_weight_edit.text() or 0)
-                weight = total_weight * (weight_percent / 100)
-                self.selected_elements[element]["weight"].blockSignals(True)
-                self.selected_elements[element]["weight"].setText(f"{weight:.5f}")
-                self.selected_elements[element]["weight"].blockSignals(False)
-        except ValueError:
-            self.show_warning("Invalid input", "Please enter a valid number.")
-            return 0
-        self.update_all_percentages()
-    
-    def atomic_to_weight_percent(self, element, atomic_percent):
-        atomic_weight = self.engine.get_atomic_weight(element)
-        total_atomic_weight = sum(self.engine.get_atomic_weight(el) * float(self.selected_elements[el]["atomic_percent"].text() or 0) for el in self.selected_elements)
-        if total_atomic_weight == 0:
-            return 0  # Avoid division by zero
-        weight_percent = (atomic_weight * atomic_percent) / total_atomic_weight * 100
-        return weight_percent
-
-    def weight_to_atomic_percent(self, element, weight_percent):
-        atomic_weight = self.engine.get_atomic_weight(element)
-        total_weight = sum((float(self.selected_elements[el]["weight_percent"].text() or 0) / self.engine.get_atomic_weight(el)) for el in self.selected_elements)
-        if total_weight == 0:
-            return 0  # Avoid division by zero
-        atomic_percent = (weight_percent / atomic_weight) / total_weight * 100
-        return atomic_percent
-    
+
+        total_atomic_percent, total_weight_percent = self.composition.totals()
+        self.total_atomic_label.setText(f"{total_atomic_percent:.0f}%")
+        self.total_weight_percent_label.setText(f"{total_weight_percent:.0f}%")
+
     def show_warning(self, title, message):
         self.status_label.setText(f"<b>{title}: </b>{message}")
         self.status_label.setObjectName("status_error")
@@ -930,6 +838,7 @@ class MDLHEAPP(QMainWindow):
             edits = self.selected_elements.pop(element)
             for widget in edits.values():
                 widget.deleteLater()
+            self.composition.remove_element(element)
 
             # Remove the container widget from the layout
             for i in reversed(range(self.selected_elements_container.count())):
@@ -949,7 +858,7 @@ class MDLHEAPP(QMainWindow):
             elif self.comp_range_radio.isChecked():
                 for edits in self.selected_elements.values():
                     edits["atomic_percent"].setText("5")
-                self.update_all_percentages()
+            self.update_all_percentages()
 
     def clear_selected_elements(self):
         for button in self.periodic_table.buttons.values():
@@ -957,11 +866,15 @@ class MDLHEAPP(QMainWindow):
         for i in reversed(range(self.selected_elements_container.count())):
             self.selected_elements_container.itemAt(i).widget().setParent(None)
         self.selected_elements.clear()
+        self.composition.clear()
         self.total_atomic_label.setText("0.00")
         self.total_weight_percent_label.setText("0.00")
 
     def on_calculate_button_click(self):
         self.stop_requested = False
+        if self.refresh_timer.isActive():
+            self.refresh_timer.stop()
+            self.push_composition()
         if self.single_comp_radio.isChecked():
             self.update_alloy_info()
         else:
@@ -1003,10 +916,11 @@ class MDLHEAPP(QMainWindow):
             }
 
         cstrs = ["FCC", "BCC", "BCC + FCC", "HCP"]
-        models = ["SS", "IM", "Mixed"]
         dropdown_labels = ["Crystal Str.", "R1", "R2", "R3", "R4", "R5", "R6"]
-        dropdown_restrictions = {"cstr": cstrs, "model1": models, "model2": models, "model3": models, "model4": models,
-                                 "model6": models, "model7": models}
+        # each rule offers the verdicts it can give, R4's SS+IM among them
+        dropdown_restrictions = {"cstr": cstrs}
+        for key in ("model1", "model2", "model3", "model4", "model6", "model7"):
+            dropdown_restrictions[key] = [label for label in self.engine.rules[key].labels if label != "N/A"]
         self.cat_res_edits = {} # Categorical restrictions' edits
 
         for dropdown, dropdown_label in zip(dropdown_restrictions, dropdown_labels):
@@ -1088,23 +1002,128 @@ class MDLHEAPP(QMainWindow):
                 self.restriction_values[property] = restrictions["dropdown"].currentText()
         dialog.accept()
 
-    def generate_alloy_compositions(self):
+    def show_ranking_window(self):
+        dialog = QDialog(self)
+        dialog.setFixedSize(378, 560)
+        dialog.setWindowTitle("Rank results")
+        layout = QVBoxLayout()
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        spec = self.ranking_spec or {}
+
+        self.ranking_mode = QComboBox()
+        self.ranking_mode.setFixedSize(338, 24)
+        self.ranking_mode.addItems(["Keep all alloys", "Keep the best alloys by an objective", "Keep the Pareto front",
+                                    "Summary statistics only"])
+        self.ranking_mode.setCurrentIndex({None: 0, "top_k": 1, "pareto": 2, "summary": 3}[spec.get("kind")])
+        layout.addWidget(self.ranking_mode)
+
+        layout.addWidget(QLabel("Objective, e.g. omega, -delta or density if 'SS' in R6 else None"))
+        self.ranking_expression_edit = QLineEdit(spec.get("expression", "omega"))
+        self.ranking_expression_edit.setFixedHeight(24)
+        self.ranking_expression_edit.setProperty("class", "gray10_line_edit")
+        layout.addWidget(self.ranking_expression_edit)
+        hlayout = QHBoxLayout()
+        self.ranking_direction = QComboBox()
+        self.ranking_direction.setFixedSize(160, 24)
+        self.ranking_direction.addItems(["Highest first", "Lowest first"])
+        self.ranking_direction.setCurrentIndex(0 if spec.get("maximize", True) else 1)
+        hlayout.addWidget(self.ranking_direction)
+        hlayout.addStretch(1)
+        hlayout.addWidget(QLabel("Keep"))
+        self.ranking_k_edit = default_line_edit(str(spec.get("k", 500)), 73, 24)
+        self.ranking_k_edit.setProperty("class", "gray10_line_edit")
+        hlayout.addWidget(self.ranking_k_edit)
+        layout.addLayout(hlayout)
+
+        layout.addWidget(QLabel("Pareto front objectives"))
+        properties_label = ["Density (g/cm³)", "δ", "γ", "ΔHₘᵢₓ (kJ/mol)", "VEC", "ΔSₘᵢₓ (kJ/mol)", "Tₘ (K)", "Ω"]
+        pareto_objectives = dict(spec.get("objectives", []))
+        self.pareto_edits = {}  # Pareto objectives' edits
+        for property, property_label in zip(OBJECTIVE_PROPERTIES, properties_label):
+            checkbox = QCheckBox(property_label)
+            checkbox.setChecked(property in pareto_objectives)
+            direction = QComboBox()
+            direction.setFixedSize(160, 24)
+            direction.addItems(["Maximize", "Minimize"])
+            direction.setCurrentIndex(0 if pareto_objectives.get(property, True) else 1)
+            hlayout = QHBoxLayout()
+            hlayout.addWidget(checkbox)
+            hlayout.addWidget(direction)
+            layout.addLayout(hlayout)
+            self.pareto_edits[property] = {"checkbox": checkbox, "dropdown": direction}
+
+        cancel_button = QPushButton("Cancel")
+        cancel_button.setFixedSize(189, 64)
+        cancel_button.setProperty("class", "secondary_button")
+        cancel_button.clicked.connect(dialog.reject)
+        apply_button = QPushButton("Apply")
+        apply_button.setFixedSize(189, 64)
+        apply_button.setProperty("class", "primary_button")
+        apply_button.clicked.connect(lambda: self.apply_ranking(dialog))
+        container = QVBoxLayout(dialog)
+        container.setContentsMargins(0, 0, 0, 0)
+        container.addLayout(layout)
+        container.addStretch(1)
+        button_layout = QHBoxLayout()
+        button_layout.setSpacing(0)
+        button_layout.addWidget(cancel_button)
+        button_layout.addWidget(apply_button)
+        container.addLayout(button_layout)
+
+        dialog.setLayout(container)
+        dialog.exec()
+
+    def apply_ranking(self, dialog):
+        mode = self.ranking_mode.currentIndex()
+        try:
+            if mode == 1:
+                expression = self.ranking_expression_edit.text()
+                compile_objective(expression)
+                k = int(float(self.ranking_k_edit.text()))
+                if k <= 0:
+                    raise ValueError("The number of alloys to keep must be positive.")
+                spec = {"kind": "top_k", "expression": expression, "k": k,
+                        "maximize": self.ranking_direction.currentIndex() == 0}
+            elif mode == 2:
+                objectives = [[property, edits["dropdown"].currentIndex() == 0]
+                              for property, edits in self.pareto_edits.items() if edits["checkbox"].isChecked()]
+                spec = from_spec({"kind": "pareto", "objectives": objectives}).spec()
+            elif mode == 3:
+                spec = {"kind": "summary"}
+            else:
+                spec = None
+        except ValueError as e:
+            QMessageBox.critical(self, "Input Error", str(e))
+            return
+        self.ranking_spec = spec
+        dialog.accept()
+
+    def composition_ranges(self):
+        """returns the {element: (start, end)} at% of the selected elements to generate compositions from, or None
+        after telling the user which input is invalid."""
         selected_elements = {}
+        for element, edits in self.selected_elements.items():
+            try:
+                atomic_percent = float(edits["atomic_percent"].text())
+                if self.comp_range_radio.isChecked() and "atomic_end" in edits:
+                    atomic_percent_end = float(edits["atomic_end"].text())
+                    selected_elements[element] = (atomic_percent, atomic_percent_end)
+                else:
+                    if atomic_percent <= 0:
+                        raise ValueError("Percentage must be positive.")
+                    selected_elements[element] = (atomic_percent, atomic_percent)
+            except ValueError:
+                QMessageBox.critical(self, "Input Error", f"Invalid input for {element}")
+                return None
+        return selected_elements
+
+    def generate_alloy_compositions(self):
         step_size = float(self.step_size_edit.text())
         try:
-            for element, edits in self.selected_elements.items():
-                try:
-                    atomic_percent = float(edits["atomic_percent"].text())
-                    if self.comp_range_radio.isChecked() and "atomic_end" in edits:
-                        atomic_percent_end = float(edits["atomic_end"].text())
-                        selected_elements[element] = (atomic_percent, atomic_percent_end)
-                    else:
-                        if atomic_percent <= 0:
-                            raise ValueError("Percentage must be positive.")
-                        selected_elements[element] = (atomic_percent, atomic_percent)
-                except ValueError:
-                    QMessageBox.critical(self, "Input Error", f"Invalid input for {element}")
-                    return
+            selected_elements = self.composition_ranges()
+            if selected_elements is None:
+                return
 
             self.dialog = QDialog(self)
             self.dialog.setFixedSize(300, 120)
@@ -1120,84 +1139,249 @@ class MDLHEAPP(QMainWindow):
             self.dialog.setLayout(layout)
             self.dialog.show()
 
-            self.composition_worker = CompositionGenerationWorker(selected_elements, step_size)
+            self.start_profiling()
+            self.composition_worker = CompositionGenerationWorker(selected_elements, step_size, self.profiler)
             self.composition_worker.compositions_ready.connect(self.on_compositions_ready)
             self.composition_worker.start()
 
         except ValueError:
             self.show_warning("Error", "Not enough data.")
 
+    def element_ranges(self):
+        """returns the (lower, upper) at% of the selected elements, their ranges in composition range mode and
+        0 to 100 otherwise, or None after telling the user what is wrong with them."""
+        lower, upper = [], []
+        for element, edits in self.selected_elements.items():
+            try:
+                if self.comp_range_radio.isChecked() and "atomic_end" in edits:
+                    lower.append(float(edits["atomic_percent"].text()))
+                    upper.append(float(edits["atomic_end"].text()))
+                else:
+                    lower.append(0.0)
+                    upper.append(100.0)
+            except ValueError:
+                QMessageBox.critical(self, "Input Error", f"Invalid input for {element}")
+                return None
+        if sum(lower) > 100 or sum(upper) < 100 or any(low > high for low, high in zip(lower, upper)):
+            QMessageBox.critical(self, "Input Error", "The element ranges do not allow a composition that sums up to 100%.")
+            return None
+        return lower, upper
+
+    def sample_alloy_compositions(self):
+        # quasi-random compositions spread over the element ranges, for systems too large for a grid sweep
+        if len(self.selected_elements) < 2:
+            QMessageBox.information(self, "Sample Compositions", "Select the elements on the periodic table first.")
+            return
+        ranges = self.element_ranges()
+        if ranges is None:
+            return
+        count, ok = QInputDialog.getInt(self, "Sample Compositions", "Number of compositions:", 10000, 1, 10000000)
+        if not ok:
+            return
+        seed, ok = QInputDialog.getInt(self, "Sample Compositions", "Seed (the same seed gives the same compositions):",
+                                       0, 0, 2 ** 31 - 1)
+        if not ok:
+            return
+        selected_elements = dict(zip(self.selected_elements, zip(*ranges)))
+        restriction_values = None
+        try:
+            linear = len(linear_constraints(self.engine, list(selected_elements), self.restriction_values)[1]) > 0
+        except (KeyError, ValueError):
+            linear = False
+        if linear:
+            methods = ["Only inside the filter's VEC, Tm and density ranges (hit-and-run)",
+                       "Over the whole element ranges (quasi-random)"]
+            method, ok = QInputDialog.getItem(self, "Sample Compositions", "Sample compositions:", methods, 0, False)
+            if not ok:
+                return
+            if method == methods[0]:
+                restriction_values = self.restriction_values
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Sampling Compositions")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Sampling compositions, please wait...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)  # Indeterminate mode
+        layout.addWidget(self.progress_bar)
+        layout.addItem((QSpacerItem(0, 40, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)))
+        self.dialog.setLayout(layout)
+        self.dialog.show()
+
+        self.start_profiling()
+        self.composition_worker = CompositionSamplingWorker(selected_elements, count, seed, self.profiler, self.engine,
+                                                            restriction_values)
+        self.composition_worker.compositions_ready.connect(self.on_compositions_ready)
+        self.composition_worker.failed.connect(self.on_sampling_failed)
+        self.composition_worker.start()
+
+    def on_sampling_failed(self, message):
+        self.dialog.accept()
+        self.profiler = NULL_PROFILER
+        QMessageBox.critical(self, "Sample Compositions", message)
+
     def on_compositions_ready(self, compositions):
         self.dialog.accept()
-        self.calculate_alloys(compositions)
+        self.calculate_alloys(compositions, label="".join(self.selected_elements.keys()))
 
     def load_compositions_from_excel(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Excel File", "", "Excel Files (*.xlsx *.xls)")
         if file_path:
-            compositions = self.read_compositions_from_excel(file_path)
-            self.calculate_alloy_parameters(compositions)
+            self.start_profiling()
+            with self.profiler.stage("excel_import"):
+                compositions = read_compositions_from_excel(file_path)
+            self.calculate_alloy_parameters(compositions, label=os.path.basename(file_path))
 
 
-    def read_compositions_from_excel(self, file_path):
-        try:
-            df = pd.read_excel(file_path)
+    def validate_rules(self):
+        # scores every rule against the observed phases of a dataset of alloy formulas
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Labeled Dataset", "",
+                                                   "Datasets (*.xlsx *.xls *.csv)")
+        if not file_path:
+            return
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Validating Rules")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel(f"Scoring the rules against {os.path.basename(file_path)}...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.dialog.setLayout(layout)
+        self.dialog.show()
 
-            compositions = []
-            composition_columns = self.find_composition_columns(df)
+        self.start_profiling()
+        self.validation_worker = ValidationWorker(self.engine, file_path)
+        self.validation_worker.all_results_ready.connect(self.on_validation_finished)
+        self.validation_worker.failed.connect(self.on_validation_failed)
+        self.validation_worker.finished.connect(self.on_worker_finished)
+        self.validation_worker.start()
 
-            for index, row in df.iterrows():
-                composition = self.parse_composition_row(row, composition_columns)
-                compositions.append(composition)
+    def on_validation_failed(self, message):
+        self.profiler = NULL_PROFILER
+        QMessageBox.critical(self, "Validate Rules", message)
 
-            return compositions
-        except Exception as e:
-            print(f"Error reading Excel file: {e}")
-            return []
-
-    def parse_composition_row(self, row, composition_columns):
-        composition = {}
-        for col in composition_columns:
-            elements = re.findall(r'([A-Za-z]+)(\d*\.?\d*)', str(row[col]))
-            total_ratio = sum(float(ratio) for _, ratio in elements)
-            if total_ratio == 100:
-                composition = {element: float(ratio) / 100.0 for element, ratio in elements}
-            else:
-                composition = {element: float(ratio) / total_ratio * 100.0 for element, ratio in elements}
-        return composition
-
-    def find_composition_columns(self, df):
-        possible_headers = [
-            "FORMULA",
-            "IDENTIFIER",
-            "ALLOY",
-            "COMPOSITION",
-            "COMPOSITION: Formula",
-            "COMPOSITION: Elements"
-            # Add more possible headers as needed
-        ]
-
-        composition_columns = []
-        for col in df.columns:
-            for header in possible_headers:
-                if header.lower() in str(col).lower():
-                    composition_columns.append(col)
-                    break
+    def on_validation_finished(self, result_set, count):
+        report = self.validation_worker.report
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_validation_{current_time_str}.json")
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        accuracies = ", ".join(f"{name} {rule['accuracy']:.0%}" for name, rule in report["rules"].items()
+                               if rule["accuracy"] is not None)
+        self.status_label.setText(f"<b>Validation: </b>{report['calculated']} of {report['alloys']} alloys, "
+                                  f"accuracy {accuracies}, {len(report['misclassified'])} misclassified, "
+                                  f"report saved: {file_path}")
+        self.status_label.show()
+        self.result_set = result_set
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
 
-        return composition_columns
+    def calibrate_thresholds(self):
+        # re-fits the thresholds of the rules to the observed phases of a dataset, saved as a threshold set
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Labeled Dataset", "",
+                                                   "Datasets (*.xlsx *.xls *.csv)")
+        if not file_path:
+            return
+        steps, ok = QInputDialog.getInt(self, "Calibrate Thresholds", "Values tried per threshold:", 11, 3, 101)
+        if not ok:
+            return
+        span, ok = QInputDialog.getInt(self, "Calibrate Thresholds", "Range tried around each threshold in %:",
+                                       50, 1, 100)
+        if not ok:
+            return
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Calibrating Thresholds")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel(f"Reading {os.path.basename(file_path)}...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.dialog.setLayout(layout)
+        self.dialog.show()
+
+        self.calibration_worker = CalibrationWorker(self.engine, file_path, steps, span / 100)
+        self.calibration_worker.update_progress.connect(self.progress_label.setText)
+        self.calibration_worker.calibration_ready.connect(self.on_calibration_ready)
+        self.calibration_worker.failed.connect(lambda message: QMessageBox.critical(self, "Calibrate Thresholds", message))
+        self.calibration_worker.finished.connect(self.on_worker_finished)
+        self.calibration_worker.start()
+
+    def on_calibration_ready(self, report, rules):
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_calibration_{current_time_str}.json")
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        accuracies = ", ".join(f"{name} {rule['published_accuracy']:.0%} → {rule['accuracy']:.0%}"
+                               for name, rule in report["rules"].items())
+        rates = [rule["threshold_sets_per_second"] for rule in report["rules"].values() if rule["method"] != "none"]
+        rate = f", {max(rates):.0f} threshold sets/s" if rates else ""
+        self.status_label.setText(f"<b>Calibration on {report['scored']} alloys: </b>{accuracies}{rate}, "
+                                  f"report saved: {file_path}")
+        self.status_label.show()
+        default_name = os.path.splitext(os.path.basename(report["dataset"]))[0]
+        name, ok = QInputDialog.getText(self, "Calibrate Thresholds", "Save the calibrated thresholds as:",
+                                        text=default_name)
+        if not ok or not name.strip():
+            return
+        save_threshold_set(name.strip(), rules, report)
+        reply = QMessageBox.question(self, "Calibrate Thresholds",
+                                     f"Use the threshold set {name.strip()} for the following calculations?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply == QMessageBox.StandardButton.Yes:
+            self.select_threshold_set(name.strip())
+
+    def update_threshold_menu(self):
+        self.threshold_menu.clear()
+        group = QActionGroup(self.threshold_menu)
+        selected = self.settings.get_threshold_set()
+        for name in [None] + list_threshold_sets():
+            action = QAction(name or "Published", self.threshold_menu)
+            action.setCheckable(True)
+            action.setChecked(name == selected)
+            action.triggered.connect(lambda _, name=name: self.select_threshold_set(name))
+            group.addAction(action)
+            self.threshold_menu.addAction(action)
+
+    def apply_threshold_set(self, name):
+        """makes the engine evaluate the rules of a saved threshold set, the published thresholds for None.
+        Returns the name of the set in use."""
+        if name:
+            try:
+                self.engine.rules = load_threshold_set(name)
+                return name
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading threshold set {name}: {e}")
+        self.engine.rules = RuleRegistry(SHIPPED_RULES)
+        return None
+
+    def select_threshold_set(self, name):
+        name = self.apply_threshold_set(name)
+        self.settings.set_threshold_set(name)
+        self.status_label.setText(f"<b>Threshold set: </b>{name or 'Published'}")
+        self.status_label.show()
 
     def process_compositions(self, compositions):
         for comp in compositions:
             print(comp)
 
-    def calculate_alloy_parameters(self, compositions):
+    def calculate_alloy_parameters(self, compositions, label=""):
         try:
             # Call your existing calculate_alloys function here
-            self.calculate_alloys(compositions)  # Adjust this based on your existing implementation
+            self.calculate_alloys(compositions, label=label)  # Adjust this based on your existing implementation
 
         except Exception as e:
             print(f"Error calculating alloy parameters: {e}")
 
-    def calculate_alloys(self, compositions):
+    def calculate_alloys(self, compositions, checkpoint=None, label=""):
         self.dialog = QDialog(self)
         self.dialog.setFixedSize(300, 120)
         self.dialog.setWindowTitle("Calculating Alloys")
@@ -1214,68 +1398,130 @@ class MDLHEAPP(QMainWindow):
         self.time_label = QLabel(self.dialog)
         layout.addWidget(self.time_label)
 
+        self.pause_button = QPushButton("Pause", self.dialog)
+        self.pause_button.setProperty("class", "secondary_button")
+        self.pause_button.setFixedSize(100, 38)
+        self.pause_button.clicked.connect(self.toggle_pause)
         stop_button = QPushButton("Stop", self.dialog)
         stop_button.setProperty("class", "danger_button")
         stop_button.setFixedSize(100, 38)
         stop_button.clicked.connect(self.stop_calculation)
-        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        button_layout = QHBoxLayout()
+        button_layout.addStretch(1)
+        button_layout.addWidget(self.pause_button)
+        button_layout.addWidget(stop_button)
+        layout.addLayout(button_layout)
 
         self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_calculation)  # Esc or closing the dialog stops the calculation too
         self.dialog.show()
 
-        self.worker = AlloyCalculationWorker(compositions, self.engine, self.restriction_values)
-        self.worker.update_progress.connect(self.update_progress)
-        self.worker.all_results_ready.connect(self.on_calculation_finished)
-        self.worker.finished.connect(self.on_worker_finished)
-        self.worker.start()
-
-    def update_progress(self, current, total, estimated_time):
+        sink = from_spec(self.ranking_spec) if self.ranking_spec and checkpoint is None else None
+        self.calculation_worker = AlloyCalculationWorker(compositions, self.engine, self.restriction_values, self.profiler,
+                                             checkpoint=checkpoint, label=label, sink=sink)
+        self.calculation_worker.update_progress.connect(self.update_progress)
+        self.calculation_worker.all_results_ready.connect(self.on_calculation_finished)
+        self.calculation_worker.paused.connect(self.on_calculation_paused)
+        self.calculation_worker.cancelled.connect(self.on_calculation_cancelled)
+        self.calculation_worker.finished.connect(self.on_worker_finished)
+        self.calculation_worker.start()
+
+    def update_progress(self, current, total, estimated_time, alloys_per_second):
         self.progress_bar.setValue(current)
         self.progress_bar.setFixedHeight(5)
         self.progress_label.setText(f"{current} of {total} alloys have been calculated")
-        self.time_label.setText(f"Estimated time remaining: {estimated_time:.2f} seconds")
+        self.time_label.setText(f"Estimated time remaining: {estimated_time:.2f} s | {alloys_per_second:.0f} alloys/s")
         self.time_label.setStyleSheet("color: #c6c6c6;")
 
-    def on_calculation_finished(self, temp_file_name, count_meeting_criteria):
-        self.temp_file_name = temp_file_name
+    def on_calculation_finished(self, result_set, count_meeting_criteria):
+        self.result_set = result_set
         self.count_meeting_criteria = count_meeting_criteria
         self.progress_bar.setRange(0, 0)  # Set to indeterminate mode
         self.progress_bar.setFixedHeight(5)
         self.progress_label.setText("Processing results, please wait...")
+        sink = self.calculation_worker.sink
+        kind = sink.spec()["kind"] if sink is not None else None
+        if kind == "pareto":
+            self.save_pareto_history(sink)
+        elif kind == "summary":
+            self.dialog.accept()
+            self.save_summary_report(sink)
+            self.finish_profiling()
+            return
         QTimer.singleShot(0, self.handle_all_results)
 
+    def save_summary_report(self, summary):
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_summary_{current_time_str}.json")
+        report = summary.report()
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        lines = [f"<b>{report['alloys']}</b> alloys calculated, <b>{report['meeting_criteria']}</b> met the criteria.",
+                 ""]
+        for rule, counts in report["rule_counts"].items():
+            lines.append(f"<b>{rule}:</b> " + ", ".join(f"{label} {n}" for label, n in sorted(counts.items())))
+        lines.append("<b>Crystal Str.:</b> " + ", ".join(f"{label} {n}" for label, n in
+                                                          sorted(report["crystal_structure_counts"].items())))
+        lines.append(f"<b>All rules agree:</b> {report['all_rules_agree']}")
+        lines += ["", f"Histograms, correlations and the full report: {file_path}"]
+        QMessageBox.information(self, "Summary Statistics", "<br>".join(lines))
+        self.status_label.setText(f"<b>Summary report saved: </b>{file_path}")
+        self.status_label.show()
+
+    def save_pareto_history(self, front):
+        # the front itself goes to the table, its size over the sweep to a small JSON file
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_pareto_front_{current_time_str}.json")
+        with open(file_path, "w") as f:
+            json.dump({"objectives": front.objectives, "alloys_offered": front.seen, "front_size": len(front),
+                       "history": front.history}, f, indent=2)
+        self.status_label.setText(f"<b>Pareto front: </b>{len(front)} of {front.seen} alloys, size history saved: {file_path}")
+        self.status_label.show()
+
     def on_worker_finished(self):
         self.dialog.accept()
+        message = self.engine.take_backend_message()
+        if message:
+            self.show_warning("Numba backend", message)
+
+    def read_results_file(self, temp_file_name):
+        # the other workers hand their results over as a JSON lines file
+        with self.profiler.stage("result_set"):
+            result_set = ResultSet.read_jsonl(temp_file_name)
+        os.remove(temp_file_name)  # Delete the temporary file
+        return result_set
 
     def handle_all_results(self):
+        with self.profiler.stage("phase_map_data"):
+            self.phase_map_data = PhaseMapData.from_result_set(self.result_set)
         if self.count_meeting_criteria <= 20000:
-            self.load_results_to_table(self.temp_file_name)
+            with self.profiler.stage("table_rendering"):
+                self.load_results_to_table(self.result_set)
+            self.finish_profiling()
         else:
             self.save_results_to_excel()
 
-    def load_results_to_table(self, temp_file_name):
-        with open(temp_file_name, 'r') as temp_file:
-            results = json.load(temp_file)
-            for values, alloy_name in results:
-                row_position = self.alloy_table.rowCount()
-                self.alloy_table.insertRow(row_position)
-                self.alloy_table.setItem(row_position, 0, QTableWidgetItem(alloy_name))
-                self.alloy_table.setItem(row_position, 1, QTableWidgetItem("{:.6f}".format(values["density"])))
-                self.alloy_table.setItem(row_position, 2, QTableWidgetItem("{:.6f}".format(values["delta"])))
-                self.alloy_table.setItem(row_position, 3, QTableWidgetItem("{:.6f}".format(values["gamma"])))
-                self.alloy_table.setItem(row_position, 4, QTableWidgetItem("{:.6f}".format(values["enthalpy_of_mixing"])))
-                self.alloy_table.setItem(row_position, 5, QTableWidgetItem("{:.2f}".format(values["vec"])))
-                self.alloy_table.setItem(row_position, 6, QTableWidgetItem("{:.6f}".format(values["mixing_entropy"])))
-                self.alloy_table.setItem(row_position, 7, QTableWidgetItem("{:.2f}".format(values["melting_temp"])))
-                self.alloy_table.setItem(row_position, 8, QTableWidgetItem("{:.6f}".format(values["omega"])))
-                self.alloy_table.setItem(row_position, 9, QTableWidgetItem(values["cstr"]))
-                self.alloy_table.setItem(row_position, 10, QTableWidgetItem(values["model1"]))
-                self.alloy_table.setItem(row_position, 11, QTableWidgetItem(values["model2"]))
-                self.alloy_table.setItem(row_position, 12, QTableWidgetItem(values["model3"]))
-                self.alloy_table.setItem(row_position, 13, QTableWidgetItem(values["model4"]))
-                self.alloy_table.setItem(row_position, 14, QTableWidgetItem(values["model6"]))
-                self.alloy_table.setItem(row_position, 15, QTableWidgetItem(values["model7"]))
-        os.remove(temp_file_name)  # Delete the temporary file
+    def load_results_to_table(self, result_set):
+        self.profiler.count("rows rendered", len(result_set))
+        for values, alloy_name in result_set.rows():
+            row_position = self.alloy_table.rowCount()
+            self.alloy_table.insertRow(row_position)
+            self.alloy_table.setItem(row_position, 0, QTableWidgetItem(alloy_name))
+            self.alloy_table.setItem(row_position, 1, QTableWidgetItem("{:.6f}".format(values["density"])))
+            self.alloy_table.setItem(row_position, 2, QTableWidgetItem("{:.6f}".format(values["delta"])))
+            self.alloy_table.setItem(row_position, 3, QTableWidgetItem("{:.6f}".format(values["gamma"])))
+            self.alloy_table.setItem(row_position, 4, QTableWidgetItem("{:.6f}".format(values["enthalpy_of_mixing"])))
+            self.alloy_table.setItem(row_position, 5, QTableWidgetItem("{:.2f}".format(values["vec"])))
+            self.alloy_table.setItem(row_position, 6, QTableWidgetItem("{:.6f}".format(values["mixing_entropy"])))
+            self.alloy_table.setItem(row_position, 7, QTableWidgetItem("{:.2f}".format(values["melting_temp"])))
+            self.alloy_table.setItem(row_position, 8, QTableWidgetItem("{:.6f}".format(values["omega"])))
+            self.alloy_table.setItem(row_position, 9, QTableWidgetItem(values["cstr"]))
+            self.alloy_table.setItem(row_position, 10, QTableWidgetItem(values["model1"]))
+            self.alloy_table.setItem(row_position, 11, QTableWidgetItem(values["model2"]))
+            self.alloy_table.setItem(row_position, 12, QTableWidgetItem(values["model3"]))
+            self.alloy_table.setItem(row_position, 13, QTableWidgetItem(values["model4"]))
+            self.alloy_table.setItem(row_position, 14, QTableWidgetItem(values["model6"]))
+            self.alloy_table.setItem(row_position, 15, QTableWidgetItem(values["model7"]))
 
     def save_results_to_excel(self):
         selected_elements_str = ''.join(self.selected_elements.keys())
@@ -1292,8 +1538,8 @@ class MDLHEAPP(QMainWindow):
         headers = ["Alloy", "Density (g/cm³)", "δ", "γ", "ΔHₘᵢₓ (kJ/mol)", "VEC", "ΔSₘᵢₓ (kJ/mol)", "Tₘ (K)", 
                    "Ω", "Crystal Str.", "R1", "R2", "R3", "R4", "R5", "R6"]
 
-        self.excel_worker = ExcelWriterWorker(self.temp_file_name, file_path, headers)
-        self.excel_worker.progress.connect(self.update_progress)
+        self.excel_worker = ExcelWriterWorker(self.result_set, file_path, headers, self.profiler)
+        self.excel_worker.progress.connect(self.update_excel_progress)
         self.excel_worker.finished.connect(self.on_excel_write_finished)
         self.show_progress_dialog()
         self.excel_worker.start()
@@ -1311,24 +1557,613 @@ class MDLHEAPP(QMainWindow):
         self.dialog.setLayout(layout)
         self.dialog.show()
 
-    def update_progress(self, processed, total):
-        self.progress_label.setText(f"Processed {processed} of {total}")
+    def update_excel_progress(self, processed, total, rows_per_second):
+        self.progress_label.setText(f"Processed {processed} of {total} ({rows_per_second:.0f} rows/s)")
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(processed)
 
     def on_excel_write_finished(self, file_path):
         self.dialog.accept()
-        if os.path.exists(self.temp_file_name):
-            os.remove(self.temp_file_name)  # Delete the temporary file
+        self.finish_profiling()
         if file_path:
             QMessageBox.information(self, "Save to Excel", f"Alloy information saved to {file_path}")
         else:
             QMessageBox.information(self, "Save to Excel", "Excel file saving was canceled.")
 
+    def start_profiling(self):
+        mode = self.settings.get_profiling()
+        self.profiler = NULL_PROFILER if mode == "off" else Profiler(track_memory=mode == "memory")
+        self.profiler.start()
+
+    def finish_profiling(self):
+        # writes the machine-readable report of the run, if profiling is on
+        if not self.profiler.enabled:
+            return
+        self.profiler.stop()
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_profile_{current_time_str}.json")
+        self.profiler.save(file_path)
+        self.profiler = NULL_PROFILER
+        self.status_label.setText(f"<b>Profile report saved: </b>{file_path}")
+        self.status_label.show()
+
     def stop_calculation(self):
-        if self.calculation_worker:
+        if self.calculation_worker and self.calculation_worker.isRunning():
+            self.calculation_worker.stop_requested = True
+        if self.dialog.isVisible():
+            self.dialog.reject()
+
+    def toggle_pause(self):
+        if self.calculation_worker and self.calculation_worker.isRunning():
+            self.calculation_worker.pause_requested = not self.calculation_worker.pause_requested
+            self.pause_button.setText("Resume" if self.calculation_worker.pause_requested else "Pause")
+
+    def on_calculation_paused(self, paused):
+        if paused:
+            self.time_label.setText("Paused, progress has been saved")
+
+    def on_calculation_cancelled(self):
+        self.finish_profiling()
+        if self.calculation_worker.keep_checkpoint:
+            return
+        self.show_warning("Stopped", "The calculation has been stopped.")
+
+    def screen_element_subsets(self):
+        # every k-element system of the selected elements, swept over the initial/last value range
+        palette = list(self.selected_elements.keys())
+        if len(palette) < 2:
+            QMessageBox.information(self, "Screen Element Subsets", "Select the candidate elements on the periodic table first.")
+            return
+        try:
+            start = float(self.from_at_edit.text())
+            end = float(self.to_at_edit.text())
+            step_size = float(self.step_size_edit.text())
+        except ValueError:
+            QMessageBox.critical(self, "Input Error", "Enter the initial value, the step size and the last value of the composition range.")
+            return
+        k, ok = QInputDialog.getInt(self, "Screen Element Subsets", f"Elements per system, out of {len(palette)}:",
+                                    min(5, len(palette)), 2, len(palette))
+        if not ok:
+            return
+        # the best alloy of each system is picked by the Rank dialog's objective, or by the highest Ω
+        spec = self.ranking_spec if self.ranking_spec and self.ranking_spec["kind"] == "top_k" else {"expression": "omega", "maximize": True}
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Screening Element Systems")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Pruning element systems, please wait...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.time_label = QLabel(self.dialog)
+        layout.addWidget(self.time_label)
+        stop_button = QPushButton("Stop", self.dialog)
+        stop_button.setProperty("class", "danger_button")
+        stop_button.setFixedSize(100, 38)
+        stop_button.clicked.connect(self.dialog.reject)
+        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_screening)
+        self.dialog.show()
+
+        self.screening_worker = SubsetScreeningWorker(self.engine, palette, k, start, end, step_size, self.restriction_values,
+                                                      spec["expression"], spec["maximize"])
+        self.screening_worker.update_progress.connect(self.update_screening_progress)
+        self.screening_worker.all_results_ready.connect(self.on_screening_finished)
+        self.screening_worker.finished.connect(self.on_worker_finished)
+        self.screening_worker.start()
+
+    def update_screening_progress(self, current, total, estimated_time, systems_per_second):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(current)
+        self.progress_label.setText(f"{current} of {total} element systems have been screened")
+        self.time_label.setText(f"Estimated time remaining: {estimated_time:.2f} s | {systems_per_second:.1f} systems/s")
+
+    def stop_screening(self):
+        if self.screening_worker and self.screening_worker.isRunning():
+            self.screening_worker.stop_requested = True
+
+    def on_screening_finished(self, temp_file_name, count):
+        report = self.screening_worker.report
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_screening_{current_time_str}.json")
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        pruned = sum(report["pruned"].values())
+        self.status_label.setText(f"<b>Screened: </b>{report['screened']} of {report['subsets']} systems, {pruned} pruned, "
+                                  f"ranking saved: {file_path}")
+        self.status_label.show()
+        self.result_set = self.read_results_file(temp_file_name)
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def inverse_design(self):
+        # searches the selected elements' ranges for compositions meeting the filter instead of sweeping a grid
+        if len(self.selected_elements) < 2:
+            QMessageBox.information(self, "Inverse Design", "Select the elements on the periodic table first.")
+            return
+        if not any(isinstance(restriction, dict) for restriction in self.restriction_values.values()):
+            QMessageBox.information(self, "Inverse Design", "Set the target ranges with Filter first, e.g. VEC 8 to 12 and δ 0 to 4.")
+            return
+        ranges = self.element_ranges()
+        if ranges is None:
+            return
+        lower, upper = ranges
+        count, ok = QInputDialog.getInt(self, "Inverse Design", "Number of compositions to find:", 50, 1, 1000)
+        if not ok:
+            return
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Inverse Design")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Searching compositions, please wait...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.time_label = QLabel(self.dialog)
+        layout.addWidget(self.time_label)
+        stop_button = QPushButton("Stop", self.dialog)
+        stop_button.setProperty("class", "danger_button")
+        stop_button.setFixedSize(100, 38)
+        stop_button.clicked.connect(self.dialog.reject)
+        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_inverse_design)
+        self.dialog.show()
+
+        self.inverse_design_worker = InverseDesignWorker(self.engine, list(self.selected_elements.keys()), lower, upper,
+                                                         self.restriction_values, count)
+        self.inverse_design_worker.update_progress.connect(self.update_inverse_design_progress)
+        self.inverse_design_worker.all_results_ready.connect(self.on_inverse_design_finished)
+        self.inverse_design_worker.finished.connect(self.on_worker_finished)
+        self.inverse_design_worker.start()
+
+    def update_inverse_design_progress(self, generation, generations, estimated_time, evaluations_per_second):
+        self.progress_bar.setRange(0, generations)
+        self.progress_bar.setValue(generation)
+        self.progress_label.setText(f"Generation {generation} of {generations}")
+        self.time_label.setText(f"Estimated time remaining: {estimated_time:.2f} s | {evaluations_per_second:.0f} alloys/s")
+
+    def stop_inverse_design(self):
+        if self.inverse_design_worker and self.inverse_design_worker.isRunning():
+            self.inverse_design_worker.stop_requested = True
+
+    def on_inverse_design_finished(self, temp_file_name, count):
+        report = self.inverse_design_worker.report
+        self.status_label.setText(f"<b>Inverse design: </b>{count} compositions from {report['evaluations']} calculations, "
+                                  f"a 1 at% grid would calculate {report['grid_size_1_at_percent']}")
+        self.status_label.show()
+        self.result_set = self.read_results_file(temp_file_name)
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def annealing_sweep(self):
+        # R5 and R6 of the selected compositions over annealing temperatures, shown as the temperature they flip at
+        if not self.selected_elements:
+            QMessageBox.information(self, "Annealing Temperature Sweep", "Select the elements on the periodic table first.")
+            return
+        selected_elements = self.composition_ranges()
+        if selected_elements is None:
+            return
+        text, ok = QInputDialog.getText(self, "Annealing Temperature Sweep", "Annealing temperatures in K (from, to, step):",
+                                        text="300, 2000, 50")
+        if not ok:
+            return
+        try:
+            start, end, step = (float(part) for part in text.split(","))
+            if step <= 0 or end < start:
+                raise ValueError
+        except ValueError:
+            QMessageBox.critical(self, "Input Error", "Enter the temperatures as from, to, step, e.g. 300, 2000, 50.")
+            return
+        temperatures = np.arange(start, end + step / 2, step)
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Annealing Temperature Sweep")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Calculating, please wait...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.time_label = QLabel(self.dialog)
+        layout.addWidget(self.time_label)
+        stop_button = QPushButton("Stop", self.dialog)
+        stop_button.setProperty("class", "danger_button")
+        stop_button.setFixedSize(100, 38)
+        stop_button.clicked.connect(self.dialog.reject)
+        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_annealing_sweep)
+        self.dialog.show()
+
+        self.annealing_worker = AnnealingSweepWorker(self.engine, selected_elements, float(self.step_size_edit.text()),
+                                                     temperatures, self.restriction_values)
+        self.annealing_worker.update_progress.connect(self.update_annealing_progress)
+        self.annealing_worker.all_results_ready.connect(self.on_annealing_sweep_finished)
+        self.annealing_worker.finished.connect(self.on_worker_finished)
+        self.annealing_worker.start()
+
+    def update_annealing_progress(self, current, total, estimated_time, alloys_per_second):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(current)
+        self.progress_label.setText(f"{current} of {total} alloys have been calculated")
+        self.time_label.setText(f"Estimated time remaining: {estimated_time:.2f} s | {alloys_per_second:.0f} alloys/s")
+
+    def stop_annealing_sweep(self):
+        if self.annealing_worker and self.annealing_worker.isRunning():
+            self.annealing_worker.stop_requested = True
+
+    def on_annealing_sweep_finished(self, temp_file_name, count):
+        report = self.annealing_worker.report
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_annealing_{current_time_str}.json")
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        temperatures = report["temperatures"]
+        shares = report["rules"]["R6"]["ss_share"]
+        summary = (f"R6 SS for {shares[0]:.0%} of the alloys at {temperatures[0]:g} K and {shares[-1]:.0%} at "
+                   f"{temperatures[-1]:g} K, " if shares else "")
+        self.status_label.setText(f"<b>Annealing sweep: </b>{summary}report saved: {file_path}")
+        self.status_label.show()
+        self.result_set = self.read_results_file(temp_file_name)
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def weight_sweep(self):
+        # the composition ranges and step size read as wt%, with a weighing sheet of the alloys meeting the criteria
+        if len(self.selected_elements) < 2:
+            QMessageBox.information(self, "Weight Percent Sweep", "Select the elements on the periodic table first.")
+            return
+        selected_elements = self.composition_ranges()
+        if selected_elements is None:
+            return
+        try:
+            step_size = float(self.step_size_edit.text())
+            if step_size < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.critical(self, "Input Error", "Invalid step size.")
+            return
+        batch_mass, ok = QInputDialog.getDouble(self, "Weight Percent Sweep", "Batch mass of the weighing sheet in g:",
+                                                20.0, 0.001, 1000000.0, 3)
+        if not ok:
+            return
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        sheet_path = os.path.join(tempfile.gettempdir(), f"heapp_weighing_{current_time_str}.xlsx")
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Weight Percent Sweep")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Calculating...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.time_label = QLabel(self.dialog)
+        layout.addWidget(self.time_label)
+        stop_button = QPushButton("Stop", self.dialog)
+        stop_button.setProperty("class", "danger_button")
+        stop_button.setFixedSize(100, 38)
+        stop_button.clicked.connect(self.dialog.reject)
+        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_weight_sweep)
+        self.dialog.show()
+
+        self.start_profiling()
+        self.weight_sweep_worker = WeightSweepWorker(self.engine, selected_elements, step_size, self.restriction_values,
+                                                     batch_mass, sheet_path)
+        self.weight_sweep_worker.update_progress.connect(self.update_annealing_progress)
+        self.weight_sweep_worker.all_results_ready.connect(self.on_weight_sweep_finished)
+        self.weight_sweep_worker.failed.connect(self.on_weight_sweep_failed)
+        self.weight_sweep_worker.finished.connect(self.on_worker_finished)
+        self.weight_sweep_worker.start()
+
+    def stop_weight_sweep(self):
+        if self.weight_sweep_worker and self.weight_sweep_worker.isRunning():
+            self.weight_sweep_worker.stop_requested = True
+
+    def on_weight_sweep_failed(self, message):
+        self.profiler = NULL_PROFILER
+        QMessageBox.critical(self, "Weight Percent Sweep", message)
+
+    def on_weight_sweep_finished(self, result_set, count):
+        self.status_label.setText(f"<b>Weight percent sweep: </b>weighing sheet of {count} alloys saved: "
+                                  f"{self.weight_sweep_worker.sheet_path}")
+        self.status_label.show()
+        self.result_set = result_set
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def uncertainty_settings(self):
+        """asks the standard deviation of every data set and the number of samples, False when cancelled."""
+        dialog = QDialog(self)
+        dialog.setFixedSize(378, 380)
+        dialog.setWindowTitle("Uncertainty Analysis")
+        layout = QGridLayout()
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        layout.addWidget(QLabel("Standard deviation, in % of the value or absolute"), 0, 0, 1, 2)
+        edits = {}
+        for row, (name, label) in enumerate(ERROR_LABELS.items(), start=1):
+            layout.addWidget(QLabel(label), row, 0)
+            edits[name] = default_line_edit(self.error_model[name], 73, 24)
+            edits[name].setProperty("class", "gray10_line_edit")
+            layout.addWidget(edits[name], row, 1)
+        layout.addWidget(QLabel("Samples per alloy"), len(edits) + 1, 0)
+        samples_edit = default_line_edit(str(self.uncertainty_samples), 73, 24)
+        samples_edit.setProperty("class", "gray10_line_edit")
+        layout.addWidget(samples_edit, len(edits) + 1, 1)
+
+        cancel_button = QPushButton("Cancel")
+        cancel_button.setFixedSize(189, 64)
+        cancel_button.setProperty("class", "secondary_button")
+        cancel_button.clicked.connect(dialog.reject)
+        run_button = QPushButton("Run")
+        run_button.setFixedSize(189, 64)
+        run_button.setProperty("class", "primary_button")
+        run_button.clicked.connect(dialog.accept)
+        container = QVBoxLayout(dialog)
+        container.setContentsMargins(0, 0, 0, 0)
+        container.addLayout(layout)
+        container.addStretch(1)
+        button_layout = QHBoxLayout()
+        button_layout.setSpacing(0)
+        button_layout.addWidget(cancel_button)
+        button_layout.addWidget(run_button)
+        container.addLayout(button_layout)
+        dialog.setLayout(container)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return False
+
+        try:
+            for name, edit in edits.items():
+                parse_error(edit.text())
+            samples = int(samples_edit.text())
+            if samples < 2:
+                raise ValueError
+        except ValueError:
+            QMessageBox.critical(self, "Input Error", "Enter standard deviations such as 1% or 0.5, and at least 2 samples.")
+            return False
+        self.error_model = {name: edit.text().strip() for name, edit in edits.items()}
+        self.uncertainty_samples = samples
+        return True
+
+    def uncertainty_analysis(self):
+        # descriptors and rule verdicts of the selected compositions under perturbed element and pair data
+        if not self.selected_elements:
+            QMessageBox.information(self, "Uncertainty Analysis", "Select the elements on the periodic table first.")
+            return
+        selected_elements = self.composition_ranges()
+        if selected_elements is None or not self.uncertainty_settings():
+            return
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Uncertainty Analysis")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Calculating, please wait...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.time_label = QLabel(self.dialog)
+        layout.addWidget(self.time_label)
+        stop_button = QPushButton("Stop", self.dialog)
+        stop_button.setProperty("class", "danger_button")
+        stop_button.setFixedSize(100, 38)
+        stop_button.clicked.connect(self.dialog.reject)
+        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_uncertainty_analysis)
+        self.dialog.show()
+
+        self.uncertainty_worker = UncertaintyWorker(self.engine, selected_elements, float(self.step_size_edit.text()),
+                                                    self.error_model, self.uncertainty_samples, self.restriction_values)
+        self.uncertainty_worker.update_progress.connect(self.update_annealing_progress)
+        self.uncertainty_worker.all_results_ready.connect(self.on_uncertainty_analysis_finished)
+        self.uncertainty_worker.finished.connect(self.on_worker_finished)
+        self.uncertainty_worker.start()
+
+    def stop_uncertainty_analysis(self):
+        if self.uncertainty_worker and self.uncertainty_worker.isRunning():
+            self.uncertainty_worker.stop_requested = True
+
+    def on_uncertainty_analysis_finished(self, temp_file_name, count):
+        report = self.uncertainty_worker.report
+        current_time_str = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
+        file_path = os.path.join(tempfile.gettempdir(), f"heapp_uncertainty_{current_time_str}.json")
+        with open(file_path, "w") as f:
+            json.dump(report, f, indent=2)
+        uncertain = ", ".join(f"{rule} {stats['uncertain']}" for rule, stats in report["rules"].items())
+        self.status_label.setText(f"<b>Uncertainty analysis: </b>alloys with 5-95% SS probability: {uncertain}, "
+                                  f"report saved: {file_path}")
+        self.status_label.show()
+        self.result_set = self.read_results_file(temp_file_name)
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def show_phase_map(self):
+        if self.phase_map_data is None or len(self.phase_map_data) == 0:
+            QMessageBox.information(self, "Phase Map", "Calculate some alloys first, the map shows the last results.")
+            return
+        if len(self.phase_map_data.elements) < 3:
+            QMessageBox.information(self, "Phase Map", "The map needs results with at least three elements.")
+            return
+        PhaseMapDialog(self.phase_map_data, self).exec()
+
+    def distributed_sweep(self):
+        # a grid sweep split into shards for worker processes on this and other machines, connecting over TCP
+        if len(self.selected_elements) < 2:
+            QMessageBox.information(self, "Distributed Sweep", "Select the elements on the periodic table first.")
+            return
+        selected_elements = self.composition_ranges()
+        if selected_elements is None:
+            return
+        port, ok = QInputDialog.getInt(self, "Distributed Sweep", "Port the workers connect to:", DEFAULT_PORT, 1024, 65535)
+        if not ok:
+            return
+        local_workers, ok = QInputDialog.getInt(self, "Distributed Sweep", "Worker processes on this machine:",
+                                                os.cpu_count() or 1, 0, 1024)
+        if not ok:
+            return
+        authkey = secrets.token_hex(8)
+
+        self.dialog = QDialog(self)
+        self.dialog.setFixedSize(300, 120)
+        self.dialog.setWindowTitle("Distributed Sweep")
+        layout = QVBoxLayout(self.dialog)
+        self.progress_label = QLabel("Waiting for workers...", self.dialog)
+        layout.addWidget(self.progress_label)
+        self.progress_bar = QProgressBar(self.dialog)
+        self.progress_bar.setFixedHeight(5)
+        self.progress_bar.setRange(0, 0)
+        layout.addWidget(self.progress_bar)
+        self.time_label = QLabel(self.dialog)
+        layout.addWidget(self.time_label)
+        stop_button = QPushButton("Stop", self.dialog)
+        stop_button.setProperty("class", "danger_button")
+        stop_button.setFixedSize(100, 38)
+        stop_button.clicked.connect(self.dialog.reject)
+        layout.addWidget(stop_button, alignment=Qt.AlignmentFlag.AlignRight)
+        self.dialog.setLayout(layout)
+        self.dialog.rejected.connect(self.stop_distributed_sweep)
+        self.dialog.show()
+        self.status_label.setText(f"<b>Workers on other machines: </b>python -m Utils.cluster --host "
+                                  f"{socket.gethostname()} --port {port} --authkey {authkey}")
+        self.status_label.show()
+
+        self.start_profiling()
+        self.distributed_worker = DistributedSweepWorker(self.engine, selected_elements,
+                                                         float(self.step_size_edit.text()), self.restriction_values,
+                                                         port, authkey.encode(), local_workers)
+        self.distributed_worker.update_progress.connect(self.update_annealing_progress)
+        self.distributed_worker.workers_changed.connect(
+            lambda workers: self.dialog.setWindowTitle(f"Distributed Sweep | {workers} workers"))
+        self.distributed_worker.all_results_ready.connect(self.on_distributed_sweep_finished)
+        self.distributed_worker.failed.connect(self.on_distributed_sweep_failed)
+        self.distributed_worker.finished.connect(self.on_worker_finished)
+        self.distributed_worker.start()
+
+    def stop_distributed_sweep(self):
+        if self.distributed_worker and self.distributed_worker.isRunning():
+            self.distributed_worker.stop_requested = True
+
+    def on_distributed_sweep_failed(self, message):
+        self.profiler = NULL_PROFILER
+        QMessageBox.critical(self, "Distributed Sweep", message)
+
+    def on_distributed_sweep_finished(self, result_set, count):
+        self.result_set = result_set
+        self.count_meeting_criteria = count
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def show_job_queue(self):
+        if self.job_manager is None:
+            self.job_manager = JobManager(self.engine)
+            self.job_manager.start()
+        if self.job_queue_dialog is None:
+            self.job_queue_dialog = JobQueueDialog(self.job_manager, self)
+            self.job_queue_dialog.add_requested.connect(self.add_job)
+            self.job_queue_dialog.results_requested.connect(self.show_job_results)
+        self.job_queue_dialog.show()
+        self.job_queue_dialog.raise_()
+
+    def add_job(self):
+        # queues a grid sweep of the selected elements with the current filter and ranking
+        if len(self.selected_elements) < 2:
+            QMessageBox.information(self, "Job Queue", "Select the elements on the periodic table first.")
+            return
+        selected_elements = self.composition_ranges()
+        if selected_elements is None:
+            return
+        try:
+            step_size = float(self.step_size_edit.text())
+            if step_size < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.critical(self, "Input Error", "Invalid step size.")
+            return
+        priority, ok = QInputDialog.getInt(self, "Job Queue", "Priority (higher runs first):", 0, -100, 100)
+        if not ok:
+            return
+        pool_size = self.job_manager.processes
+        processes, ok = QInputDialog.getInt(self, "Job Queue", f"Worker processes, at most (of {pool_size}):",
+                                            pool_size, 1, pool_size)
+        if not ok:
+            return
+        memory_mb, ok = QInputDialog.getInt(self, "Job Queue", "Memory its calculations may take (MB):", 512, 16,
+                                            1048576)
+        if not ok:
+            return
+        sink = from_spec(self.ranking_spec) if self.ranking_spec else None
+        job = Job.create(selected_elements, step_size, self.restriction_values, "".join(selected_elements), sink,
+                         priority, processes, memory_mb, self.engine.rules)
+        self.job_manager.add(job)
+
+    def show_job_results(self, job_id):
+        job = self.job_manager.jobs.get(job_id)
+        if job is None:
+            return
+        sink = job.sink()
+        if sink is not None and sink.spec()["kind"] == "summary":
+            self.save_summary_report(sink)
+            return
+        self.start_profiling()
+        with self.profiler.stage("result_set"):
+            self.result_set = self.job_manager.result_set(job_id)
+        self.count_meeting_criteria = len(self.result_set)
+        QTimer.singleShot(0, self.handle_all_results)
+
+    def offer_resume(self):
+        checkpoints = Checkpoint.list_checkpoints()
+        if not checkpoints:
+            return
+        answer = QMessageBox.question(self, "Resume Calculation",
+                                      f"{len(checkpoints)} interrupted calculation(s) can be resumed. Resume now?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.resume_calculation()
+
+    def resume_calculation(self):
+        checkpoints = Checkpoint.list_checkpoints()
+        if not checkpoints:
+            QMessageBox.information(self, "Resume Calculation", "There is no interrupted calculation to resume.")
+            return
+        descriptions = [checkpoint.description() for checkpoint in checkpoints]
+        description, ok = QInputDialog.getItem(self, "Resume Calculation", "Interrupted calculations:", descriptions, 0, False)
+        if not ok:
+            return
+        checkpoint = checkpoints[descriptions.index(description)]
+        self.restriction_values = checkpoint.restriction_values
+        self.start_profiling()
+        self.calculate_alloys(checkpoint.compositions(), checkpoint=checkpoint)
+        self.progress_bar.setValue(checkpoint.position)
+
+    def closeEvent(self, event):
+        # keeps the checkpoint of a running calculation, so it can be resumed on the next start
+        if self.calculation_worker and self.calculation_worker.isRunning():
+            self.calculation_worker.keep_checkpoint = True
             self.calculation_worker.stop_requested = True
-        self.dialog.reject()
+            self.calculation_worker.wait()
+        # the job manager saves the state of its jobs, they continue when the job queue is opened again
+        for worker in (self.screening_worker, self.inverse_design_worker, self.annealing_worker,
+                       self.uncertainty_worker, self.weight_sweep_worker, self.distributed_worker, self.job_manager):
+            if worker and worker.isRunning():
+                worker.stop_requested = True
+                worker.wait()
+        super().closeEvent(event)
 
     def update_alloy_info(self):
         alloy_name = ""
@@ -1339,7 +2174,7 @@ class MDLHEAPP(QMainWindow):
                 if atomic_percent <= 0:
                     raise ValueError("Percentage must be positive.")
                 selected_elements[element] = atomic_percent / 100
-                alloy_name += f"{element}{MDLHEAPP._to_subscript(str(int(atomic_percent)))}"
+                alloy_name += f"{element}{to_subscript(str(int(atomic_percent)))}"
             except ValueError:
                 QMessageBox.critical(self, "Input Error", f"Invalid input for {element}")
                 return